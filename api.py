@@ -1,307 +1,247 @@
+import json
 import os
-from flask import Flask, request, jsonify
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Flask, Response, g, request, jsonify, stream_with_context
 from flask_cors import CORS
-from groq import Groq
-from duckduckgo_search import DDGS
-from trafilatura import fetch_url, extract
-import re
+from nucleo import registro
+from nucleo.admissao import MANUAL, WEB as FAIXA_WEB, ControleAdmissao, RequisicaoRecusada, identificar_cliente
+from nucleo.cache_respostas import criar_cache_respostas
+from nucleo.base_conhecimento import BaseConhecimento
+from nucleo.cascata import ESPECULAR, MANUAL as ROTA_MANUAL, WEB, ControladorCascata, especular
+from nucleo.cronometro import Cronometro
+from nucleo.idioma import detectar_idioma
+from nucleo.intencoes import detectar_intencao
+from nucleo.llm import criar_gateway
+from nucleo.lote import CONCORRENCIA as CONCORRENCIA_LOTE, FAIXA_LOTES, agrupar, ler_itens, vez_do_llm
+from nucleo.metricas import (BUSCAS_ESPECULATIVAS, DECISOES_CASCATA, FALLBACK_WEB, METRICAS, PERGUNTAS_LOTE,
+                              RECUSAS_ADMISSAO, RESPOSTAS, TIPO_CONTEUDO, observar_etapa)
+from nucleo.orcamento import OrcamentoTokens
+from nucleo.prompts import SEPARADOR_CHUNKS
+from nucleo.respostas import (MENSAGENS_FALHA, MENSAGENS_FALHA_WEB, MENSAGENS_LIMITE_CLIENTE, MENSAGENS_SOBRECARGA,
+                              eh_mensagem_de_falha, obter_resposta_pronta)
+from nucleo.sessoes import criar_armazem_sessoes, depende_da_conversa
+from nucleo.web import PRAZO_TOTAL_WEB, TIMEOUT_POR_HOST, buscar_links, coletar_artigos
 
 # --- CONFIGURAÇÕES E INICIALIZAÇÃO ---
-print("Iniciando a configuração do servidor (VERSÃO FINAL COMPLETA)...")
-
-NOME_MANUAL_LIMPO = "manual_limpo.txt"
-CONTEUDO_MANUAL = ""
-CHUNKS_MANUAL = []
-
-try:
-    client = Groq(api_key=os.environ.get("GROQ_API_KEY"))
-    print("Cliente da API da Groq configurado.")
-except Exception as e:
-    print(f"ERRO: Chave da API da Groq não encontrada. Configure a variável de ambiente. Erro: {e}")
-    client = None
-
-def dividir_em_chunks(texto, tamanho_chunk=500):
-    """Divide o texto em chunks menores baseados em parágrafos."""
-    paragrafos = texto.split('\n\n')
-    chunks = []
-    chunk_atual = ""
-
-    for paragrafo in paragrafos:
-        if len(chunk_atual) + len(paragrafo) < tamanho_chunk:
-            chunk_atual += paragrafo + "\n\n"
-        else:
-            if chunk_atual:
-                chunks.append(chunk_atual.strip())
-            chunk_atual = paragrafo + "\n\n"
-
-    if chunk_atual:
-        chunks.append(chunk_atual.strip())
-
-    return chunks
-
-def detectar_idioma(texto):
-    """Detecta o idioma do texto (pt, es, en) com alta precisão."""
-    texto_lower = texto.lower()
-    texto_com_espacos = f' {texto_lower} '
-
-    # Padrões EXCLUSIVOS de cada idioma (peso 5)
-    exclusivos_es = ['el ', ' la ', ' del ', ' al ', ' los ', ' las ', ' es ', ' son ', 'cuánto', 'cuanto', 'cómo', 'qué', 'que ', 'está', 'cuál', 'cual']
-    exclusivos_pt = [' o ', ' a ', ' do ', ' da ', ' ao ', ' os ', ' as ', ' não', ' nao', ' são', ' sao', ' tem ', ' qual ', ' você', ' voce', ' é ']
-    exclusivos_en = [' the ', ' does ', ' which ', ' that ', ' this ', ' these ', ' those ', ' have ', ' has ', ' is ', ' are ']
-
-    # Verbos típicos (peso 3)
-    verbos_es = ['cuesta', 'hacer', 'configurar', 'tiene', 'es']
-    verbos_pt = ['custa', 'fazer', 'configurar', 'tem', 'é']
-    verbos_en = ['cost', 'costs', 'make', 'configure', 'has', 'have', 'is', 'are']
-
-    # Palavras comuns (peso 1)
-    comuns_pt = ['para', 'com', 'em', 'de', 'como', 'por']
-    comuns_es = ['para', 'con', 'en', 'de', 'como', 'por']
-    comuns_en = ['to', 'for', 'in', 'of', 'how', 'with']
-
-    # Inicializa scores
-    score_pt = 0
-    score_es = 0
-    score_en = 0
-
-    # Conta exclusivos (peso alto)
-    score_es += sum(5 for palavra in exclusivos_es if palavra in texto_com_espacos)
-    score_pt += sum(5 for palavra in exclusivos_pt if palavra in texto_com_espacos)
-    score_en += sum(5 for palavra in exclusivos_en if palavra in texto_com_espacos)
-
-    # Conta verbos (peso médio)
-    score_es += sum(3 for verbo in verbos_es if verbo in texto_lower)
-    score_pt += sum(3 for verbo in verbos_pt if verbo in texto_lower)
-    score_en += sum(3 for verbo in verbos_en if verbo in texto_lower)
-
-    # Conta palavras comuns (peso baixo)
-    score_pt += sum(1 for palavra in comuns_pt if palavra in texto_com_espacos)
-    score_es += sum(1 for palavra in comuns_es if palavra in texto_com_espacos)
-    score_en += sum(1 for palavra in comuns_en if palavra in texto_com_espacos)
-
-    # Regras de desempate específicas
-    # Se tem artigos "el" ou "la" sozinhos, muito provável ser espanhol
-    if ' el ' in texto_com_espacos or ' los ' in texto_com_espacos:
-        score_es += 3
-    if ' del ' in texto_com_espacos or ' al ' in texto_com_espacos:
-        score_es += 3
-
-    # Se tem "the", muito provável ser inglês
-    if ' the ' in texto_com_espacos:
-        score_en += 3
-
-    # Se tem "o" ou "a" sozinhos seguidos de substantivo, provável ser português
-    if ' o ' in texto_com_espacos or ' os ' in texto_com_espacos:
-        score_pt += 2
-    if ' do ' in texto_com_espacos or ' da ' in texto_com_espacos or ' ao ' in texto_com_espacos:
-        score_pt += 3
-
-    # Retorna o idioma com maior score
-    if score_es > score_pt and score_es > score_en:
-        return 'es'
-    elif score_en > score_pt and score_en > score_es:
-        return 'en'
-    else:
-        return 'pt'  # Padrão é português
-
-def verificar_pergunta_sobre_valores(pergunta):
-    """Verifica se a pergunta é sobre valores/preços/licença em qualquer idioma."""
-    # Português
-    palavras_pt = ['valor', 'preco', 'preço', 'quanto custa', 'custa', 'custo',
-                   'licenca', 'licença', 'plano', 'planos', 'mensalidade',
-                   'assinatura', 'pagar', 'pagamento', 'reais', 'r$']
-    # Espanhol
-    palavras_es = ['valor', 'precio', 'cuánto cuesta', 'cuesta', 'costo',
-                   'licencia', 'plan', 'planes', 'mensualidad',
-                   'suscripción', 'pagar', 'pago']
-    # Inglês
-    palavras_en = ['value', 'price', 'how much', 'cost', 'costs',
-                   'license', 'plan', 'plans', 'monthly', 'subscription',
-                   'pay', 'payment', 'pricing']
-
-    pergunta_lower = pergunta.lower()
-    todas_palavras = palavras_pt + palavras_es + palavras_en
-    return any(palavra in pergunta_lower for palavra in todas_palavras)
-
-def obter_resposta_valores(idioma):
-    """Retorna a resposta sobre valores no idioma especificado."""
-    respostas = {
-        'pt': """Para informações sobre valores, planos e licenças do Console Mix, entre em contato diretamente com nossa equipe de suporte:
-
-📞 Telefones:
-• (42) 99985-3754
-• (42) 99848-8284
-
-🕒 Horário de Atendimento:
-Segunda a Sexta, das 9h às 18h (horário de Brasília)
-
-Nossa equipe terá prazer em apresentar as melhores opções de planos para você!""",
-
-        'es': """Para información sobre precios, planes y licencias de Console Mix, póngase en contacto directamente con nuestro equipo de soporte:
-
-📞 Teléfonos:
-• (42) 99985-3754
-• (42) 99848-8284
-
-🕒 Horario de Atención:
-Lunes a Viernes, de 9h a 18h (horario de Brasilia)
-
-¡Nuestro equipo estará encantado de presentarle las mejores opciones de planes para usted!""",
-
-        'en': """For information about pricing, plans and licenses for Console Mix, please contact our support team directly:
-
-📞 Phone numbers:
-• (42) 99985-3754
-• (42) 99848-8284
-
-🕒 Business Hours:
-Monday to Friday, 9am to 6pm (Brasilia time)
-
-Our team will be happy to present you with the best plan options!"""
-    }
-    return respostas.get(idioma, respostas['pt'])
-
-def encontrar_chunks_relevantes(pergunta, chunks, top_k=3):
-    """Encontra os chunks mais relevantes baseado em palavras-chave simples."""
-    # Normaliza a pergunta
-    palavras_pergunta = set(re.findall(r'\w+', pergunta.lower()))
-
-    # Remove palavras muito comuns (stop words simples)
-    stop_words = {'o', 'a', 'de', 'da', 'do', 'em', 'para', 'com', 'um', 'uma', 'os', 'as', 'dos', 'das', 'é', 'e', 'ou'}
-    palavras_pergunta = palavras_pergunta - stop_words
-
-    # Calcula score de relevância para cada chunk
-    scores = []
-    for idx, chunk in enumerate(chunks):
-        chunk_lower = chunk.lower()
-        score = sum(1 for palavra in palavras_pergunta if palavra in chunk_lower)
-        scores.append((score, idx, chunk))
-
-    # Ordena por score e retorna os top_k
-    scores.sort(reverse=True, key=lambda x: x[0])
-
-    # Se o melhor score for 0, retorna string vazia para acionar fallback
-    if not scores or scores[0][0] == 0:
+# Nível em LOG_LEVEL; com LOG_ASYNC=1 (padrão) a escrita no stdout sai do caminho da requisição
+log = registro.obter('api')
+log.info("Iniciando a configuração do servidor (VERSÃO FINAL COMPLETA)...")
+
+# keyword (BM25), denso (FAISS) ou hibrido (fusão dos dois)
+MODO_RECUPERACAO = os.environ.get("RECUPERACAO_MODO", "keyword")
+CACHE_RESPOSTAS = criar_cache_respostas()
+# Limita o tamanho do prompt (histórico, contexto do manual e artigos da web)
+ORCAMENTO = OrcamentoTokens()
+# Escolhe entre manual e web pela confiança da recuperação, antes de chamar o LLM
+CASCATA = ControladorCascata()
+# Histórico das conversas no servidor: o widget manda só a pergunta e o conversation_id
+SESSOES = criar_armazem_sessoes()
+# Faixas com limites próprios para perguntas do manual e as que devem cair na web; respostas prontas passam direto
+ADMISSAO = ControleAdmissao()
+# Na ESPECULAR a thread do pedido gera a resposta do manual; a busca roda no pool limitado da cascata
+FAIXA_DA_ROTA = {ROTA_MANUAL: MANUAL, ESPECULAR: MANUAL, WEB: FAIXA_WEB}
+
+# Chamadas à Groq com prazo, novas tentativas, limite de concorrência e coalescência de prompts iguais
+client = criar_gateway()
+
+def encontrar_chunks_relevantes(pergunta, recuperador, top_k=3, fontes=None):
+    """Encontra os chunks mais relevantes usando o recuperador configurado.
+
+    `fontes` (lista de arquivos, ex.: ["conhecimento/manual_limpo.txt"]) restringe a busca.
+    """
+    return montar_contexto(recuperador.buscar(pergunta, top_k=top_k, fontes=fontes))
+
+def montar_contexto(resultados):
+    """Junta os chunks dos pares (chunk, score) no contexto do prompt."""
+    # Se nenhum chunk é relevante, retorna string vazia para acionar fallback
+    if not resultados:
         return ""
 
-    chunks_relevantes = [chunk for score, idx, chunk in scores[:top_k] if score > 0]
-    return "\n\n---\n\n".join(chunks_relevantes)
+    chunks_relevantes = [chunk for chunk, score in resultados]
+    return SEPARADOR_CHUNKS.join(chunks_relevantes)
+
+def escolher_rota(pergunta, resultados, corpus, idioma):
+    """Rota da cascata para a pergunta e, na rota ESPECULAR, a busca web já iniciada (Future).
 
-if os.path.exists(NOME_MANUAL_LIMPO):
-    with open(NOME_MANUAL_LIMPO, "r", encoding="utf-8") as f:
-        CONTEUDO_MANUAL = f.read()
-    CHUNKS_MANUAL = dividir_em_chunks(CONTEUDO_MANUAL, tamanho_chunk=500)
-    print(f"Manual '{NOME_MANUAL_LIMPO}' carregado e dividido em {len(CHUNKS_MANUAL)} chunks.")
-else:
-    print(f"AVISO: Arquivo de manual '{NOME_MANUAL_LIMPO}' não encontrado.")
+    Antes de gastar LLM ou busca, ocupa uma vaga na faixa da rota até o fim da requisição;
+    levanta RequisicaoRecusada se a faixa estiver cheia ou o cliente passou do limite.
+    """
+    rota, confianca = CASCATA.decidir(pergunta, resultados, corpus, idioma)
+    DECISOES_CASCATA.inc(rota=rota)
+    log.debug(f"[CASCATA] Rota '{rota}' (confiança do manual: {confianca:.2f})")
+    ADMISSAO.entrar(FAIXA_DA_ROTA[rota], identificar_cliente(request.remote_addr, request.headers))
+    g.faixa_admitida = FAIXA_DA_ROTA[rota]
+    busca_web = especular(buscar_na_web, pergunta) if rota == ESPECULAR else None
+    return rota, busca_web
+
+def contexto_da_web(pergunta, busca_web):
+    """Contexto da web: o da busca especulativa, se houver, ou de uma busca nova."""
+    if busca_web is None:
+        return buscar_na_web(pergunta)
+    BUSCAS_ESPECULATIVAS.inc(resultado='usada')
+    return busca_web.result()
+
+def mensagem_de_recusa(recusa, idioma):
+    """Mensagem de "tente de novo" no idioma da pergunta; conta a recusa nas métricas."""
+    RECUSAS_ADMISSAO.inc(faixa=recusa.faixa, motivo=recusa.motivo)
+    RESPOSTAS.inc(origem='recusada')
+    log.info(f"[ADMISSÃO] Pergunta recusada na faixa '{recusa.faixa}' ({recusa.motivo})")
+    mensagens = MENSAGENS_LIMITE_CLIENTE if recusa.motivo == 'limite_cliente' else MENSAGENS_SOBRECARGA
+    return mensagens.get(idioma, mensagens['pt'])
+
+def descartar_busca(busca_web):
+    """O manual respondeu: a busca especulativa não é usada (se já começou, termina e fica no cache da web)."""
+    if busca_web is not None:
+        busca_web.cancel()
+        BUSCAS_ESPECULATIVAS.inc(resultado='descartada')
+
+# Manual, índices e recuperador, trocados por inteiro quando os arquivos mudam (sem reiniciar o servidor)
+BASE_CONHECIMENTO = BaseConhecimento(
+    modo=MODO_RECUPERACAO, ao_trocar=lambda base: CACHE_RESPOSTAS.definir_versao(base.versao))
+MODO_RECUPERACAO = BASE_CONHECIMENTO.atual.modo
+log.info(f"Modo de recuperação: {MODO_RECUPERACAO}")
 
 
 # --- FUNÇÕES DE LÓGICA DA IA (O CÉREBRO) ---
 
 def buscar_na_web(pergunta):
     """Função para buscar na web e extrair o conteúdo principal de um artigo."""
-    print(f"[WEB SEARCH] Iniciando busca na web para: '{pergunta}'")
-    query = pergunta
+    log.debug(f"[WEB SEARCH] Iniciando busca na web para: '{pergunta}'")
+    # O prazo total (WEB_PRAZO_TOTAL) começa antes da busca: os downloads ficam com o que sobrar
+    limite = time.monotonic() + PRAZO_TOTAL_WEB
     try:
-        with DDGS() as ddgs:
-            # Busca até 3 resultados para ter backup
-            resultados_links = list(ddgs.text(query, max_results=3, region='br-pt'))
-            if not resultados_links:
-                print("[WEB SEARCH] Nenhum resultado encontrado no DuckDuckGo")
-                return None
-
-            print(f"[WEB SEARCH] Encontrados {len(resultados_links)} resultados")
-
-            # Tenta extrair conteúdo de cada resultado até conseguir
-            for i, resultado in enumerate(resultados_links):
-                url = resultado['href']
-                print(f"[WEB SEARCH] Tentativa {i+1}/{len(resultados_links)}: Extraindo de {url}")
-
-                try:
-                    downloaded = fetch_url(url)
-                    if downloaded:
-                        texto_artigo = extract(downloaded, include_comments=False, include_tables=False)
-
-                        # Verifica se extraiu conteúdo útil (mínimo 100 caracteres)
-                        if texto_artigo and len(texto_artigo.strip()) > 100:
-                            print(f"[WEB SEARCH] Sucesso! Extraídos {len(texto_artigo)} caracteres")
-                            return texto_artigo
-                        else:
-                            print(f"[WEB SEARCH] Conteúdo muito curto ou vazio, tentando próximo...")
-                    else:
-                        print(f"[WEB SEARCH] Falha no download, tentando próximo...")
-                except Exception as e:
-                    print(f"[WEB SEARCH] Erro ao processar {url}: {e}")
-                    continue
+        # Busca até 3 resultados para ter backup
+        resultados_links = buscar_links(pergunta, max_resultados=3, regiao='br-pt',
+                                        timeout=min(TIMEOUT_POR_HOST, PRAZO_TOTAL_WEB))
+    except Exception as e:
+        log.warning(f"[WEB SEARCH] Erro na busca: {e}")
+        return None
+
+    if not resultados_links:
+        log.info("[WEB SEARCH] Nenhum resultado encontrado no DuckDuckGo")
+        return None
 
-            print("[WEB SEARCH] Não foi possível extrair conteúdo útil de nenhum resultado")
-            return None
+    log.debug(f"[WEB SEARCH] Encontrados {len(resultados_links)} resultados")
 
-    except Exception as e:
-        print(f"[WEB SEARCH] Erro na busca: {e}")
+    # Baixa todos em paralelo e fica com o primeiro que trouxer conteúdo útil
+    artigos = coletar_artigos(resultados_links, quantidade=1, prazo=limite - time.monotonic())
+    if not artigos:
+        log.info("[WEB SEARCH] Não foi possível extrair conteúdo útil de nenhum resultado")
         return None
+    return artigos[0][1]
+
+def carregar_conversa(data):
+    """(id da conversa, histórico, resumo) de uma requisição do /ask.
 
-def obter_resposta_generativa(pergunta_atual, historico, contexto, fonte_do_contexto, idioma='pt'):
+    Quem manda o `history` inteiro (clientes antigos) segue sem sessão. Os demais mandam o
+    `conversation_id` devolvido na resposta anterior (nenhum na primeira pergunta).
+    """
+    if 'history' in data:
+        return None, data.get('history') or [], ""
+    id_conversa = data.get('conversation_id')
+    if not SESSOES.id_valido(id_conversa):
+        id_conversa = SESSOES.novo_id()
+    sessao = SESSOES.carregar(id_conversa)
+    return id_conversa, sessao.mensagens, sessao.resumo
+
+def reaproveitavel(pergunta, historico):
+    """Se a resposta pode vir do cache ou da FAQ: sem histórico, ou a pergunta não depende das trocas anteriores."""
+    return not historico or not depende_da_conversa(pergunta)
+
+def encerrar_turno(id_conversa, pergunta, resposta):
+    """Guarda a troca na sessão e devolve o payload final ({"answer", "conversation_id"})."""
+    dados = {"answer": resposta}
+    if id_conversa:
+        SESSOES.registrar(id_conversa, pergunta, resposta)
+        dados["conversation_id"] = id_conversa
+    return dados
+
+def obter_resposta_generativa(pergunta_atual, historico, contexto, fonte_do_contexto, idioma='pt', resumo=""):
     """Gera uma resposta da IA baseada no contexto e histórico fornecidos."""
     if not client:
         return "O serviço de IA não está configurado."
     if not contexto:
-        mensagens_falha = {
-            'pt': "Não encontrei informações sobre isso na fonte consultada.",
-            'es': "No encontré información sobre esto en la fuente consultada.",
-            'en': "I didn't find information about this in the consulted source."
-        }
-        return mensagens_falha.get(idioma, mensagens_falha['pt'])
-
-    historico_recente = historico[-6:]
-    historico_formatado = "\n".join([f"Usuário: {msg['content']}" if msg['role'] == 'user' else f"Assistente: {msg['content']}" for msg in historico_recente])
-
-    # Instruções de idioma
-    instrucoes_idioma = {
-        'pt': "TODA RESPOSTA DEVE SER EM PORTUGUÊS.",
-        'es': "TODA RESPUESTA DEBE SER EN ESPAÑOL.",
-        'en': "ALL RESPONSES MUST BE IN ENGLISH."
-    }
-
-    instrucao_idioma = instrucoes_idioma.get(idioma, instrucoes_idioma['pt'])
-
-    prompt_completo = f"""
-    Você é um assistente técnico especialista. Responda a PERGUNTA ATUAL do usuário baseando-se exclusivamente no CONTEXTO DE CONSULTA.
-
-    REGRAS ESTRITAS:
-    1.  Use o HISTÓRICO DA CONVERSA para entender perguntas de acompanhamento.
-    2.  Sua resposta deve vir APENAS do CONTEXTO DE CONSULTA. Não use conhecimento prévio.
-    3.  Seja direto e não mencione o contexto ou a fonte. NÃO diga coisas do tipo "a fonte que consultei".
-    4.  REGRA DE FALHA: Se a resposta não estiver no CONTEXTO DE CONSULTA, responda APENAS com a frase: "Não encontrei informações sobre isso na fonte consultada."
-    5.  NÃO CORRIJA a ortografia do usuário NEM RESPONDA QUESTÕES DE GRAMATICA. VOCE É UM ASSISTENTE TÉCNICO, não um PROFESSOR.
-    6.  {instrucao_idioma}
-
-    ---
-
-    --- 
-
-    ---
-    HISTÓRICO DA CONVERSA:
-    {historico_formatado}
-    ---
-    CONTEXTO DE CONSULTA (Fonte: {fonte_do_contexto}):
-    {contexto}
-    ---
-    PERGUNTA ATUAL DO USUÁRIO:
-    {pergunta_atual}
-    ---
-    RESPOSTA DIRETA:
-    """
-    
-    chat_completion = client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt_completo}],
-        model="llama-3.1-8b-instant"
-    )
-    return chat_completion.choices[0].message.content
+        return MENSAGENS_FALHA.get(idioma, MENSAGENS_FALHA['pt'])
+
+    prompt_completo = ORCAMENTO.montar_prompt(pergunta_atual, historico, contexto, fonte_do_contexto, idioma, resumo)
+    if prompt_completo is None:
+        return MENSAGENS_FALHA.get(idioma, MENSAGENS_FALHA['pt'])
+    return client.completar([{"role": "user", "content": prompt_completo}])
+
+def gerar_resposta_em_stream(pergunta_atual, historico, contexto, fonte_do_contexto, idioma='pt', resumo=""):
+    """Mesma resposta de obter_resposta_generativa, mas entregue em pedaços conforme a Groq gera."""
+    if not client:
+        yield "O serviço de IA não está configurado."
+        return
+    if not contexto:
+        yield MENSAGENS_FALHA.get(idioma, MENSAGENS_FALHA['pt'])
+        return
+
+    prompt_completo = ORCAMENTO.montar_prompt(pergunta_atual, historico, contexto, fonte_do_contexto, idioma, resumo)
+    if prompt_completo is None:
+        yield MENSAGENS_FALHA.get(idioma, MENSAGENS_FALHA['pt'])
+        return
+    yield from client.transmitir([{"role": "user", "content": prompt_completo}])
 
 # --- CRIAÇÃO DA API COM FLASK ---
 app = Flask(__name__)
-CORS(app, resources={r"/ask": {"origins": ["https://consolemix.com.br", "http://consolemix.com.br", "http://localhost", "http://127.0.0.1"]}})
+CORS(app, resources={r"/ask.*": {"origins": ["https://consolemix.com.br", "http://consolemix.com.br", "http://localhost", "http://127.0.0.1"]}})
+
+@app.before_request
+def verificar_base_conhecimento():
+    # Só um stat por arquivo a cada BASE_INTERVALO_VERIFICACAO segundos; a recarga roda em outra thread
+    BASE_CONHECIMENTO.verificar()
+
+@app.before_request
+def iniciar_cronometro():
+    # Cada etapa medida vai também para o histograma assistente_etapa_segundos do /metrics
+    g.cronometro = Cronometro(ao_medir=observar_etapa)
+
+@app.after_request
+def adicionar_server_timing(resposta):
+    # Tempo de cada etapa da pergunta, lido pelo benchmarks/bench_carga.py (e visível no DevTools)
+    cronometro = g.get('cronometro')
+    if cronometro is not None and not resposta.is_streamed:
+        resposta.headers['Server-Timing'] = cronometro.server_timing()
+        if request.endpoint == 'ask_assistant':
+            observar_etapa('total', cronometro.total())
+    return resposta
+
+@app.teardown_request
+def liberar_admissao(erro):
+    # Com stream_with_context, só roda depois que o stream termina: a vaga fica ocupada até lá
+    faixa = g.pop('faixa_admitida', None)
+    if faixa is not None:
+        ADMISSAO.sair(faixa)
+
+def idioma_do_pedido(data):
+    """Idioma das mensagens de recusa: o da pergunta ou, num lote, o da primeira pergunta."""
+    if not isinstance(data, dict):
+        return 'pt'
+    pergunta = data.get('question')
+    perguntas = data.get('questions')
+    if pergunta is None and isinstance(perguntas, list) and perguntas:
+        pergunta = perguntas[0].get('question') if isinstance(perguntas[0], dict) else perguntas[0]
+    return detectar_idioma(pergunta) if isinstance(pergunta, str) else 'pt'
+
+@app.errorhandler(RequisicaoRecusada)
+def recusar_pergunta(recusa):
+    idioma = idioma_do_pedido(request.get_json(silent=True))
+    mensagem = mensagem_de_recusa(recusa, idioma)
+    status = 429 if recusa.motivo == 'limite_cliente' else 503
+    return jsonify({"error": mensagem, "answer": mensagem}), status, {"Retry-After": str(recusa.espera)}
+
+@app.teardown_request
+def contar_erro(erro):
+    if erro is not None and request.endpoint in ('ask_assistant', 'ask_assistant_stream'):
+        RESPOSTAS.inc(origem='erro')
+
+@app.route('/metrics')
+def metricas():
+    """Histogramas das etapas e contadores (cache, fallback, erros externos) no formato do Prometheus."""
+    return Response(METRICAS.exportar(), content_type=TIPO_CONTEUDO)
 
 @app.route('/')
 def health_check():
@@ -314,64 +254,351 @@ def ask_assistant():
         return jsonify({"error": "A pergunta (question) é obrigatória."}), 400
 
     pergunta_atual = data['question']
-    historico = data.get('history', [])
+    id_conversa, historico, resumo = carregar_conversa(data)
+    fontes = data.get('sources')
 
-    # --- DETECÇÃO DE IDIOMA ---
-    idioma_detectado = detectar_idioma(pergunta_atual)
-    print(f"Idioma detectado: {idioma_detectado}")
+    etapas = g.cronometro
 
-    # --- VERIFICAÇÃO DE PERGUNTAS SOBRE VALORES ---
-    if verificar_pergunta_sobre_valores(pergunta_atual):
-        print(f"Pergunta sobre valores detectada: '{pergunta_atual}'")
-        resposta_final = obter_resposta_valores(idioma_detectado)
-        return jsonify({"answer": resposta_final})
+    # --- DETECÇÃO DE IDIOMA ---
+    with etapas.medir('idioma'):
+        idioma_detectado = detectar_idioma(pergunta_atual)
+    log.debug(f"Idioma detectado: {idioma_detectado}")
+
+    # --- PERGUNTAS COM RESPOSTA PRONTA (VALORES, HORÁRIO DO SUPORTE, DOWNLOADS) ---
+    with etapas.medir('intencao'):
+        intencao = detectar_intencao(pergunta_atual)
+    if intencao:
+        log.info(f"Intenção '{intencao}' detectada: '{pergunta_atual}'")
+        resposta_final = obter_resposta_pronta(intencao, idioma_detectado)
+        RESPOSTAS.inc(origem='intencao')
+        return jsonify(encerrar_turno(id_conversa, pergunta_atual, resposta_final))
+
+    # --- PERGUNTAS DO MANUAL COM RESPOSTA PRÉ-GERADA (precomputar_faq.py) ---
+    # Como o cache, só vale para perguntas que não dependem das trocas anteriores
+    base = BASE_CONHECIMENTO.atual
+    resposta_faq = None
+    if reaproveitavel(pergunta_atual, historico):
+        with etapas.medir('faq'):
+            resposta_faq = base.faq.buscar(pergunta_atual, idioma_detectado, fontes)
+    if resposta_faq is not None:
+        log.info("[FAQ] Resposta pré-gerada encontrada.")
+        RESPOSTAS.inc(origem='faq')
+        return jsonify(encerrar_turno(id_conversa, pergunta_atual, resposta_faq))
 
     # --- LÓGICA DE CASCATA IMPLEMENTADA COM CHUNKING ---
 
     # 1. Encontra os chunks mais relevantes do manual baseado na pergunta
-    print(f"Tentando responder '{pergunta_atual}' com o manual...")
-    contexto_manual = encontrar_chunks_relevantes(pergunta_atual, CHUNKS_MANUAL, top_k=3)
-
-    # 2. Se encontrou chunks relevantes, tenta responder com eles
-    if contexto_manual:
-        resposta_final = obter_resposta_generativa(pergunta_atual, historico, contexto_manual, "Manual Técnico", idioma_detectado)
+    log.debug(f"Tentando responder '{pergunta_atual}' com o manual...")
+    with etapas.medir('recuperacao'):
+        resultados = base.recuperador.buscar(pergunta_atual, top_k=3, fontes=fontes)
+        contexto_manual = montar_contexto(resultados)
+
+    # A resposta depende só da pergunta, do idioma e do contexto escolhido, a não ser num
+    # "e no Windows?" de uma conversa; essas passam direto pelo cache
+    usar_cache = client is not None and reaproveitavel(pergunta_atual, historico)
+    if usar_cache:
+        with etapas.medir('cache'):
+            resposta_em_cache = CACHE_RESPOSTAS.obter(pergunta_atual, idioma_detectado, contexto_manual)
+        if resposta_em_cache is not None:
+            log.info("[CACHE] Resposta encontrada no cache.")
+            RESPOSTAS.inc(origem='cache')
+            return jsonify(encerrar_turno(id_conversa, pergunta_atual, resposta_em_cache))
+
+    # 2. Escolhe a fonte pela confiança dos chunks; na dúvida, a busca web já começa em paralelo
+    rota, busca_web = escolher_rota(pergunta_atual, resultados, base.corpus, idioma_detectado)
+    if rota != WEB:
+        with etapas.medir('llm'):
+            resposta_final = obter_resposta_generativa(pergunta_atual, historico, contexto_manual, "Manual Técnico", idioma_detectado, resumo)
     else:
-        # Se não encontrou nenhum chunk relevante, marca para buscar na web
-        mensagens_falha = {
-            'pt': "Não encontrei informações sobre isso na fonte consultada.",
-            'es': "No encontré información sobre esto en la fuente consultada.",
-            'en': "I didn't find information about this in the consulted source."
-        }
-        resposta_final = mensagens_falha.get(idioma_detectado, mensagens_falha['pt'])
+        # Nenhum chunk cobre a pergunta: vai para a web sem gastar uma chamada ao LLM com o manual
+        resposta_final = MENSAGENS_FALHA.get(idioma_detectado, MENSAGENS_FALHA['pt'])
 
     # 3. Verifica se a resposta do manual foi a mensagem de falha.
-    if any(msg in resposta_final.lower() for msg in ["não encontrei", "no encontré", "didn't find"]):
-        print("[FALLBACK] Resposta não encontrada no manual. Partindo para a busca na web.")
-        # Se foi, busca na web e gera uma nova resposta.
-        contexto_web = buscar_na_web(pergunta_atual)
+    origem = 'manual'
+    if not eh_mensagem_de_falha(resposta_final):
+        descartar_busca(busca_web)
+    else:
+        log.info("[FALLBACK] Resposta não encontrada no manual. Partindo para a busca na web.")
+        FALLBACK_WEB.inc()
+        origem = 'web'
+
+        # Se foi, busca na web (ou espera a busca especulativa) e gera uma nova resposta.
+        with etapas.medir('web'):
+            contexto_web = contexto_da_web(pergunta_atual, busca_web)
 
         if contexto_web:
-            print(f"[FALLBACK] Contexto da web obtido com sucesso ({len(contexto_web)} caracteres)")
-            resposta_final = obter_resposta_generativa(pergunta_atual, historico, contexto_web, "Web", idioma_detectado)
+            log.debug(f"[FALLBACK] Contexto da web obtido com sucesso ({len(contexto_web)} caracteres)")
+            with etapas.medir('llm'):
+                resposta_final = obter_resposta_generativa(pergunta_atual, historico, contexto_web, "Web", idioma_detectado, resumo)
         else:
-            print(f"[FALLBACK] Busca na web falhou. Idioma detectado: {idioma_detectado}")
-            print(f"[FALLBACK] Pergunta original: '{pergunta_atual}'")
+            log.info(f"[FALLBACK] Busca na web falhou. Idioma detectado: {idioma_detectado}")
+            log.info(f"[FALLBACK] Pergunta original: '{pergunta_atual}'")
 
-            # Re-detecta idioma para garantir precisão
-            idioma_final = detectar_idioma(pergunta_atual)
-            print(f"[FALLBACK] Idioma re-detectado: {idioma_final}")
+            origem = 'falha_web'
+            resposta_final = MENSAGENS_FALHA_WEB.get(idioma_detectado, MENSAGENS_FALHA_WEB['pt'])
+            # Falha temporária da busca: não guarda no cache para tentar de novo na próxima vez
+            usar_cache = False
 
-            # Mensagens quando a busca web falha
-            mensagens_falha_web = {
-                'pt': "Desculpe, não encontrei informações sobre isso no manual e também não consegui buscar na internet no momento. Por favor, tente reformular sua pergunta ou entre em contato com o suporte.",
-                'es': "Lo siento, no encontré información sobre esto en el manual y tampoco pude buscar en Internet en este momento. Por favor, intente reformular su pregunta o póngase en contacto con el soporte.",
-                'en': "Sorry, I couldn't find information about this in the manual and I was unable to search the internet at this time. Please try rephrasing your question or contact support."
-            }
-            resposta_final = mensagens_falha_web.get(idioma_final, mensagens_falha_web['pt'])
-            print(f"[FALLBACK] Mensagem selecionada para idioma '{idioma_final}'")
+    if usar_cache:
+        CACHE_RESPOSTAS.guardar(pergunta_atual, idioma_detectado, contexto_manual, resposta_final)
 
+    RESPOSTAS.inc(origem=origem)
+    return jsonify(encerrar_turno(id_conversa, pergunta_atual, resposta_final))
+
+def evento_sse(dados, evento=None):
+    """Formata um evento Server-Sent Events com o payload em JSON."""
+    linha_evento = f"event: {evento}\n" if evento else ""
+    return f"{linha_evento}data: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+# Caracteres guardados antes de liberar o stream do manual: o bastante para reconhecer a frase de falha
+TAMANHO_BUFFER_FALHA = 40
+
+@app.route('/ask/stream', methods=['POST'])
+def ask_assistant_stream():
+    """Versão do /ask que envia a resposta token a token via Server-Sent Events.
+
+    Eventos: 'token' ({"token": ...}) para cada pedaço, 'fim' ({"answer": ...}) com a resposta
+    completa e 'erro' ({"error": ...}) se a geração falhar no meio do caminho.
+    """
+    data = request.get_json()
+    if not data or 'question' not in data:
+        return jsonify({"error": "A pergunta (question) é obrigatória."}), 400
 
-    return jsonify({"answer": resposta_final})
+    pergunta_atual = data['question']
+    id_conversa, historico, resumo = carregar_conversa(data)
+    fontes = data.get('sources')
+
+    def eventos():
+        # stream_with_context mantém o contexto da requisição: g.cronometro é o do before_request
+        cronometro = g.cronometro
+        with cronometro.medir('idioma'):
+            idioma_detectado = detectar_idioma(pergunta_atual)
+
+        with cronometro.medir('intencao'):
+            intencao = detectar_intencao(pergunta_atual)
+        if intencao:
+            resposta_final = obter_resposta_pronta(intencao, idioma_detectado)
+            RESPOSTAS.inc(origem='intencao')
+            yield evento_sse({"token": resposta_final}, "token")
+            yield evento_sse(encerrar_turno(id_conversa, pergunta_atual, resposta_final), "fim")
+            return
+
+        base = BASE_CONHECIMENTO.atual
+        resposta_faq = None
+        if reaproveitavel(pergunta_atual, historico):
+            with cronometro.medir('faq'):
+                resposta_faq = base.faq.buscar(pergunta_atual, idioma_detectado, fontes)
+        if resposta_faq is not None:
+            RESPOSTAS.inc(origem='faq')
+            yield evento_sse({"token": resposta_faq}, "token")
+            yield evento_sse(encerrar_turno(id_conversa, pergunta_atual, resposta_faq), "fim")
+            return
+
+        with cronometro.medir('recuperacao'):
+            resultados = base.recuperador.buscar(pergunta_atual, top_k=3, fontes=fontes)
+            contexto_manual = montar_contexto(resultados)
+        usar_cache = client is not None and reaproveitavel(pergunta_atual, historico)
+        if usar_cache:
+            with cronometro.medir('cache'):
+                resposta_em_cache = CACHE_RESPOSTAS.obter(pergunta_atual, idioma_detectado, contexto_manual)
+            if resposta_em_cache is not None:
+                RESPOSTAS.inc(origem='cache')
+                yield evento_sse({"token": resposta_em_cache}, "token")
+                yield evento_sse(encerrar_turno(id_conversa, pergunta_atual, resposta_em_cache), "fim")
+                return
+
+        partes = []
+        origem = 'manual'
+        try:
+            rota, busca_web = escolher_rota(pergunta_atual, resultados, base.corpus, idioma_detectado)
+        except RequisicaoRecusada as recusa:
+            # O stream já começou: a recusa vai como resposta, para o widget mostrá-la no balão
+            mensagem = mensagem_de_recusa(recusa, idioma_detectado)
+            yield evento_sse({"token": mensagem}, "token")
+            yield evento_sse({"answer": mensagem, "retry_after": recusa.espera}, "fim")
+            return
+        try:
+            # Segura o começo da resposta do manual até saber se é a frase de falha;
+            # se for, o usuário não chega a vê-la e a cascata segue para a web.
+            buffer = ""
+            liberado = False
+            pedacos_manual = () if rota == WEB else gerar_resposta_em_stream(
+                pergunta_atual, historico, contexto_manual, "Manual Técnico", idioma_detectado, resumo)
+            for pedaco in pedacos_manual:
+                if liberado:
+                    partes.append(pedaco)
+                    yield evento_sse({"token": pedaco}, "token")
+                    continue
+                buffer += pedaco
+                if len(buffer.strip()) >= TAMANHO_BUFFER_FALHA and not eh_mensagem_de_falha(buffer):
+                    liberado = True
+                    partes.append(buffer)
+                    yield evento_sse({"token": buffer}, "token")
+
+            if not liberado and buffer and not eh_mensagem_de_falha(buffer):
+                partes.append(buffer)
+                yield evento_sse({"token": buffer}, "token")
+            if liberado or partes:
+                descartar_busca(busca_web)
+            else:
+                log.info("[FALLBACK] Resposta não encontrada no manual. Partindo para a busca na web.")
+                FALLBACK_WEB.inc()
+                origem = 'web'
+                with cronometro.medir('web'):
+                    contexto_web = contexto_da_web(pergunta_atual, busca_web)
+                if contexto_web:
+                    for pedaco in gerar_resposta_em_stream(pergunta_atual, historico, contexto_web, "Web", idioma_detectado, resumo):
+                        partes.append(pedaco)
+                        yield evento_sse({"token": pedaco}, "token")
+                else:
+                    usar_cache = False
+                    origem = 'falha_web'
+                    resposta_falha = MENSAGENS_FALHA_WEB.get(idioma_detectado, MENSAGENS_FALHA_WEB['pt'])
+                    partes.append(resposta_falha)
+                    yield evento_sse({"token": resposta_falha}, "token")
+        except Exception as e:
+            log.warning(f"[STREAM] Erro durante a geração: {e}")
+            RESPOSTAS.inc(origem='erro')
+            yield evento_sse({"error": "Erro ao gerar a resposta."}, "erro")
+            return
+
+        resposta_final = "".join(partes)
+        if usar_cache:
+            CACHE_RESPOSTAS.guardar(pergunta_atual, idioma_detectado, contexto_manual, resposta_final)
+        RESPOSTAS.inc(origem=origem)
+        observar_etapa('total', cronometro.total())
+        yield evento_sse(encerrar_turno(id_conversa, pergunta_atual, resposta_final), "fim")
+
+    return Response(stream_with_context(eventos()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def responder_item_do_lote(pergunta, idioma, resultados, contexto_manual, corpus):
+    """Cascata de uma pergunta do lote (sem histórico); retorna (resposta, origem).
+
+    Sem busca especulativa: as perguntas do lote já rodam em paralelo entre si. As chamadas ao
+    LLM não passam pelas faixas do ADMISSAO, mas pelo limite próprio dos lotes (lote.vez_do_llm).
+    """
+    rota, _ = CASCATA.decidir(pergunta, resultados, corpus, idioma)
+    DECISOES_CASCATA.inc(rota=rota)
+    resposta = MENSAGENS_FALHA.get(idioma, MENSAGENS_FALHA['pt'])
+    if rota != WEB and contexto_manual:
+        with vez_do_llm():
+            resposta = obter_resposta_generativa(pergunta, [], contexto_manual, "Manual Técnico", idioma)
+
+    origem = 'manual'
+    if eh_mensagem_de_falha(resposta):
+        FALLBACK_WEB.inc()
+        contexto_web = buscar_na_web(pergunta)
+        if not contexto_web:
+            # Falha temporária da busca: fica fora do cache, como no /ask
+            return MENSAGENS_FALHA_WEB.get(idioma, MENSAGENS_FALHA_WEB['pt']), 'falha_web'
+        with vez_do_llm():
+            resposta = obter_resposta_generativa(pergunta, [], contexto_web, "Web", idioma)
+        origem = 'web'
+
+    if client is not None:
+        CACHE_RESPOSTAS.guardar(pergunta, idioma, contexto_manual, resposta)
+    return resposta, origem
+
+def linha_json(dados):
+    return json.dumps(dados, ensure_ascii=False) + "\n"
+
+def responder_lote(itens):
+    """Linhas JSON do /ask/batch, na ordem em que as respostas ficam prontas; a última é o resumo.
+
+    Perguntas repetidas são respondidas uma vez e repetidas na saída com o `id` de cada uma.
+    Respostas prontas, FAQ e cache saem primeiro; as demais passam pela recuperação em lote (uma
+    por conjunto de fontes) e pelo LLM em até LOTE_CONCORRENCIA threads.
+    """
+    inicio = time.perf_counter()
+    grupos = agrupar(itens)
+    PERGUNTAS_LOTE.inc(len(grupos), tipo='unica')
+    PERGUNTAS_LOTE.inc(len(itens) - len(grupos), tipo='repetida')
+    origens = Counter()
+
+    def linhas(grupo, idioma, resposta, origem):
+        origens[origem] += len(grupo)
+        RESPOSTAS.inc(len(grupo), origem=origem)
+        for item in grupo:
+            yield linha_json({"id": item.id, "question": item.pergunta, "answer": resposta,
+                              "origin": origem, "language": idioma})
+
+    # --- IDIOMA, RESPOSTAS PRONTAS E FAQ, PERGUNTA A PERGUNTA ---
+    base = BASE_CONHECIMENTO.atual
+    pendentes = {}
+    for (_, fontes), grupo in grupos.items():
+        pergunta = grupo[0].pergunta
+        idioma = detectar_idioma(pergunta)
+        intencao = detectar_intencao(pergunta)
+        if intencao:
+            yield from linhas(grupo, idioma, obter_resposta_pronta(intencao, idioma), 'intencao')
+            continue
+        resposta_faq = base.faq.buscar(pergunta, idioma, grupo[0].fontes)
+        if resposta_faq is not None:
+            yield from linhas(grupo, idioma, resposta_faq, 'faq')
+            continue
+        pendentes.setdefault(fontes, []).append((grupo, idioma))
+
+    executor = ThreadPoolExecutor(max_workers=CONCORRENCIA_LOTE, thread_name_prefix='lote')
+    try:
+        # --- RECUPERAÇÃO EM LOTE, CACHE E LLM EM PARALELO ---
+        tarefas = {}
+        for fontes, pendentes_das_fontes in pendentes.items():
+            todos_resultados = base.recuperador.buscar_lote(
+                [grupo[0].pergunta for grupo, _ in pendentes_das_fontes], top_k=3,
+                fontes=list(fontes) if fontes else None)
+            for (grupo, idioma), resultados in zip(pendentes_das_fontes, todos_resultados):
+                pergunta = grupo[0].pergunta
+                contexto_manual = montar_contexto(resultados)
+                if client is not None:
+                    resposta_em_cache = CACHE_RESPOSTAS.obter(pergunta, idioma, contexto_manual)
+                    if resposta_em_cache is not None:
+                        yield from linhas(grupo, idioma, resposta_em_cache, 'cache')
+                        continue
+                tarefa = executor.submit(responder_item_do_lote, pergunta, idioma, resultados, contexto_manual,
+                                         base.corpus)
+                tarefas[tarefa] = (grupo, idioma)
+
+        for tarefa in as_completed(tarefas):
+            grupo, idioma = tarefas[tarefa]
+            try:
+                resposta, origem = tarefa.result()
+            except Exception as e:
+                log.warning(f"[LOTE] Erro ao responder '{grupo[0].pergunta}': {e}")
+                origens['erro'] += len(grupo)
+                RESPOSTAS.inc(len(grupo), origem='erro')
+                for item in grupo:
+                    yield linha_json({"id": item.id, "question": item.pergunta, "error": "Erro ao gerar a resposta."})
+                continue
+            yield from linhas(grupo, idioma, resposta, origem)
+    finally:
+        # Cliente desconectou no meio: as perguntas que ainda não começaram não chegam ao LLM
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    segundos = time.perf_counter() - inicio
+    log.info(f"[LOTE] {len(itens)} perguntas ({len(grupos)} únicas) em {segundos:.1f}s")
+    yield linha_json({"summary": {"questions": len(itens), "unique": len(grupos), "origins": dict(origens),
+                                  "seconds": round(segundos, 3)}})
+
+@app.route('/ask/batch', methods=['POST'])
+def ask_assistant_batch():
+    """Várias perguntas numa requisição, respondidas em JSON Lines (application/x-ndjson).
+
+    Corpo: {"questions": ["...", {"id": ..., "question": "...", "sources": [...]}], "sources": [...]}.
+    Cada linha traz {"id", "question", "answer", "origin", "language"} (ou "error"); a última,
+    {"summary": {...}}. Sem histórico nem conversation_id: cada pergunta é independente.
+    """
+    try:
+        itens = ler_itens(request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Um lote ocupa uma thread até a última linha; sem vaga, o errorhandler devolve 503 com Retry-After
+    FAIXA_LOTES.entrar()
+    resposta = Response(responder_lote(itens), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    resposta.call_on_close(FAIXA_LOTES.sair)
+    return resposta
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
\ No newline at end of file
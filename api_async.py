@@ -0,0 +1,344 @@
+"""Modo de serviço assíncrono (ASGI) do assistente.
+
+Mesmas rotas do api.py, mas as chamadas à Groq, ao DuckDuckGo e o download das páginas são
+feitos com asyncio. Um worker atende várias perguntas ao mesmo tempo enquanto espera a rede,
+então as perguntas que caem na busca web não seguram as que o manual responde rápido.
+
+Para rodar:
+    gunicorn -k uvicorn.workers.UvicornWorker api_async:app
+ou, em desenvolvimento:
+    uvicorn api_async:app --port 5000
+"""
+import asyncio
+import os
+import time
+
+import httpx
+from quart import Quart, Response, jsonify, request
+from quart_cors import cors
+
+import api
+from nucleo import registro
+from nucleo.admissao import RequisicaoRecusada, identificar_cliente
+from nucleo.cascata import ESPECULAR, WEB, especular_async
+from nucleo.cronometro import Cronometro
+from nucleo.idioma import detectar_idioma
+from nucleo.intencoes import detectar_intencao
+from nucleo.llm import GatewayLLMAsync
+from nucleo.metricas import (BUSCAS_ESPECULATIVAS, DECISOES_CASCATA, FALLBACK_WEB, METRICAS, RESPOSTAS, TIPO_CONTEUDO,
+                              observar_etapa)
+from nucleo.respostas import MENSAGENS_FALHA, MENSAGENS_FALHA_WEB, eh_mensagem_de_falha, obter_resposta_pronta
+from nucleo.web import PRAZO_TOTAL_WEB, TIMEOUT_POR_HOST, buscar_links, coletar_artigos_async
+
+# Limite de conexões de saída abertas ao mesmo tempo por worker
+LIMITE_CONEXOES_WEB = int(os.environ.get("LIMITE_CONEXOES_WEB", "50"))
+
+log = registro.obter('api_async')
+
+app = Quart(__name__)
+app = cors(app, allow_origin=["https://consolemix.com.br", "http://consolemix.com.br", "http://localhost", "http://127.0.0.1"])
+
+cliente_groq = None
+cliente_http = None
+
+
+@app.before_serving
+async def iniciar_clientes():
+    global cliente_groq, cliente_http
+    cliente_http = httpx.AsyncClient(
+        timeout=TIMEOUT_POR_HOST,
+        follow_redirects=True,
+        limits=httpx.Limits(max_connections=LIMITE_CONEXOES_WEB),
+    )
+    try:
+        # Prazo, novas tentativas, limite de concorrência e coalescência, como o api.client
+        cliente_groq = GatewayLLMAsync()
+        log.info("Cliente assíncrono da API da Groq configurado.")
+    except Exception as e:
+        log.error(f"ERRO: Chave da API da Groq não encontrada. Configure a variável de ambiente. Erro: {e}")
+        cliente_groq = None
+
+
+@app.after_serving
+async def encerrar_clientes():
+    if cliente_http is not None:
+        await cliente_http.aclose()
+    if cliente_groq is not None:
+        await cliente_groq.fechar()
+
+
+@app.before_request
+async def verificar_base_conhecimento():
+    api.BASE_CONHECIMENTO.verificar()
+
+
+async def buscar_na_web(pergunta):
+    """Versão assíncrona de api.buscar_na_web."""
+    log.debug(f"[WEB SEARCH] Iniciando busca na web para: '{pergunta}'")
+    limite = time.monotonic() + PRAZO_TOTAL_WEB
+    try:
+        # A biblioteca do DuckDuckGo é síncrona: roda numa thread para não travar o loop
+        resultados_links = await asyncio.wait_for(
+            asyncio.to_thread(buscar_links, pergunta, 3, 'br-pt', min(TIMEOUT_POR_HOST, PRAZO_TOTAL_WEB)),
+            timeout=PRAZO_TOTAL_WEB)
+    except asyncio.TimeoutError:
+        log.warning(f"[WEB SEARCH] Prazo de {PRAZO_TOTAL_WEB:.1f}s esgotado na busca")
+        return None
+    except Exception as e:
+        log.warning(f"[WEB SEARCH] Erro na busca: {e}")
+        return None
+
+    if not resultados_links:
+        log.info("[WEB SEARCH] Nenhum resultado encontrado no DuckDuckGo")
+        return None
+
+    artigos = await coletar_artigos_async(cliente_http, resultados_links, quantidade=1,
+                                          prazo=limite - time.monotonic())
+    if not artigos:
+        log.info("[WEB SEARCH] Não foi possível extrair conteúdo útil de nenhum resultado")
+        return None
+    return artigos[0][1]
+
+
+async def gerar_resposta_em_stream(pergunta_atual, historico, contexto, fonte_do_contexto, idioma='pt', resumo=""):
+    """Versão assíncrona de api.gerar_resposta_em_stream."""
+    if not cliente_groq:
+        yield "O serviço de IA não está configurado."
+        return
+    if not contexto:
+        yield MENSAGENS_FALHA.get(idioma, MENSAGENS_FALHA['pt'])
+        return
+
+    prompt_completo = api.ORCAMENTO.montar_prompt(pergunta_atual, historico, contexto, fonte_do_contexto, idioma, resumo)
+    if prompt_completo is None:
+        yield MENSAGENS_FALHA.get(idioma, MENSAGENS_FALHA['pt'])
+        return
+    async for pedaco in cliente_groq.transmitir([{"role": "user", "content": prompt_completo}]):
+        yield pedaco
+
+
+async def responder(pergunta_atual, historico, fontes=None, resumo="", cliente=None):
+    """Cascata manual → web do /ask. Gera ('token', texto) para cada pedaço e ('fim', resposta) no final.
+
+    Com `cliente`, as perguntas que vão gastar LLM ou busca passam pelo limite por cliente do
+    api.ADMISSAO e levantam RequisicaoRecusada quando ele estoura. As faixas não se aplicam: aqui
+    uma pergunta esperando não segura thread nenhuma.
+    """
+    cronometro = Cronometro(ao_medir=observar_etapa)
+    with cronometro.medir('idioma'):
+        idioma_detectado = detectar_idioma(pergunta_atual)
+
+    with cronometro.medir('intencao'):
+        intencao = detectar_intencao(pergunta_atual)
+    if intencao:
+        resposta_final = obter_resposta_pronta(intencao, idioma_detectado)
+        RESPOSTAS.inc(origem='intencao')
+        yield 'token', resposta_final
+        yield 'fim', resposta_final
+        return
+
+    base = api.BASE_CONHECIMENTO.atual
+    resposta_faq = None
+    if api.reaproveitavel(pergunta_atual, historico):
+        with cronometro.medir('faq'):
+            resposta_faq = base.faq.buscar(pergunta_atual, idioma_detectado, fontes)
+    if resposta_faq is not None:
+        RESPOSTAS.inc(origem='faq')
+        yield 'token', resposta_faq
+        yield 'fim', resposta_faq
+        return
+
+    # O BM25 é rápido; a busca semântica pode usar o modelo, então vai para uma thread
+    with cronometro.medir('recuperacao'):
+        resultados = await asyncio.to_thread(base.recuperador.buscar, pergunta_atual, top_k=3, fontes=fontes)
+        contexto_manual = api.montar_contexto(resultados)
+    usar_cache = cliente_groq is not None and api.reaproveitavel(pergunta_atual, historico)
+    if usar_cache:
+        with cronometro.medir('cache'):
+            resposta_em_cache = api.CACHE_RESPOSTAS.obter(pergunta_atual, idioma_detectado, contexto_manual)
+        if resposta_em_cache is not None:
+            RESPOSTAS.inc(origem='cache')
+            yield 'token', resposta_em_cache
+            yield 'fim', resposta_em_cache
+            return
+
+    # Mesma regra do api.escolher_rota; na rota ESPECULAR a busca web roda como task enquanto o manual gera
+    rota, confianca = api.CASCATA.decidir(pergunta_atual, resultados, base.corpus, idioma_detectado)
+    DECISOES_CASCATA.inc(rota=rota)
+    log.debug(f"[CASCATA] Rota '{rota}' (confiança do manual: {confianca:.2f})")
+    if cliente is not None:
+        api.ADMISSAO.verificar_cliente(api.FAIXA_DA_ROTA[rota], cliente)
+    busca_web = especular_async(buscar_na_web, pergunta_atual) if rota == ESPECULAR else None
+
+    partes = []
+    origem = 'manual'
+    buffer = ""
+    liberado = False
+    try:
+        if rota != WEB:
+            async for pedaco in gerar_resposta_em_stream(pergunta_atual, historico, contexto_manual, "Manual Técnico", idioma_detectado, resumo):
+                if liberado:
+                    partes.append(pedaco)
+                    yield 'token', pedaco
+                    continue
+                buffer += pedaco
+                if len(buffer.strip()) >= api.TAMANHO_BUFFER_FALHA and not eh_mensagem_de_falha(buffer):
+                    liberado = True
+                    partes.append(buffer)
+                    yield 'token', buffer
+    except BaseException:
+        if busca_web is not None:
+            busca_web.cancel()
+        raise
+
+    if not liberado and buffer and not eh_mensagem_de_falha(buffer):
+        partes.append(buffer)
+        yield 'token', buffer
+    if liberado or partes:
+        if busca_web is not None:
+            busca_web.cancel()
+            BUSCAS_ESPECULATIVAS.inc(resultado='descartada')
+    else:
+        log.info("[FALLBACK] Resposta não encontrada no manual. Partindo para a busca na web.")
+        FALLBACK_WEB.inc()
+        origem = 'web'
+        with cronometro.medir('web'):
+            if busca_web is not None:
+                BUSCAS_ESPECULATIVAS.inc(resultado='usada')
+                contexto_web = await busca_web
+            else:
+                contexto_web = await buscar_na_web(pergunta_atual)
+        if contexto_web:
+            async for pedaco in gerar_resposta_em_stream(pergunta_atual, historico, contexto_web, "Web", idioma_detectado, resumo):
+                partes.append(pedaco)
+                yield 'token', pedaco
+        else:
+            usar_cache = False
+            origem = 'falha_web'
+            resposta_falha = MENSAGENS_FALHA_WEB.get(idioma_detectado, MENSAGENS_FALHA_WEB['pt'])
+            partes.append(resposta_falha)
+            yield 'token', resposta_falha
+
+    resposta_final = "".join(partes)
+    if usar_cache:
+        api.CACHE_RESPOSTAS.guardar(pergunta_atual, idioma_detectado, contexto_manual, resposta_final)
+    RESPOSTAS.inc(origem=origem)
+    observar_etapa('total', cronometro.total())
+    yield 'fim', resposta_final
+
+
+@app.errorhandler(RequisicaoRecusada)
+async def recusar_pergunta(recusa):
+    idioma = api.idioma_do_pedido(await request.get_json(silent=True))
+    mensagem = api.mensagem_de_recusa(recusa, idioma)
+    status = 429 if recusa.motivo == 'limite_cliente' else 503
+    return jsonify({"error": mensagem, "answer": mensagem}), status, {"Retry-After": str(recusa.espera)}
+
+
+def cliente_da_requisicao():
+    return identificar_cliente(request.remote_addr, request.headers)
+
+
+@app.route('/')
+async def health_check():
+    return "API do assistente especialista (modo assíncrono) está no ar!"
+
+
+@app.route('/metrics')
+async def metricas():
+    """Mesmas métricas do api.metricas (os módulos do nucleo contam nos mesmos registros)."""
+    return Response(METRICAS.exportar(), content_type=TIPO_CONTEUDO)
+
+
+@app.route('/ask', methods=['POST'])
+async def ask_assistant():
+    data = await request.get_json()
+    if not data or 'question' not in data:
+        return jsonify({"error": "A pergunta (question) é obrigatória."}), 400
+
+    id_conversa, historico, resumo = api.carregar_conversa(data)
+    resposta_final = ""
+    try:
+        async for tipo, conteudo in responder(data['question'], historico, data.get('sources'), resumo,
+                                              cliente_da_requisicao()):
+            if tipo == 'fim':
+                resposta_final = conteudo
+    except RequisicaoRecusada:
+        raise
+    except Exception:
+        RESPOSTAS.inc(origem='erro')
+        raise
+    return jsonify(api.encerrar_turno(id_conversa, data['question'], resposta_final))
+
+
+@app.route('/ask/stream', methods=['POST'])
+async def ask_assistant_stream():
+    """Mesmo protocolo de eventos do api.ask_assistant_stream."""
+    data = await request.get_json()
+    if not data or 'question' not in data:
+        return jsonify({"error": "A pergunta (question) é obrigatória."}), 400
+
+    id_conversa, historico, resumo = api.carregar_conversa(data)
+    cliente = cliente_da_requisicao()
+
+    async def eventos():
+        try:
+            async for tipo, conteudo in responder(data['question'], historico, data.get('sources'), resumo, cliente):
+                if tipo == 'token':
+                    yield api.evento_sse({"token": conteudo}, "token")
+                else:
+                    yield api.evento_sse(api.encerrar_turno(id_conversa, data['question'], conteudo), "fim")
+        except RequisicaoRecusada as recusa:
+            # O stream já começou: a recusa vai como resposta, como no api.ask_assistant_stream
+            mensagem = api.mensagem_de_recusa(recusa, detectar_idioma(data['question']))
+            yield api.evento_sse({"token": mensagem}, "token")
+            yield api.evento_sse({"answer": mensagem, "retry_after": recusa.espera}, "fim")
+        except Exception as e:
+            log.warning(f"[STREAM] Erro durante a geração: {e}")
+            RESPOSTAS.inc(origem='erro')
+            yield api.evento_sse({"error": "Erro ao gerar a resposta."}, "erro")
+
+    resposta = Response(eventos(), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    resposta.timeout = None  # o stream pode durar mais que o timeout padrão do Quart
+    return resposta
+
+
+@app.route('/ask/batch', methods=['POST'])
+async def ask_assistant_batch():
+    """Mesmo protocolo do api.ask_assistant_batch.
+
+    A recuperação em lote e as chamadas paralelas ao LLM são as do api.responder_lote (threads,
+    cliente síncrono); cada linha pronta é lida numa thread para não travar o loop.
+    """
+    try:
+        itens = api.ler_itens(await request.get_json(silent=True))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    # Sem vaga, o errorhandler devolve 503 com Retry-After, como no api.py
+    api.FAIXA_LOTES.entrar()
+
+    async def linhas():
+        gerador = api.responder_lote(itens)
+        try:
+            while True:
+                linha = await asyncio.to_thread(next, gerador, None)
+                if linha is None:
+                    break
+                yield linha
+        finally:
+            api.FAIXA_LOTES.sair()
+            try:
+                gerador.close()
+            except ValueError:
+                # Cliente desconectou com uma linha sendo gerada na thread: o gerador fecha quando for coletado
+                pass
+
+    resposta = Response(linhas(), mimetype='application/x-ndjson',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    resposta.timeout = None
+    return resposta
+
+
+if __name__ == '__main__':
+    app.run(debug=True, port=5000)
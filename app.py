@@ -1,167 +1,42 @@
 import streamlit as st
-import faiss
-import numpy as np
 import os
 import pickle
-from groq import Groq
-from sentence_transformers import SentenceTransformer
-from duckduckgo_search import DDGS
-from trafilatura import fetch_url, extract
-import time
-import re
+from nucleo.codificador import carregar_codificador
+from nucleo.dependencias import ModuloPreguicoso
+from nucleo.idioma import detectar_idioma
+from nucleo.indice_denso import MODELO_EMBEDDING, NOME_ARQUIVO_CHUNKS, NOME_ARQUIVO_INDICE
+from nucleo.intencoes import detectar_intencao
+from nucleo.llm import GatewayLLM
+from nucleo.orcamento import OrcamentoTokens
+from nucleo.relevancia import criar_portao_relevancia, julgar_com_llm
+from nucleo.respostas import MENSAGENS_FALHA, MENSAGENS_FALHA_WEB, obter_resposta_pronta
+from nucleo.web import buscar_links, coletar_artigos
+
+# Só carregados se existir um índice para consultar
+faiss = ModuloPreguicoso('faiss')
 
 # --- Configurações Iniciais ---
 st.set_page_config(page_title="Assistente Especialista IA", page_icon="🧠")
 
-NOME_MANUAL_LIMPO = "manual_limpo.txt"
-NOME_ARQUIVO_INDICE = "indice_faiss.bin"
-NOME_ARQUIVO_CHUNKS = "chunks.pkl"
-MODELO_EMBEDDING = 'paraphrase-multilingual-MiniLM-L12-v2'
+# Os artefatos de busca são gerados por construir_indice.py
 
 # Configura o cliente da API da Groq
 try:
-    client = Groq(api_key=st.secrets["GROQ_API_KEY"])
+    client = GatewayLLM(api_key=st.secrets["GROQ_API_KEY"])
 except Exception:
     st.error("Chave de API da Groq não encontrada. Por favor, configure o arquivo .streamlit/secrets.toml")
     st.stop()
 
+# Limita o tamanho do prompt (contexto do manual e artigos da web)
+ORCAMENTO = OrcamentoTokens()
 
-# --- Funções de Cache e Busca ---
 
-def detectar_idioma(texto):
-    """Detecta o idioma do texto (pt, es, en) com alta precisão."""
-    texto_lower = texto.lower()
-    texto_com_espacos = f' {texto_lower} '
-
-    # Padrões EXCLUSIVOS de cada idioma (peso 5)
-    exclusivos_es = ['el ', ' la ', ' del ', ' al ', ' los ', ' las ', ' es ', ' son ', 'cuánto', 'cuanto', 'cómo', 'qué', 'que ', 'está', 'cuál', 'cual']
-    exclusivos_pt = [' o ', ' a ', ' do ', ' da ', ' ao ', ' os ', ' as ', ' não', ' nao', ' são', ' sao', ' tem ', ' qual ', ' você', ' voce', ' é ']
-    exclusivos_en = [' the ', ' does ', ' which ', ' that ', ' this ', ' these ', ' those ', ' have ', ' has ', ' is ', ' are ']
-
-    # Verbos típicos (peso 3)
-    verbos_es = ['cuesta', 'hacer', 'configurar', 'tiene', 'es']
-    verbos_pt = ['custa', 'fazer', 'configurar', 'tem', 'é']
-    verbos_en = ['cost', 'costs', 'make', 'configure', 'has', 'have', 'is', 'are']
-
-    # Palavras comuns (peso 1)
-    comuns_pt = ['para', 'com', 'em', 'de', 'como', 'por']
-    comuns_es = ['para', 'con', 'en', 'de', 'como', 'por']
-    comuns_en = ['to', 'for', 'in', 'of', 'how', 'with']
-
-    # Inicializa scores
-    score_pt = 0
-    score_es = 0
-    score_en = 0
-
-    # Conta exclusivos (peso alto)
-    score_es += sum(5 for palavra in exclusivos_es if palavra in texto_com_espacos)
-    score_pt += sum(5 for palavra in exclusivos_pt if palavra in texto_com_espacos)
-    score_en += sum(5 for palavra in exclusivos_en if palavra in texto_com_espacos)
-
-    # Conta verbos (peso médio)
-    score_es += sum(3 for verbo in verbos_es if verbo in texto_lower)
-    score_pt += sum(3 for verbo in verbos_pt if verbo in texto_lower)
-    score_en += sum(3 for verbo in verbos_en if verbo in texto_lower)
-
-    # Conta palavras comuns (peso baixo)
-    score_pt += sum(1 for palavra in comuns_pt if palavra in texto_com_espacos)
-    score_es += sum(1 for palavra in comuns_es if palavra in texto_com_espacos)
-    score_en += sum(1 for palavra in comuns_en if palavra in texto_com_espacos)
-
-    # Regras de desempate específicas
-    # Se tem artigos "el" ou "la" sozinhos, muito provável ser espanhol
-    if ' el ' in texto_com_espacos or ' los ' in texto_com_espacos:
-        score_es += 3
-    if ' del ' in texto_com_espacos or ' al ' in texto_com_espacos:
-        score_es += 3
-
-    # Se tem "the", muito provável ser inglês
-    if ' the ' in texto_com_espacos:
-        score_en += 3
-
-    # Se tem "o" ou "a" sozinhos seguidos de substantivo, provável ser português
-    if ' o ' in texto_com_espacos or ' os ' in texto_com_espacos:
-        score_pt += 2
-    if ' do ' in texto_com_espacos or ' da ' in texto_com_espacos or ' ao ' in texto_com_espacos:
-        score_pt += 3
-
-    # Retorna o idioma com maior score
-    if score_es > score_pt and score_es > score_en:
-        return 'es'
-    elif score_en > score_pt and score_en > score_es:
-        return 'en'
-    else:
-        return 'pt'  # Padrão é português
-
-def verificar_pergunta_sobre_valores(pergunta):
-    """Verifica se a pergunta é sobre valores/preços/licença em qualquer idioma."""
-    # Português
-    palavras_pt = ['valor', 'preco', 'preço', 'quanto custa', 'custa', 'custo',
-                   'licenca', 'licença', 'plano', 'planos', 'mensalidade',
-                   'assinatura', 'pagar', 'pagamento', 'reais', 'r$']
-    # Espanhol
-    palavras_es = ['valor', 'precio', 'cuánto cuesta', 'cuesta', 'costo',
-                   'licencia', 'plan', 'planes', 'mensualidad',
-                   'suscripción', 'pagar', 'pago']
-    # Inglês
-    palavras_en = ['value', 'price', 'how much', 'cost', 'costs',
-                   'license', 'plan', 'plans', 'monthly', 'subscription',
-                   'pay', 'payment', 'pricing']
-
-    pergunta_lower = pergunta.lower()
-    todas_palavras = palavras_pt + palavras_es + palavras_en
-    return any(palavra in pergunta_lower for palavra in todas_palavras)
-
-def obter_resposta_valores(idioma):
-    """Retorna a resposta sobre valores no idioma especificado."""
-    respostas = {
-        'pt': """Para informações sobre valores, planos e licenças do Console Mix, entre em contato diretamente com nossa equipe de suporte:
-
-📞 Telefones:
-• (42) 99985-3754
-• (42) 99848-8284
-
-🕒 Horário de Atendimento:
-Segunda a Sexta, das 9h às 18h (horário de Brasília)
-
-🌐 Site:
-consolemix.com.br/console
-
-Nossa equipe terá prazer em apresentar as melhores opções de planos para você!""",
-
-        'es': """Para información sobre precios, planes y licencias de Console Mix, póngase en contacto directamente con nuestro equipo de soporte:
-
-📞 Teléfonos:
-• (42) 99985-3754
-• (42) 99848-8284
-
-🕒 Horario de Atención:
-Lunes a Viernes, de 9h a 18h (horario de Brasilia)
-
-🌐 Sitio web:
-consolemix.com.br/console
-
-¡Nuestro equipo estará encantado de presentarle las mejores opciones de planes para usted!""",
-
-        'en': """For information about pricing, plans and licenses for Console Mix, please contact our support team directly:
-
-📞 Phone numbers:
-• (42) 99985-3754
-• (42) 99848-8284
-
-🕒 Business Hours:
-Monday to Friday, 9am to 6pm (Brasilia time)
-
-🌐 Website:
-consolemix.com.br/console
-
-Our team will be happy to present you with the best plan options!"""
-    }
-    return respostas.get(idioma, respostas['pt'])
+# --- Funções de Cache e Busca ---
 
 @st.cache_resource
 def carregar_modelo_embedding():
-    return SentenceTransformer(MODELO_EMBEDDING)
+    # SentenceTransformer, ou o ONNX int8 de construir_indice.py --onnx com RECUPERACAO_CODIFICADOR=onnx
+    return carregar_codificador(MODELO_EMBEDDING)
 
 @st.cache_data
 def carregar_recursos_busca(_timestamp):
@@ -173,52 +48,51 @@ def carregar_recursos_busca(_timestamp):
     return None, None
 
 def buscar_contexto_local(pergunta, modelo_emb, indice, chunks, top_k=3):
-    if indice is None: return ""
+    """Retorna (contexto, similaridade de cosseno do melhor chunk)."""
+    if indice is None: return "", None
     pergunta_embedding = modelo_emb.encode([pergunta], normalize_embeddings=True)
     distancias, indices = indice.search(pergunta_embedding.astype('float32'), top_k)
     
     if distancias[0][0] > 1.0: 
-        return ""
+        return "", None
 
     contexto = "\n\n---\n\n".join([chunks[i] for i in indices[0]])
-    return contexto
+    # Distância L2 ao quadrado entre vetores unitários: d = 2 - 2cos
+    similaridade = 1.0 - float(distancias[0][0]) / 2.0
+    return contexto, similaridade
 
 @st.cache_data
 def buscar_na_web(pergunta, num_artigos=3):
     query = f"{pergunta}"
-    contextos_web, urls_usadas = [], []
     try:
-        with DDGS() as ddgs:
-            resultados_links = list(ddgs.text(query, max_results=5, region='br-pt'))
-            if not resultados_links:
-                st.warning("Nenhum resultado encontrado no DuckDuckGo")
-                return None, []
-
-            for i, link in enumerate(resultados_links[:num_artigos]):
-                url = link['href']
-                st.write(f"Lendo artigo {i+1}: {url}")
-                try:
-                    downloaded = fetch_url(url)
-                    if downloaded:
-                        texto_artigo = extract(downloaded, include_comments=False, include_tables=False)
-                        if texto_artigo and len(texto_artigo) > 200:
-                            contexto_formatado = f"Fonte {i+1}: {link['title']}\nURL: {url}\nCONTEÚDO: {texto_artigo[:2500]}..."
-                            contextos_web.append(contexto_formatado)
-                            urls_usadas.append(link['href'])
-                except Exception as e:
-                    st.warning(f"Erro ao processar {url}: {str(e)}")
-                    continue
-                time.sleep(0.2)
-
-            if not contextos_web:
-                st.warning("Não foi possível extrair conteúdo útil de nenhum resultado")
-                return None, []
-
-            return "\n\n===\n\n".join(contextos_web), urls_usadas
+        resultados_links = buscar_links(query, max_resultados=5, regiao='br-pt')
     except Exception as e:
         st.error(f"Erro na busca web: {str(e)}")
         return None, []
 
+    if not resultados_links:
+        st.warning("Nenhum resultado encontrado no DuckDuckGo")
+        return None, []
+
+    # Lê todos os artigos em paralelo e usa os primeiros num_artigos que chegarem com conteúdo
+    st.write(f"Lendo {len(resultados_links)} artigos em paralelo...")
+    artigos = coletar_artigos(resultados_links, quantidade=num_artigos, tamanho_minimo=200)
+    if not artigos:
+        st.warning("Não foi possível extrair conteúdo útil de nenhum resultado")
+        return None, []
+
+    # Cada artigo fica só com as frases mais relevantes, dividindo o orçamento de contexto entre eles
+    # (com folga para o título e a URL de cada fonte)
+    maximo_por_artigo = max(ORCAMENTO.maximo_contexto // len(artigos) - 50, 100)
+    contextos_web, urls_usadas = [], []
+    for i, (link, texto_artigo) in enumerate(artigos):
+        texto_artigo = ORCAMENTO.comprimir(pergunta, texto_artigo, maximo_por_artigo)
+        contexto_formatado = f"Fonte {i+1}: {link['title']}\nURL: {link['href']}\nCONTEÚDO: {texto_artigo}"
+        contextos_web.append(contexto_formatado)
+        urls_usadas.append(link['href'])
+
+    return "\n\n===\n\n".join(contextos_web), urls_usadas
+
 
 # --- Funções do "Especialista" Generativo ---
 
@@ -227,76 +101,35 @@ def buscar_na_web(pergunta, num_artigos=3):
 def contexto_e_relevante(pergunta, contexto):
     if not contexto:
         return False
-    
-    prompt = f"""
-    Analise a PERGUNTA e o CONTEXTO a seguir. O contexto contém informação suficiente para responder a pergunta de forma satisfatória?
-    Responda APENAS com a palavra 'SIM' ou 'NÃO'.
-
-    PERGUNTA: "{pergunta}"
-
-    CONTEXTO: "{contexto}"
-    """
     try:
-        chat_completion = client.chat.completions.create(
-            messages=[{"role": "user", "content": prompt}],
-            model="llama-3.1-8b-instant",
-            temperature=0, # Baixa temperatura para respostas mais diretas
-        )
-        resposta = chat_completion.choices[0].message.content.strip().upper()
-        return "SIM" in resposta
+        return julgar_com_llm(client, pergunta, contexto)
     except Exception:
         return False
 
 
+# Só chama o contexto_e_relevante (LLM) quando a similaridade fica na faixa duvidosa
+portao_relevancia = criar_portao_relevancia(juiz=contexto_e_relevante)
+
+
 def obter_resposta_generativa(pergunta, contexto, fonte, idioma='pt'):
-    # Instruções de idioma
-    instrucoes_idioma = {
-        'pt': "Leia o contexto e sintetize uma resposta clara e útil em português.",
-        'es': "Lea el contexto y sintetice una respuesta clara y útil en español.",
-        'en': "Read the context and synthesize a clear and helpful response in English."
-    }
-
-    mensagens_falha = {
-        'pt': "Não encontrei uma resposta para isso.",
-        'es': "No encontré una respuesta para esto.",
-        'en': "I didn't find an answer for this."
-    }
-
-    instrucao = instrucoes_idioma.get(idioma, instrucoes_idioma['pt'])
-    msg_falha = mensagens_falha.get(idioma, mensagens_falha['pt'])
-
-    prompt = f"""
-    Aja como um assistente técnico especialista. Sua tarefa é responder a PERGUNTA do usuário.
-    A resposta DEVE ser baseada exclusivamente no CONTEXTO fornecido, que veio da fonte: '{fonte}'.
-    - {instrucao}
-    - Não invente informações. Se a resposta não estiver no contexto, diga "{msg_falha}".
-
-    ---
-    CONTEXTO:
-    {contexto}
-    ---
-    PERGUNTA DO USUÁRIO:
-    {pergunta}
-    ---
-    RESPOSTA DETALHADA:
-    """
-    chat_completion = client.chat.completions.create(
-        messages=[{"role": "user", "content": prompt}],
-        model="llama-3.1-8b-instant",
-    )
-    return chat_completion.choices[0].message.content
+    prompt = ORCAMENTO.montar_prompt_relatorio(pergunta, contexto, fonte, idioma)
+    if prompt is None:
+        return MENSAGENS_FALHA.get(idioma, MENSAGENS_FALHA['pt'])
+    return client.completar([{"role": "user", "content": prompt}])
 
 
 # --- APLICAÇÃO STREAMLIT ---
 st.title("🧠 Assistente de Pesquisa Especialista")
 st.caption("Com tomada de decisão inteligente sobre as fontes de informação")
 
-# Carrega os recursos
-modelo_embedding_instance = carregar_modelo_embedding()
+# Carrega os recursos (o modelo de embedding só é carregado se houver índice para consultar)
+modelo_embedding_instance = None
 indice_faiss, chunks = (None, None)
-if os.path.exists(NOME_MANUAL_LIMPO):
-    file_timestamp = os.path.getmtime(NOME_MANUAL_LIMPO)
+if os.path.exists(NOME_ARQUIVO_INDICE):
+    # O timestamp do índice invalida o cache sempre que construir_indice.py gera uma versão nova
+    file_timestamp = os.path.getmtime(NOME_ARQUIVO_INDICE)
     indice_faiss, chunks = carregar_recursos_busca(file_timestamp)
+    modelo_embedding_instance = carregar_modelo_embedding()
 
 # Lógica do Chat
 if "messages" not in st.session_state:
@@ -318,16 +151,18 @@ if prompt := st.chat_input("Qual é a sua dúvida sobre áudio?"):
         # --- DETECÇÃO DE IDIOMA ---
         idioma_detectado = detectar_idioma(prompt)
 
-        # --- VERIFICAÇÃO DE PERGUNTAS SOBRE VALORES ---
-        if verificar_pergunta_sobre_valores(prompt):
-            resposta_final = obter_resposta_valores(idioma_detectado)
+        # --- PERGUNTAS COM RESPOSTA PRONTA (VALORES, HORÁRIO DO SUPORTE, DOWNLOADS) ---
+        intencao = detectar_intencao(prompt)
+        if intencao:
+            resposta_final = obter_resposta_pronta(intencao, idioma_detectado)
             st.markdown(resposta_final)
         else:
             with st.spinner("Consultando o manual..."):
-                contexto_manual = buscar_contexto_local(prompt, modelo_embedding_instance, indice_faiss, chunks)
+                contexto_manual, similaridade_manual = buscar_contexto_local(prompt, modelo_embedding_instance, indice_faiss, chunks)
 
             # --- NOVA LÓGICA DE DECISÃO INTELIGENTE ---
-            if contexto_e_relevante(prompt, contexto_manual):
+            manual_relevante, _ = portao_relevancia.decidir(prompt, contexto_manual, similaridade_manual)
+            if manual_relevante:
                 fonte_usada = "Manual Técnico"
                 contexto_final = contexto_manual
                 with st.expander(f"🔬 Fonte Utilizada ({fonte_usada})"):
@@ -348,16 +183,9 @@ if prompt := st.chat_input("Qual é a sua dúvida sobre áudio?"):
                     with st.spinner("O especialista está analisando os artigos e pensando na resposta..."):
                         resposta_final = obter_resposta_generativa(prompt, contexto_web, fonte_usada, idioma_detectado)
                 else:
-                    # Busca web falhou - Re-detecta idioma para garantir precisão
-                    idioma_final = detectar_idioma(prompt)
-                    st.warning(f"Busca na web falhou. Idioma detectado: {idioma_final}")
-
-                    mensagens_falha_web = {
-                        'pt': "Desculpe, não encontrei informações sobre isso no manual e também não consegui buscar na internet no momento. Por favor, tente reformular sua pergunta ou entre em contato com o suporte.",
-                        'es': "Lo siento, no encontré información sobre esto en el manual y tampoco pude buscar en Internet en este momento. Por favor, intente reformular su pregunta o póngase en contacto con el soporte.",
-                        'en': "Sorry, I couldn't find information about this in the manual and I was unable to search the internet at this time. Please try rephrasing your question or contact support."
-                    }
-                    resposta_final = mensagens_falha_web.get(idioma_final, mensagens_falha_web['pt'])
+                    # Busca web falhou - o idioma detectado no início continua valendo
+                    st.warning(f"Busca na web falhou. Idioma detectado: {idioma_detectado}")
+                    resposta_final = MENSAGENS_FALHA_WEB.get(idioma_detectado, MENSAGENS_FALHA_WEB['pt'])
 
             if urls_usadas_na_resposta:
                 fontes_formatadas = "\n\n---\n*Fontes da web consultadas:*\n"
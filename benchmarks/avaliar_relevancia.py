@@ -0,0 +1,131 @@
+"""Avalia o portão de relevância (nucleo/relevancia.py) contra o juiz LLM em pares rotulados.
+
+Uso: python benchmarks/avaliar_relevancia.py [--llm] [--reranqueador MODELO]
+
+Cada linha de benchmarks/dados/pares_relevancia.jsonl tem uma pergunta, um trecho que
+identifica o chunk (ou null para usar o melhor chunk da busca, como o app.py faz) e o rótulo
+esperado. --llm também mede o juiz antigo (requer GROQ_API_KEY).
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo.indice_denso import MODELO_EMBEDDING, coletar_chunks  # noqa: E402
+from nucleo.relevancia import PortaoRelevancia, Reranqueador, julgar_com_llm  # noqa: E402
+
+
+def carregar_pares(modelo, chunks):
+    """Resolve o chunk de cada par e calcula a similaridade pergunta x chunk."""
+    with open(os.path.join(RAIZ, 'benchmarks', 'dados', 'pares_relevancia.jsonl'), encoding='utf-8') as f:
+        pares = [json.loads(linha) for linha in f if linha.strip()]
+
+    vetores_chunks = modelo.encode(chunks, normalize_embeddings=True, convert_to_numpy=True, batch_size=64)
+    vetores_perguntas = modelo.encode([p['pergunta'] for p in pares], normalize_embeddings=True, convert_to_numpy=True)
+
+    for par, vetor in zip(pares, vetores_perguntas):
+        similaridades = vetores_chunks @ vetor
+        if par['trecho']:
+            candidatos = [i for i, chunk in enumerate(chunks) if par['trecho'] in chunk]
+            if not candidatos:
+                raise SystemExit(f"Trecho não encontrado em nenhum chunk: {par['trecho']!r}")
+            idx = candidatos[0]
+        else:
+            idx = int(np.argmax(similaridades))
+        par['contexto'] = chunks[idx]
+        par['similaridade'] = float(similaridades[idx])
+    return pares
+
+
+def avaliar(nome, decidir, pares):
+    acertos = vp = fp = fn = 0
+    etapas = {}
+    inicio = time.perf_counter()
+    for par in pares:
+        relevante, etapa = decidir(par)
+        etapas[etapa] = etapas.get(etapa, 0) + 1
+        acertos += relevante == par['relevante']
+        vp += relevante and par['relevante']
+        fp += relevante and not par['relevante']
+        fn += not relevante and par['relevante']
+    decorrido = time.perf_counter() - inicio
+
+    precisao = vp / (vp + fp) if vp + fp else 0.0
+    revocacao = vp / (vp + fn) if vp + fn else 0.0
+    print(f"{nome:<22} acurácia = {acertos / len(pares):6.1%}  precisão = {precisao:6.1%}  revocação = {revocacao:6.1%}  "
+          f"latência = {decorrido / len(pares) * 1000:8.2f} ms/par  decisões = {etapas}")
+
+
+def calibrar(pares, precisao_alvo=0.95):
+    """Sugere os limiares: aceitar só onde quase tudo é relevante, rejeitar só onde quase nada é."""
+    ordenados = sorted(pares, key=lambda p: p['similaridade'])
+    similaridades = [p['similaridade'] for p in ordenados]
+
+    melhor_corte, melhor_acuracia = 0.0, 0.0
+    for corte in similaridades:
+        acuracia = sum((p['similaridade'] >= corte) == p['relevante'] for p in pares) / len(pares)
+        if acuracia > melhor_acuracia:
+            melhor_corte, melhor_acuracia = corte, acuracia
+
+    aceitar = similaridades[-1] + 1e-6
+    for corte in reversed(similaridades):
+        acima = [p for p in ordenados if p['similaridade'] >= corte]
+        if sum(p['relevante'] for p in acima) / len(acima) < precisao_alvo:
+            break
+        aceitar = corte
+
+    rejeitar = similaridades[0]
+    for corte in similaridades:
+        abaixo = [p for p in ordenados if p['similaridade'] < corte]
+        if abaixo and sum(not p['relevante'] for p in abaixo) / len(abaixo) < precisao_alvo:
+            break
+        rejeitar = corte
+
+    print(f"\nMelhor corte único: {melhor_corte:.3f} (acurácia {melhor_acuracia:.1%})")
+    print(f"Faixa sugerida ({precisao_alvo:.0%} de precisão nas pontas): "
+          f"RELEVANCIA_LIMIAR_REJEITAR={rejeitar:.3f} RELEVANCIA_LIMIAR_ACEITAR={max(aceitar, rejeitar):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--llm', action='store_true', help="Inclui o juiz LLM (faz chamadas reais à Groq)")
+    parser.add_argument('--reranqueador', default='', help="Nome de um cross-encoder para a faixa duvidosa")
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+
+    modelo = SentenceTransformer(MODELO_EMBEDDING)
+    chunks, _, _ = coletar_chunks(RAIZ)
+    pares = carregar_pares(modelo, chunks)
+    print(f"{len(pares)} pares rotulados ({sum(p['relevante'] for p in pares)} relevantes), {len(chunks)} chunks\n")
+
+    portao = PortaoRelevancia()
+    avaliar('limiar', lambda p: portao.decidir(p['pergunta'], p['contexto'], p['similaridade']), pares)
+
+    if args.reranqueador:
+        portao_rerank = PortaoRelevancia(reranqueador=Reranqueador(args.reranqueador))
+        avaliar('limiar+reranqueador', lambda p: portao_rerank.decidir(p['pergunta'], p['contexto'], p['similaridade']), pares)
+
+    if args.llm:
+        from nucleo.llm import GatewayLLM
+
+        cliente = GatewayLLM()
+
+        def juiz(pergunta, contexto):
+            return julgar_com_llm(cliente, pergunta, contexto)
+
+        avaliar('llm (atual)', lambda p: (juiz(p['pergunta'], p['contexto']), 'juiz'), pares)
+        portao_llm = PortaoRelevancia(juiz=juiz)
+        avaliar('limiar+llm', lambda p: portao_llm.decidir(p['pergunta'], p['contexto'], p['similaridade']), pares)
+
+    calibrar(pares)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Teste de carga do /ask com a Groq, a busca e os sites substituídos por servidores locais.
+
+Uso: python benchmarks/bench_carga.py [--configuracoes 1x4,2x4] [--requisicoes 300] [--concorrencia 16]
+                                      [--mistura manual=0.6,intencao=0.2,web=0.2]
+                                      [--latencia-llm 0.4] [--latencia-busca 0.3] [--latencia-pagina 0.5]
+                                      [--saida arquivo.json] [--comparar resultado_anterior.json]
+
+Para cada configuração WORKERSxTHREADS sobe o api.py no gunicorn (gunicorn.conf.py) apontando
+para benchmarks/stubs/groq_falso.py e benchmarks/stubs/web_falsa.py, e dispara a mistura de
+perguntas: do manual (benchmarks/dados/perguntas_manual.json), com resposta pronta
+(benchmarks/dados/intencoes.tsv) e fora do manual, que caem na busca web
+(benchmarks/dados/perguntas_web.txt). Os caches de respostas e da web ficam desligados.
+
+Mostra requisições/s e p50/p95/p99 de cada etapa (cabeçalho Server-Timing do /ask) e do tempo
+visto pelo cliente. Perguntas recusadas pelo controle de admissão (503/429) são contadas à parte
+dos erros; com mais clientes que threads livres elas aparecem, e as respostas prontas não esperam. O resultado vai para benchmarks/resultados/carga-<commit>.json; passe um
+arquivo antigo em --comparar para ver a diferença entre commits.
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.stubs import groq_falso, web_falsa  # noqa: E402
+from nucleo.cronometro import ler_server_timing  # noqa: E402
+
+PASTA_RESULTADOS = os.path.join(RAIZ, 'benchmarks', 'resultados')
+
+
+def carregar_perguntas():
+    """{'manual': [...], 'intencao': [...], 'web': [...]} a partir dos arquivos de benchmarks/dados."""
+    dados = os.path.join(RAIZ, 'benchmarks', 'dados')
+    with open(os.path.join(dados, 'perguntas_manual.json'), encoding='utf-8') as f:
+        manual = [item['pergunta'] for item in json.load(f)]
+    with open(os.path.join(dados, 'intencoes.tsv'), encoding='utf-8') as f:
+        intencao = [frase for rotulo, frase in (linha.rstrip('\n').split('\t', 1) for linha in f if linha.strip())
+                    if rotulo != '-']
+    with open(os.path.join(dados, 'perguntas_web.txt'), encoding='utf-8') as f:
+        web = [linha.strip() for linha in f if linha.strip()]
+    return {'manual': manual, 'intencao': intencao, 'web': web}
+
+
+def ler_mistura(texto):
+    """"manual=0.6,intencao=0.2,web=0.2" -> {'manual': 0.6, ...}"""
+    mistura = {}
+    for item in texto.split(','):
+        categoria, _, peso = item.partition('=')
+        mistura[categoria.strip()] = float(peso)
+    return mistura
+
+
+def sortear_carga(perguntas, mistura, quantidade, semente=42):
+    """Lista de (categoria, pergunta) sorteada com a mesma semente em todas as execuções."""
+    sorteio = random.Random(semente)
+    categorias = [categoria for categoria in mistura if perguntas.get(categoria)]
+    pesos = [mistura[categoria] for categoria in categorias]
+    carga = []
+    for categoria in sorteio.choices(categorias, weights=pesos, k=quantidade):
+        carga.append((categoria, sorteio.choice(perguntas[categoria])))
+    return carga
+
+
+def porta_livre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def subir_servidor(workers, threads, ambiente, prazo=120):
+    """Sobe o gunicorn e espera o / responder. Retorna (processo, url)."""
+    porta = porta_livre()
+    env = dict(os.environ, **ambiente, GUNICORN_BIND=f"127.0.0.1:{porta}", GUNICORN_WORKERS=str(workers),
+               GUNICORN_THREADS=str(threads))
+    processo = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'api:app'], cwd=RAIZ,
+                                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{porta}"
+    limite = time.monotonic() + prazo
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError(f"gunicorn terminou com código {processo.returncode}")
+        try:
+            if requests.get(url + '/', timeout=1).ok:
+                return processo, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError(f"gunicorn não respondeu em {prazo}s")
+
+
+def disparar(url, carga, concorrencia, timeout=60):
+    """Envia a carga com `concorrencia` clientes. Retorna (medições, segundos de parede)."""
+    local = threading.local()
+
+    def perguntar(item):
+        categoria, pergunta = item
+        if not hasattr(local, 'sessao'):
+            local.sessao = requests.Session()
+        inicio = time.perf_counter()
+        try:
+            resposta = local.sessao.post(url + '/ask', json={'question': pergunta}, timeout=timeout)
+            status, etapas = resposta.status_code, ler_server_timing(resposta.headers.get('Server-Timing'))
+        except requests.RequestException:
+            status, etapas = None, {}
+        return {'categoria': categoria, 'status': status, 'cliente': (time.perf_counter() - inicio) * 1000,
+                'etapas': etapas}
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concorrencia) as executor:
+        medicoes = list(executor.map(perguntar, carga))
+    return medicoes, time.perf_counter() - inicio
+
+
+def percentis(valores):
+    """p50/p95/p99 em milissegundos (None se não houver medições)."""
+    if not valores:
+        return None
+    if len(valores) == 1:
+        return {'p50': valores[0], 'p95': valores[0], 'p99': valores[0], 'n': 1}
+    cortes = statistics.quantiles(valores, n=100, method='inclusive')
+    return {'p50': cortes[49], 'p95': cortes[94], 'p99': cortes[98], 'n': len(valores)}
+
+
+def resumir(medicoes, segundos):
+    ok = [medicao for medicao in medicoes if medicao['status'] == 200]
+    recusadas = sum(medicao['status'] in (429, 503) for medicao in medicoes)
+    etapas = {}
+    for medicao in ok:
+        for etapa, duracao in medicao['etapas'].items():
+            etapas.setdefault(etapa, []).append(duracao)
+    por_categoria = {}
+    for medicao in ok:
+        por_categoria.setdefault(medicao['categoria'], []).append(medicao['cliente'])
+    return {
+        'requisicoes': len(medicoes),
+        'recusadas': recusadas,
+        'erros': len(medicoes) - len(ok) - recusadas,
+        'segundos': segundos,
+        'rps': len(ok) / segundos if segundos else 0.0,
+        'cliente': percentis([medicao['cliente'] for medicao in ok]),
+        'etapas': {etapa: percentis(valores) for etapa, valores in etapas.items()},
+        'categorias': {categoria: percentis(valores) for categoria, valores in por_categoria.items()},
+    }
+
+
+def imprimir(nome, resumo, anterior=None):
+    print(f"\n== {nome}: {resumo['rps']:.1f} req/s, {resumo['requisicoes']} requisições, {resumo['erros']} erros, "
+          f"{resumo.get('recusadas', 0)} recusadas, "
+          f"{resumo['segundos']:.1f}s"
+          + (f"  (antes: {anterior['rps']:.1f} req/s)" if anterior else ""))
+    print(f"   {'etapa':<18}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    linhas = [('cliente', resumo['cliente'], (anterior or {}).get('cliente'))]
+    linhas += [(etapa, valores, (anterior or {}).get('etapas', {}).get(etapa))
+               for etapa, valores in sorted(resumo['etapas'].items())]
+    linhas += [(f"[{categoria}]", valores, (anterior or {}).get('categorias', {}).get(categoria))
+               for categoria, valores in sorted(resumo['categorias'].items())]
+    for nome_linha, valores, antes in linhas:
+        if not valores:
+            continue
+        texto = f"   {nome_linha:<18}{valores['n']:>6}{valores['p50']:>10.1f}{valores['p95']:>10.1f}{valores['p99']:>10.1f}"
+        if antes:
+            texto += f"   (antes: {antes['p50']:.1f} / {antes['p95']:.1f} / {antes['p99']:.1f})"
+        print(texto)
+
+
+def commit_atual():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        alterado = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=RAIZ,
+                                  capture_output=True, text=True).stdout.strip()
+        return commit + ('-alterado' if alterado else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecido'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--configuracoes', default='1x4,2x4', help="Lista de WORKERSxTHREADS do gunicorn")
+    parser.add_argument('--requisicoes', type=int, default=300)
+    parser.add_argument('--concorrencia', type=int, default=16, help="Clientes simultâneos")
+    parser.add_argument('--mistura', default='manual=0.6,intencao=0.2,web=0.2')
+    parser.add_argument('--latencia-llm', type=float, default=0.4)
+    parser.add_argument('--latencia-busca', type=float, default=0.3)
+    parser.add_argument('--latencia-pagina', type=float, default=0.5)
+    parser.add_argument('--falha-paginas', type=float, default=0.0, help="Fração das páginas que respondem 500")
+    parser.add_argument('--saida', help="Arquivo JSON do resultado (padrão: benchmarks/resultados/carga-<commit>.json)")
+    parser.add_argument('--comparar', help="Resultado anterior para comparar")
+    args = parser.parse_args()
+
+    groq = groq_falso.iniciar(latencia=args.latencia_llm)
+    web = web_falsa.iniciar(latencia_busca=args.latencia_busca, latencia_pagina=args.latencia_pagina,
+                            falha_paginas=args.falha_paginas)
+    ambiente = {
+        'GROQ_BASE_URL': groq.url, 'GROQ_API_KEY': 'falsa', 'WEB_BUSCA_URL': web.url + '/busca',
+        'CACHE_WEB_ARQUIVO': '', 'CACHE_RESPOSTAS_ITENS': '0', 'PYTHONUNBUFFERED': '1',
+        # Todas as perguntas saem do mesmo IP: sem o limite por cliente, só as faixas do controle de admissão
+        'ADMISSAO_TAXA_CLIENTE': '0',
+    }
+    carga = sortear_carga(carregar_perguntas(), ler_mistura(args.mistura), args.requisicoes)
+    anteriores = {}
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            anteriores = json.load(f).get('resultados', {})
+
+    resultados = {}
+    for configuracao in args.configuracoes.split(','):
+        workers, threads = (int(valor) for valor in configuracao.lower().split('x'))
+        processo, url = subir_servidor(workers, threads, ambiente)
+        try:
+            disparar(url, carga[:min(len(carga), 2 * args.concorrencia)], args.concorrencia)  # aquecimento
+            medicoes, segundos = disparar(url, carga, args.concorrencia)
+        finally:
+            processo.terminate()
+            processo.wait(timeout=30)
+        resultados[configuracao] = resumir(medicoes, segundos)
+        imprimir(configuracao, resultados[configuracao], anteriores.get(configuracao))
+
+    commit = commit_atual()
+    saida = args.saida or os.path.join(PASTA_RESULTADOS, f"carga-{commit}.json")
+    os.makedirs(os.path.dirname(saida) or '.', exist_ok=True)
+    with open(saida, 'w', encoding='utf-8') as f:
+        json.dump({
+            'commit': commit,
+            'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'parametros': {chave: valor for chave, valor in vars(args).items() if chave not in ('saida', 'comparar')},
+            'chamadas_groq': groq.requisicoes, 'buscas': web.buscas, 'paginas': web.paginas,
+            'resultados': resultados,
+        }, f, ensure_ascii=False, indent=2)
+    print(f"\nResultado salvo em {os.path.relpath(saida, RAIZ)}")
+
+
+if __name__ == '__main__':
+    main()
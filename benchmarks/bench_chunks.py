@@ -0,0 +1,71 @@
+"""Compara o chunker antigo (parágrafos até 500 caracteres) com o chunker por perguntas.
+
+Uso: python benchmarks/bench_chunks.py [--max-tokens N] [--sobreposicao N]
+
+Para cada chunker mostra o tamanho dos chunks, o recall@3 do BM25 nas perguntas rotuladas,
+quantos tokens de contexto vão para o prompt (top 3) e quantas perguntas caem direto na
+tabela pergunta -> chunk, sem busca.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo.corpus import Corpus, DocumentoCorpus  # noqa: E402
+from nucleo.documentos import (MAX_TOKENS_CHUNK, NOME_MANUAL_LIMPO, SOBREPOSICAO_TOKENS, dividir_em_chunks,  # noqa: E402
+                               estimar_tokens, ler_documento, separar_pergunta)
+from nucleo.indice_lexico import IndiceBM25  # noqa: E402
+
+
+def avaliar(nome, chunks, buscar, perguntas):
+    tamanhos = [estimar_tokens(chunk) for chunk in chunks]
+    acertos, contexto, diretas = 0, [], 0
+    for item in perguntas:
+        ids, direta = buscar(item['pergunta'])
+        diretas += direta
+        acertos += any(item['trecho'] in chunks[idx] for idx in ids)
+        contexto.append(sum(tamanhos[idx] for idx in ids))
+    print(f"{nome:<12} {len(chunks):4d} chunks  tokens/chunk média = {statistics.mean(tamanhos):5.0f} máx = {max(tamanhos):5d}  "
+          f"recall@3 = {acertos / len(perguntas):5.0%}  contexto médio = {statistics.mean(contexto):5.0f} tokens  "
+          f"sem busca = {diretas}/{len(perguntas)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-tokens', type=int, default=MAX_TOKENS_CHUNK)
+    parser.add_argument('--sobreposicao', type=int, default=SOBREPOSICAO_TOKENS)
+    args = parser.parse_args()
+
+    texto = ler_documento(os.path.join(RAIZ, NOME_MANUAL_LIMPO))
+    with open(os.path.join(RAIZ, 'benchmarks', 'dados', 'perguntas_manual.json'), encoding='utf-8') as f:
+        perguntas = json.load(f)
+    # As próprias perguntas do manual, como um usuário que copia a pergunta do FAQ
+    perguntas_faq = []
+    for paragrafo in texto.split('\n\n'):
+        pergunta, resposta = separar_pergunta(paragrafo.strip())
+        if pergunta:
+            perguntas_faq.append({'pergunta': pergunta, 'trecho': resposta.strip()[:40]})
+
+    antigos = dividir_em_chunks(texto, tamanho_chunk=500)
+    indice = IndiceBM25(antigos)
+
+    corpus = Corpus([DocumentoCorpus(NOME_MANUAL_LIMPO, texto, args.max_tokens, args.sobreposicao)])
+
+    def buscar_corpus(pergunta):
+        ids = corpus.buscar_pergunta(pergunta)
+        if ids:
+            return ids[:3], True
+        return [idx for idx, _ in corpus.buscar(pergunta, top_k=3)], False
+
+    for titulo, conjunto in (("Perguntas rotuladas", perguntas), ("Perguntas do próprio manual", perguntas_faq)):
+        print(f"\n{titulo} ({len(conjunto)}):")
+        avaliar('paragrafos', antigos, lambda p: ([idx for idx, _ in indice.buscar(p, top_k=3)], False), conjunto)
+        avaliar('perguntas', corpus.documentos, buscar_corpus, conjunto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Compara o codificador PyTorch float32 com o ONNX int8 e os índices FAISS flat, sq8 e pq.
+
+Uso: python benchmarks/bench_codificador.py [--modelo NOME] [--repeticoes 20] [--threads 1]
+
+Os embeddings dos chunks são gerados uma vez com o modelo original e gravados em cada formato
+de índice. Cada codificador roda num processo novo (como o boot de um worker), que mede:
+
+- partida: carregar o codificador e ler os índices (inclui importar torch ou onnxruntime);
+- RSS: pico de memória residente do processo;
+- codificação: latência de uma pergunta por vez (p50/p95), depois de uma chamada de aquecimento;
+- recall@3 (perguntas de benchmarks/dados/perguntas_manual.json) e concordância do top-3 com o
+  caminho atual (PyTorch + flat) para cada índice.
+
+O codificador ONNX é exportado para uma pasta temporária, sem tocar em codificador_onnx/.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+INICIO_PROCESSO = time.perf_counter()
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo.indice_denso import MODELO_EMBEDDING, TIPOS_INDICE  # noqa: E402
+
+ARQUIVO_PERGUNTAS = os.path.join(RAIZ, 'benchmarks', 'dados', 'perguntas_manual.json')
+CODIFICADORES = ('torch', 'onnx')
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def pico_rss_mb():
+    """Pico de memória residente do processo em MB.
+
+    O ru_maxrss sobrevive ao exec e herdaria o pico do processo pai (que carregou o torch);
+    no Linux o VmHWM é só deste processo.
+    """
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for linha in f:
+                if linha.startswith('VmHWM:'):
+                    return int(linha.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def medir_filho(args):
+    """Roda dentro do processo novo e imprime o resultado como JSON numa linha marcada."""
+    from nucleo.codificador import carregar_codificador
+    from nucleo.recuperacao import ler_indice_mapeado
+
+    with open(ARQUIVO_PERGUNTAS, 'r', encoding='utf-8') as f:
+        perguntas = [item['pergunta'] for item in json.load(f)]
+
+    codificador = carregar_codificador(args.modelo, args.filho, raiz=args.pasta)
+    indices = {tipo: ler_indice_mapeado(os.path.join(args.pasta, f"indice_{tipo}.bin")) for tipo in TIPOS_INDICE}
+    partida = time.perf_counter() - INICIO_PROCESSO
+    if args.filho == 'torch':
+        import torch
+        torch.set_num_threads(args.threads)
+
+    codificador.encode([perguntas[0]], normalize_embeddings=True)
+    tempos = []
+    for _ in range(args.repeticoes):
+        for pergunta in perguntas:
+            inicio = time.perf_counter()
+            codificador.encode([pergunta], normalize_embeddings=True)
+            tempos.append(time.perf_counter() - inicio)
+
+    vetores = codificador.encode(perguntas, normalize_embeddings=True).astype('float32')
+    resultados = {tipo: indice.search(vetores, 3)[1].tolist() for tipo, indice in indices.items()}
+    print("RESULTADO=" + json.dumps({
+        'codificador': type(codificador).__name__,
+        'partida': partida,
+        'rss_mb': pico_rss_mb(),
+        'p50_ms': percentil(tempos, 50) * 1000,
+        'p95_ms': percentil(tempos, 95) * 1000,
+        'top3': resultados,
+    }))
+
+
+def preparar(pasta, nome_modelo):
+    """Exporta o ONNX e grava um índice de cada tipo; retorna (chunks, {tipo: bytes do índice})."""
+    import faiss
+    from sentence_transformers import SentenceTransformer
+
+    from nucleo.codificador import PASTA_ONNX, exportar_onnx
+    from nucleo.indice_denso import coletar_chunks, criar_indice_faiss
+
+    modelo = SentenceTransformer(nome_modelo, device='cpu')
+    chunks, _, _ = coletar_chunks(RAIZ)
+    matriz = modelo.encode(chunks, batch_size=64, normalize_embeddings=True, convert_to_numpy=True).astype('float32')
+    tamanhos = {}
+    for tipo in TIPOS_INDICE:
+        caminho = os.path.join(pasta, f"indice_{tipo}.bin")
+        faiss.write_index(criar_indice_faiss(matriz, tipo), caminho)
+        tamanhos[tipo] = os.path.getsize(caminho)
+    exportacao = exportar_onnx(nome_modelo, os.path.join(pasta, PASTA_ONNX), modelo=modelo)
+    print(f"{len(chunks)} chunks; codificador ONNX int8: {exportacao['bytes'] / 1e6:.1f} MB")
+    return chunks, tamanhos
+
+
+def rodar_filho(codificador, pasta, args):
+    comando = [sys.executable, os.path.abspath(__file__), '--filho', codificador, '--pasta', pasta,
+               '--modelo', args.modelo, '--repeticoes', str(args.repeticoes), '--threads', str(args.threads)]
+    ambiente = dict(os.environ, CODIFICADOR_THREADS=str(args.threads), LOG_LEVEL='WARNING')
+    processo = subprocess.run(comando, cwd=RAIZ, env=ambiente, capture_output=True, text=True)
+    if processo.returncode != 0:
+        raise SystemExit(f"Falha no codificador {codificador}:\n{processo.stderr[-2000:]}")
+    marcada = [linha for linha in processo.stdout.splitlines() if linha.startswith('RESULTADO=')][-1]
+    return json.loads(marcada[len('RESULTADO='):])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--modelo', default=MODELO_EMBEDDING)
+    parser.add_argument('--repeticoes', type=int, default=20)
+    parser.add_argument('--threads', type=int, default=1, help="Threads de CPU de cada codificador")
+    parser.add_argument('--filho', choices=CODIFICADORES, help=argparse.SUPPRESS)
+    parser.add_argument('--pasta', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.filho:
+        medir_filho(args)
+        return
+
+    with open(ARQUIVO_PERGUNTAS, 'r', encoding='utf-8') as f:
+        perguntas = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix="bench-codificador-") as pasta:
+        chunks, tamanhos = preparar(pasta, args.modelo)
+        medidas = {codificador: rodar_filho(codificador, pasta, args) for codificador in CODIFICADORES}
+
+    if medidas['onnx']['codificador'] != 'CodificadorONNX':
+        print("AVISO: o processo 'onnx' caiu no SentenceTransformer (onnxruntime ou tokenizers ausentes).")
+    referencia = medidas['torch']['top3']['flat']
+    print(f"\n{'codificador':<12}{'partida':>10}{'RSS':>10}{'encode p50':>12}{'p95':>9}")
+    for codificador, medida in medidas.items():
+        print(f"{codificador:<12}{medida['partida']:>9.2f}s{medida['rss_mb']:>8.0f}MB"
+              f"{medida['p50_ms']:>10.2f}ms{medida['p95_ms']:>7.2f}ms")
+
+    print(f"\n{'codificador':<12}{'índice':<8}{'tamanho':>10}{'recall@3':>10}{'top-3 = atual':>15}")
+    for codificador, medida in medidas.items():
+        for tipo in TIPOS_INDICE:
+            top3 = medida['top3'][tipo]
+            acertos = sum(any(item['trecho'] in chunks[idx] for idx in ids if idx >= 0)
+                          for item, ids in zip(perguntas, top3))
+            concordancia = sum(len(set(ids) & set(ref)) / 3 for ids, ref in zip(top3, referencia)) / len(top3)
+            print(f"{codificador:<12}{tipo:<8}{tamanhos[tipo] / 1024:>8.0f}KB"
+                  f"{acertos / len(perguntas):>10.0%}{concordancia:>15.0%}")
+
+
+if __name__ == '__main__':
+    main()
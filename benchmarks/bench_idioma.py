@@ -0,0 +1,101 @@
+"""Compara o detector de idioma antigo (várias varreduras de substring) com nucleo.idioma.
+
+Uso: python benchmarks/bench_idioma.py [--repeticoes N] [--erros]
+
+Usa os corpora rotulados (idioma<TAB>frase) em benchmarks/dados: idiomas.tsv, que guiou a escolha
+dos pesos, e idiomas_validacao.tsv, frases que nunca foram usadas para ajustar a tabela. A
+acurácia que vale é a da validação.
+"""
+import argparse
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo.idioma import detectar_idioma  # noqa: E402
+
+
+def detectar_idioma_antigo(texto):
+    """Cópia do detector que existia em api.py e app.py, usada como referência."""
+    texto_lower = texto.lower()
+    texto_com_espacos = f' {texto_lower} '
+
+    exclusivos_es = ['el ', ' la ', ' del ', ' al ', ' los ', ' las ', ' es ', ' son ', 'cuánto', 'cuanto', 'cómo', 'qué', 'que ', 'está', 'cuál', 'cual']
+    exclusivos_pt = [' o ', ' a ', ' do ', ' da ', ' ao ', ' os ', ' as ', ' não', ' nao', ' são', ' sao', ' tem ', ' qual ', ' você', ' voce', ' é ']
+    exclusivos_en = [' the ', ' does ', ' which ', ' that ', ' this ', ' these ', ' those ', ' have ', ' has ', ' is ', ' are ']
+    verbos_es = ['cuesta', 'hacer', 'configurar', 'tiene', 'es']
+    verbos_pt = ['custa', 'fazer', 'configurar', 'tem', 'é']
+    verbos_en = ['cost', 'costs', 'make', 'configure', 'has', 'have', 'is', 'are']
+    comuns_pt = ['para', 'com', 'em', 'de', 'como', 'por']
+    comuns_es = ['para', 'con', 'en', 'de', 'como', 'por']
+    comuns_en = ['to', 'for', 'in', 'of', 'how', 'with']
+
+    score_es = sum(5 for p in exclusivos_es if p in texto_com_espacos)
+    score_pt = sum(5 for p in exclusivos_pt if p in texto_com_espacos)
+    score_en = sum(5 for p in exclusivos_en if p in texto_com_espacos)
+    score_es += sum(3 for v in verbos_es if v in texto_lower)
+    score_pt += sum(3 for v in verbos_pt if v in texto_lower)
+    score_en += sum(3 for v in verbos_en if v in texto_lower)
+    score_pt += sum(1 for p in comuns_pt if p in texto_com_espacos)
+    score_es += sum(1 for p in comuns_es if p in texto_com_espacos)
+    score_en += sum(1 for p in comuns_en if p in texto_com_espacos)
+
+    if ' el ' in texto_com_espacos or ' los ' in texto_com_espacos:
+        score_es += 3
+    if ' del ' in texto_com_espacos or ' al ' in texto_com_espacos:
+        score_es += 3
+    if ' the ' in texto_com_espacos:
+        score_en += 3
+    if ' o ' in texto_com_espacos or ' os ' in texto_com_espacos:
+        score_pt += 2
+    if ' do ' in texto_com_espacos or ' da ' in texto_com_espacos or ' ao ' in texto_com_espacos:
+        score_pt += 3
+
+    if score_es > score_pt and score_es > score_en:
+        return 'es'
+    elif score_en > score_pt and score_en > score_es:
+        return 'en'
+    return 'pt'
+
+
+def avaliar(nome, detectar, corpus, repeticoes, mostrar_erros):
+    erros = [(esperado, detectar(frase), frase) for esperado, frase in corpus if detectar(frase) != esperado]
+    por_idioma = {}
+    for esperado, frase in corpus:
+        total, acertos = por_idioma.get(esperado, (0, 0))
+        por_idioma[esperado] = (total + 1, acertos + (detectar(frase) == esperado))
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for _, frase in corpus:
+            detectar(frase)
+    por_chamada = (time.perf_counter() - inicio) / (repeticoes * len(corpus)) * 1e6
+
+    detalhes = "  ".join(f"{idioma}={acertos}/{total}" for idioma, (total, acertos) in sorted(por_idioma.items()))
+    acuracia = 1 - len(erros) / len(corpus)
+    print(f"{nome:<8} acurácia = {acuracia:6.1%}  ({detalhes})   {por_chamada:6.2f} µs/chamada")
+    if mostrar_erros:
+        for esperado, obtido, frase in erros:
+            print(f"    esperado {esperado}, obtido {obtido}: {frase}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=200)
+    parser.add_argument('--erros', action='store_true', help="Lista as frases classificadas errado")
+    args = parser.parse_args()
+
+    for nome, arquivo in (('ajuste', 'idiomas.tsv'), ('validação', 'idiomas_validacao.tsv')):
+        with open(os.path.join(RAIZ, 'benchmarks', 'dados', arquivo), encoding='utf-8') as f:
+            corpus = [tuple(linha.rstrip('\n').split('\t', 1)) for linha in f if linha.strip()]
+
+        print(f"{nome}: {len(corpus)} frases rotuladas ({arquivo})")
+        avaliar('antigo', detectar_idioma_antigo, corpus, args.repeticoes, args.erros)
+        avaliar('novo', detectar_idioma, corpus, args.repeticoes, args.erros)
+        print()
+
+
+if __name__ == '__main__':
+    main()
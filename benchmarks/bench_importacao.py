@@ -0,0 +1,70 @@
+"""Mede o custo de importação dos módulos do servidor (tempo e dependências pesadas carregadas).
+
+Uso: python benchmarks/bench_importacao.py [--repeticoes N] [--top N]
+
+Cada módulo é importado num processo novo com `python -X importtime`, como acontece no
+boot de um worker do gunicorn ou num restart do Streamlit.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULOS = ['nucleo.idioma', 'nucleo.respostas', 'nucleo.prompts', 'nucleo.recuperacao', 'nucleo.web', 'api']
+PESADOS = ['numpy', 'faiss', 'torch', 'sentence_transformers', 'trafilatura', 'duckduckgo_search', 'requests']
+
+_VERIFICAR = ("import sys, {modulo}; "
+              "print('PESADOS=' + ','.join(m for m in {pesados!r} if m in sys.modules))")
+
+
+def medir(modulo, ambiente):
+    """Importa o módulo num processo novo; retorna (segundos, pesados carregados, linhas do importtime)."""
+    codigo = _VERIFICAR.format(modulo=modulo, pesados=PESADOS)
+    inicio = time.perf_counter()
+    processo = subprocess.run([sys.executable, '-X', 'importtime', '-c', codigo], cwd=RAIZ, env=ambiente,
+                              capture_output=True, text=True)
+    decorrido = time.perf_counter() - inicio
+    if processo.returncode != 0:
+        raise SystemExit(f"Falha ao importar {modulo}:\n{processo.stderr[-2000:]}")
+    # O módulo pode imprimir mensagens no import; a resposta é a última linha marcada
+    marcada = [linha for linha in processo.stdout.splitlines() if linha.startswith('PESADOS=')][-1]
+    carregados = [m for m in marcada[len('PESADOS='):].split(',') if m]
+    return decorrido, carregados, processo.stderr.splitlines()
+
+
+def maiores(linhas, top):
+    """Módulos com maior tempo acumulado segundo o -X importtime."""
+    medidos = []
+    for linha in linhas:
+        if not linha.startswith('import time:') or 'cumulative' in linha:
+            continue
+        _, acumulado, nome = linha[len('import time:'):].split('|')
+        medidos.append((int(acumulado), nome.strip()))
+    # Só os módulos de primeiro nível, para não repetir o mesmo pacote várias vezes
+    return sorted((m for m in medidos if '.' not in m[1]), reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=3)
+    parser.add_argument('--top', type=int, default=5)
+    args = parser.parse_args()
+
+    # Sem cache web em disco e sem chave real: só interessa o custo do import
+    ambiente = dict(os.environ, CACHE_WEB_ARQUIVO='', GROQ_API_KEY=os.environ.get('GROQ_API_KEY', 'bench'))
+
+    for modulo in MODULOS:
+        tempos = []
+        for _ in range(args.repeticoes):
+            decorrido, carregados, linhas = medir(modulo, ambiente)
+            tempos.append(decorrido)
+        print(f"{modulo:<20} {min(tempos) * 1000:8.0f} ms  pesados carregados: {', '.join(carregados) or 'nenhum'}")
+        for acumulado, nome in maiores(linhas, args.top):
+            print(f"    {acumulado / 1000:8.1f} ms  {nome}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Compara a detecção antiga de perguntas sobre valores (substrings) com nucleo.intencoes.
+
+Uso: python benchmarks/bench_intencoes.py [--repeticoes N] [--erros]
+
+Usa as frases rotuladas em benchmarks/dados/intencoes.tsv (intenção ou "-"<TAB>frase) e as
+perguntas do manual (benchmarks/dados/perguntas_manual.json), que não devem cair em
+nenhuma resposta pronta. O detector antigo só conhece a intenção 'valores'.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo.intencoes import detectar_intencao  # noqa: E402
+
+
+def verificar_pergunta_sobre_valores_antiga(pergunta):
+    """Cópia da verificação que existia em nucleo/respostas.py, usada como referência."""
+    palavras_pt = ['valor', 'preco', 'preço', 'quanto custa', 'custa', 'custo',
+                   'licenca', 'licença', 'plano', 'planos', 'mensalidade',
+                   'assinatura', 'pagar', 'pagamento', 'reais', 'r$']
+    palavras_es = ['valor', 'precio', 'cuánto cuesta', 'cuesta', 'costo',
+                   'licencia', 'plan', 'planes', 'mensualidad',
+                   'suscripción', 'pagar', 'pago']
+    palavras_en = ['value', 'price', 'how much', 'cost', 'costs',
+                   'license', 'plan', 'plans', 'monthly', 'subscription',
+                   'pay', 'payment', 'pricing']
+    pergunta_lower = pergunta.lower()
+    todas_palavras = palavras_pt + palavras_es + palavras_en
+    return any(palavra in pergunta_lower for palavra in todas_palavras)
+
+
+def detectar_antigo(pergunta):
+    return 'valores' if verificar_pergunta_sobre_valores_antiga(pergunta) else None
+
+
+def avaliar(nome, detectar, corpus, repeticoes, mostrar_erros):
+    erros = [(esperado, detectar(frase), frase) for esperado, frase in corpus if detectar(frase) != esperado]
+    falsos_positivos = sum(1 for esperado, obtido, _ in erros if esperado is None)
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for _, frase in corpus:
+            detectar(frase)
+    por_chamada = (time.perf_counter() - inicio) / (repeticoes * len(corpus)) * 1e6
+
+    print(f"{nome:<8} acertos = {len(corpus) - len(erros)}/{len(corpus)}  "
+          f"(respostas prontas indevidas: {falsos_positivos})   {por_chamada:6.2f} µs/chamada")
+    if mostrar_erros:
+        for esperado, obtido, frase in erros:
+            print(f"    esperado {esperado}, obtido {obtido}: {frase}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=500)
+    parser.add_argument('--erros', action='store_true', help="Lista as frases classificadas errado")
+    args = parser.parse_args()
+
+    with open(os.path.join(RAIZ, 'benchmarks', 'dados', 'intencoes.tsv'), encoding='utf-8') as f:
+        rotuladas = [tuple(linha.rstrip('\n').split('\t', 1)) for linha in f if linha.strip()]
+    with open(os.path.join(RAIZ, 'benchmarks', 'dados', 'perguntas_manual.json'), encoding='utf-8') as f:
+        manual = [(None, item['pergunta']) for item in json.load(f)]
+    corpus = [(None if intencao == '-' else intencao, frase) for intencao, frase in rotuladas] + manual
+
+    print(f"{len(rotuladas)} frases rotuladas + {len(manual)} perguntas do manual\n")
+    # O antigo não tem as outras intenções: para ele, só 'valores' conta como esperado
+    corpus_antigo = [(esperado if esperado == 'valores' else None, frase) for esperado, frase in corpus]
+    avaliar('antigo', detectar_antigo, corpus_antigo, args.repeticoes, args.erros)
+    avaliar('novo', detectar_intencao, corpus, args.repeticoes, args.erros)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""Exercita o gateway do LLM (nucleo/llm.py) contra o servidor falso da Groq.
+
+Uso: python benchmarks/bench_llm.py [--simultaneas 20] [--latencia 0.5]
+
+Mostra, sem gastar chamadas reais:
+- uma rajada de perguntas idênticas (recarregar de página) vira uma só chamada à Groq;
+- perguntas diferentes respeitam LLM_CONCORRENCIA;
+- 429 e 503 são repetidos dentro do prazo, e um erro persistente vira ErroLLM no prazo.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from benchmarks.stubs.groq_falso import iniciar  # noqa: E402
+from nucleo.llm import ErroLLM, GatewayLLM  # noqa: E402
+
+
+def rajada(gateway, servidor, mensagens_por_pedido, stream=False):
+    """Dispara todos os pedidos ao mesmo tempo; retorna (chamadas à Groq, segundos, respostas)."""
+    antes = servidor.requisicoes
+    inicio = time.perf_counter()
+
+    def pedir(mensagens):
+        if stream:
+            return ''.join(gateway.transmitir(mensagens))
+        return gateway.completar(mensagens)
+
+    with ThreadPoolExecutor(max_workers=len(mensagens_por_pedido)) as executor:
+        respostas = list(executor.map(pedir, mensagens_por_pedido))
+    return servidor.requisicoes - antes, time.perf_counter() - inicio, respostas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--simultaneas', type=int, default=20)
+    parser.add_argument('--latencia', type=float, default=0.5)
+    parser.add_argument('--concorrencia', type=int, default=4)
+    args = parser.parse_args()
+
+    servidor = iniciar(latencia=args.latencia)
+    n = args.simultaneas
+    iguais = [[{'role': 'user', 'content': "Como instalo o ConsoleMix?"}]] * n
+    diferentes = [[{'role': 'user', 'content': f"Pergunta número {i}"}] for i in range(n)]
+
+    for nome, coalescer in (('sem coalescência', False), ('com coalescência', True)):
+        gateway = GatewayLLM(api_key='falsa', base_url=servidor.url, concorrencia=args.concorrencia,
+                             coalescer=coalescer)
+        for modo, stream in (('completar', False), ('stream', True)):
+            chamadas, segundos, respostas = rajada(gateway, servidor, iguais, stream)
+            print(f"{n} iguais, {modo:<9} {nome:<17} {chamadas:3d} chamadas à Groq  {segundos:5.2f}s  "
+                  f"respostas idênticas: {len(set(respostas)) == 1}")
+
+    gateway = GatewayLLM(api_key='falsa', base_url=servidor.url, concorrencia=args.concorrencia)
+    chamadas, segundos, _ = rajada(gateway, servidor, diferentes)
+    esperado = -(-n // args.concorrencia) * args.latencia
+    print(f"{n} diferentes, concorrência {args.concorrencia}: {chamadas} chamadas em {segundos:.2f}s "
+          f"(~{esperado:.2f}s esperado)")
+
+    for status in (429, 503):
+        servidor.falhas, servidor.status_falha = 2, status
+        gateway = GatewayLLM(api_key='falsa', base_url=servidor.url, tentativas=3)
+        antes = servidor.requisicoes
+        inicio = time.perf_counter()
+        gateway.completar(iguais[0])
+        print(f"2 falhas {status} seguidas: ok após {servidor.requisicoes - antes} tentativas "
+              f"em {time.perf_counter() - inicio:.2f}s")
+
+    servidor.falhas, servidor.status_falha = 1000, 503
+    gateway = GatewayLLM(api_key='falsa', base_url=servidor.url, prazo=2.0, tentativas=10)
+    inicio = time.perf_counter()
+    try:
+        gateway.completar(iguais[0])
+    except ErroLLM as e:
+        print(f"503 persistente, prazo 2s: ErroLLM em {time.perf_counter() - inicio:.2f}s ({e})")
+    servidor.falhas = 0
+    servidor.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Mede o efeito do orçamento de tokens (nucleo/orcamento.py) no tamanho dos prompts.
+
+Uso: python benchmarks/bench_orcamento.py [--max-prompt N] [--max-contexto N]
+
+Compara o prompt montado sem limite (prompts.montar_prompt) com o prompt do OrcamentoTokens
+em três situações: contexto do manual (top 3 do BM25), um artigo longo da web (simulado com o
+documento de conhecimento/) e um histórico longo e repetitivo. Configure TOKENIZADOR_ARQUIVO
+para contar com o tokenizer do modelo em vez da estimativa.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo.corpus import carregar_corpus  # noqa: E402
+from nucleo.documentos import PASTA_CONHECIMENTO, listar_documentos, ler_documento  # noqa: E402
+from nucleo.orcamento import MAXIMO_CONTEXTO, MAXIMO_PROMPT, ContadorTokens, OrcamentoTokens  # noqa: E402
+from nucleo.prompts import SEPARADOR_CHUNKS, montar_prompt  # noqa: E402
+
+
+def comparar(nome, casos, orcamento, contar):
+    antes, depois, tempos = [], [], []
+    for pergunta, historico, contexto, fonte in casos:
+        antes.append(contar(montar_prompt(pergunta, historico, contexto, fonte)))
+        inicio = time.perf_counter()
+        prompt = orcamento.montar_prompt(pergunta, historico, contexto, fonte)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        depois.append(contar(prompt))
+    print(f"{nome:<18} sem orçamento: média {statistics.mean(antes):6.0f} máx {max(antes):6d} tokens   "
+          f"com orçamento: média {statistics.mean(depois):6.0f} máx {max(depois):6d} tokens   "
+          f"custo {statistics.mean(tempos):5.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--max-prompt', type=int, default=MAXIMO_PROMPT)
+    parser.add_argument('--max-contexto', type=int, default=MAXIMO_CONTEXTO)
+    args = parser.parse_args()
+
+    contar = ContadorTokens()
+    orcamento = OrcamentoTokens(contador=contar, maximo_prompt=args.max_prompt, maximo_contexto=args.max_contexto)
+    print(f"Contagem: {'tokenizer ' + contar.arquivo if contar.exato else 'estimativa (~4 caracteres/token)'}\n")
+
+    corpus, _ = carregar_corpus(RAIZ)
+    with open(os.path.join(RAIZ, 'benchmarks', 'dados', 'perguntas_manual.json'), encoding='utf-8') as f:
+        perguntas = [item['pergunta'] for item in json.load(f)]
+
+    manual = [(p, [], SEPARADOR_CHUNKS.join(corpus.documentos[idx] for idx, _ in corpus.buscar(p, top_k=3)),
+               "Manual Técnico") for p in perguntas]
+    artigo = '\n\n'.join(ler_documento(caminho) for caminho in listar_documentos(RAIZ)
+                         if os.sep + PASTA_CONHECIMENTO + os.sep in caminho)
+    web = [(p, [], artigo, "Web") for p in perguntas]
+    historico = []
+    for p in perguntas[:6]:
+        historico += [{'role': 'user', 'content': p}, {'role': 'assistant', 'content': artigo[:1500]}] * 2
+    conversa = [(p, historico, contexto, fonte) for p, _, contexto, fonte in manual]
+
+    comparar('manual (top 3)', manual, orcamento, contar)
+    comparar('artigo da web', web, orcamento, contar)
+    comparar('histórico longo', conversa, orcamento, contar)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""Compara o scorer antigo (substring por palavra) com o índice BM25.
+
+Uso: python benchmarks/bench_recuperacao.py [--repeticoes N] [--copias N]
+
+--copias replica o manual N vezes para simular mais documentos em conhecimento/. No final,
+o mesmo é medido sobre o Corpus (todos os documentos da base, cada cópia como uma fonte),
+com e sem filtro de fonte.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo.corpus import Corpus, DocumentoCorpus  # noqa: E402
+from nucleo.documentos import NOME_MANUAL_LIMPO, dividir_em_chunks, ler_documento, listar_documentos  # noqa: E402
+from nucleo.indice_lexico import IndiceBM25  # noqa: E402
+
+STOP_WORDS_ANTIGAS = {'o', 'a', 'de', 'da', 'do', 'em', 'para', 'com', 'um', 'uma', 'os', 'as', 'dos', 'das', 'é', 'e', 'ou'}
+
+
+def buscar_por_substring(pergunta, chunks, top_k=3):
+    """Cópia do scorer antigo de api.encontrar_chunks_relevantes, usada como referência."""
+    palavras_pergunta = set(re.findall(r'\w+', pergunta.lower())) - STOP_WORDS_ANTIGAS
+    scores = []
+    for idx, chunk in enumerate(chunks):
+        chunk_lower = chunk.lower()
+        score = sum(1 for palavra in palavras_pergunta if palavra in chunk_lower)
+        scores.append((score, idx))
+    scores.sort(reverse=True, key=lambda x: x[0])
+    return [idx for score, idx in scores[:top_k] if score > 0]
+
+
+def buscar_por_bm25(pergunta, indice, top_k=3):
+    return [idx for idx, score in indice.buscar(pergunta, top_k=top_k)]
+
+
+def avaliar(nome, buscar, perguntas, chunks, repeticoes):
+    acertos = 0
+    for item in perguntas:
+        if any(item['trecho'] in chunks[idx] for idx in buscar(item['pergunta'])):
+            acertos += 1
+
+    inicio = time.perf_counter()
+    for _ in range(repeticoes):
+        for item in perguntas:
+            buscar(item['pergunta'])
+    decorrido = time.perf_counter() - inicio
+    por_consulta = decorrido / (repeticoes * len(perguntas)) * 1e6
+
+    print(f"{nome:<12} recall@3 = {acertos}/{len(perguntas)} ({acertos / len(perguntas):.0%})   "
+          f"latência média = {por_consulta:8.1f} µs/consulta")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=50)
+    parser.add_argument('--copias', type=int, default=1)
+    args = parser.parse_args()
+
+    with open(os.path.join(RAIZ, 'manual_limpo.txt'), encoding='utf-8') as f:
+        chunks = dividir_em_chunks(f.read(), tamanho_chunk=500) * args.copias
+    with open(os.path.join(RAIZ, 'benchmarks', 'dados', 'perguntas_manual.json'), encoding='utf-8') as f:
+        perguntas = json.load(f)
+
+    inicio = time.perf_counter()
+    indice = IndiceBM25(chunks)
+    construcao = (time.perf_counter() - inicio) * 1000
+
+    print(f"{len(chunks)} chunks, {len(perguntas)} perguntas rotuladas, índice BM25 construído em {construcao:.1f} ms\n")
+    avaliar('substring', lambda p: buscar_por_substring(p, chunks), perguntas, chunks, args.repeticoes)
+    avaliar('bm25', lambda p: buscar_por_bm25(p, indice), perguntas, chunks, args.repeticoes)
+
+    arquivos = [DocumentoCorpus(f"copia{i}/{os.path.relpath(caminho, RAIZ)}", ler_documento(caminho))
+                for i in range(args.copias) for caminho in listar_documentos(RAIZ)]
+    inicio = time.perf_counter()
+    corpus = Corpus(arquivos)
+    construcao = (time.perf_counter() - inicio) * 1000
+    textos = corpus.documentos
+    fonte_manual = [f"copia0/{NOME_MANUAL_LIMPO}"]
+    print(f"\nCorpus: {len(arquivos)} documentos, {len(corpus)} chunks, montado a partir das contagens em {construcao:.1f} ms\n")
+    avaliar('corpus', lambda p: buscar_por_bm25(p, corpus), perguntas, textos, args.repeticoes)
+    avaliar('corpus+fonte', lambda p: [idx for idx, _ in corpus.buscar(p, fontes=fonte_manual)],
+            perguntas, textos, args.repeticoes)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Mede quantas perguntas nucleo.sessoes.depende_da_conversa classifica certo.
+
+Uso: python benchmarks/bench_sessoes.py [--repeticoes N] [--erros]
+
+Usa as frases rotuladas em benchmarks/dados/continuacoes.tsv ("depende" ou "autonoma"<TAB>frase)
+e as perguntas do manual (benchmarks/dados/perguntas_manual.json), que são todas autônomas.
+Uma autônoma marcada como "depende" só perde o cache e a FAQ; o erro grave é o contrário,
+que serve a resposta de outra pergunta.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from nucleo.sessoes import depende_da_conversa  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeticoes', type=int, default=500)
+    parser.add_argument('--erros', action='store_true', help="Lista as frases classificadas errado")
+    args = parser.parse_args()
+
+    with open(os.path.join(RAIZ, 'benchmarks', 'dados', 'continuacoes.tsv'), encoding='utf-8') as f:
+        rotuladas = [tuple(linha.rstrip('\n').split('\t', 1)) for linha in f if linha.strip()]
+    with open(os.path.join(RAIZ, 'benchmarks', 'dados', 'perguntas_manual.json'), encoding='utf-8') as f:
+        manual = [(False, item['pergunta']) for item in json.load(f)]
+    corpus = [(rotulo == 'depende', frase) for rotulo, frase in rotuladas] + manual
+
+    erros = [(esperado, frase) for esperado, frase in corpus if depende_da_conversa(frase) != esperado]
+    servidas_erradas = sum(1 for esperado, _ in erros if esperado)
+
+    inicio = time.perf_counter()
+    for _ in range(args.repeticoes):
+        for _, frase in corpus:
+            depende_da_conversa(frase)
+    por_chamada = (time.perf_counter() - inicio) / (args.repeticoes * len(corpus)) * 1e6
+
+    print(f"{len(rotuladas)} frases rotuladas + {len(manual)} perguntas do manual\n")
+    print(f"acertos = {len(corpus) - len(erros)}/{len(corpus)}  "
+          f"(continuações tratadas como autônomas: {servidas_erradas}, "
+          f"autônomas sem cache: {len(erros) - servidas_erradas})   {por_chamada:6.2f} µs/chamada")
+    if args.erros:
+        for esperado, frase in erros:
+            print(f"    esperado {'depende' if esperado else 'autonoma'}: {frase}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+"""Servidor falso da API da Groq (rota OpenAI de chat completions) para testes locais.
+
+Uso: python benchmarks/stubs/groq_falso.py [--porta 8099] [--latencia 0.5] [--falhas 2] [--status 429]
+e depois, no servidor do assistente:
+    GROQ_BASE_URL=http://127.0.0.1:8099 GROQ_API_KEY=falsa python api.py
+
+Responde com e sem stream (SSE), com latência configurável. As primeiras `--falhas` requisições
+recebem `--status` (com Retry-After no 429). GET /contagem devolve quantas chamadas chegaram.
+
+Como o modelo de verdade segue a regra de falha do prompt, a resposta é a frase "Não encontrei..."
+quando menos da metade das palavras da pergunta aparece no contexto; assim as perguntas fora do
+manual seguem para a busca web como em produção.
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROTA = '/openai/v1/chat/completions'
+FRASE_FALHA = "Não encontrei informações sobre isso na fonte consultada."
+_PERGUNTA = re.compile(r'PERGUNTA ATUAL DO USUÁRIO:\s*(.*?)\s*---', re.S)
+_CONTEXTO = re.compile(r'CONTEXTO DE CONSULTA \(Fonte: [^)]*\):\s*(.*?)\s*---\s*PERGUNTA ATUAL', re.S)
+
+
+def responder_prompt(prompt):
+    """Resposta simulada: a frase de falha se o contexto não cobre a pergunta, senão um trecho do contexto."""
+    pergunta = _PERGUNTA.search(prompt)
+    contexto = _CONTEXTO.search(prompt)
+    if not pergunta or not contexto:
+        return f"Resposta simulada: {prompt.strip()[-60:]}"
+    # Radical de 5 letras: "instalar" conta como presente num contexto que fala em "instalação"
+    radicais = {palavra[:5] for palavra in re.findall(r'\w+', pergunta.group(1).lower()) if len(palavra) > 3}
+    texto = contexto.group(1).lower()
+    if not texto or (radicais and sum(radical in texto for radical in radicais) * 2 < len(radicais)):
+        return FRASE_FALHA
+    return f"Resposta simulada com base no contexto: {contexto.group(1).strip()[:200]}"
+
+
+class ServidorGroqFalso(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, latencia=0.2, falhas=0, status_falha=429, pedacos=8, resposta=None):
+        super().__init__(endereco, _Tratador)
+        self.latencia = latencia
+        self.falhas = falhas
+        self.status_falha = status_falha
+        self.pedacos = pedacos
+        # Texto fixo da resposta; sem ele, responder_prompt decide entre a frase de falha e um trecho do contexto
+        self.resposta = resposta
+        self.requisicoes = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def registrar(self):
+        """Conta a requisição e diz se ela deve falhar."""
+        with self.lock:
+            self.requisicoes += 1
+            if self.falhas > 0:
+                self.falhas -= 1
+                return True
+            return False
+
+
+class _Tratador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _responder_json(self, status, dados, cabecalhos=None):
+        corpo = json.dumps(dados).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(corpo)))
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        if self.path == '/contagem':
+            self._responder_json(200, {'requisicoes': self.server.requisicoes})
+        else:
+            self._responder_json(404, {'error': {'message': 'rota inexistente'}})
+
+    def do_POST(self):
+        corpo = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        if self.path != ROTA:
+            self._responder_json(404, {'error': {'message': 'rota inexistente'}})
+            return
+        pedido = json.loads(corpo or b'{}')
+        if self.server.registrar():
+            self._responder_json(self.server.status_falha, {'error': {'message': 'falha simulada'}},
+                                 {'Retry-After': '0'} if self.server.status_falha == 429 else None)
+            return
+
+        prompt = pedido['messages'][-1]['content']
+        texto = self.server.resposta or responder_prompt(prompt)
+        modelo = pedido.get('model', 'llama-3.1-8b-instant')
+        if pedido.get('stream'):
+            self._transmitir(texto, modelo)
+            return
+        time.sleep(self.server.latencia)
+        self._responder_json(200, {
+            'id': 'chatcmpl-falso', 'object': 'chat.completion', 'created': int(time.time()), 'model': modelo,
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': texto}, 'finish_reason': 'stop'}],
+            'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(texto) // 4,
+                      'total_tokens': (len(prompt) + len(texto)) // 4},
+        })
+
+    def _transmitir(self, texto, modelo):
+        """Envia o texto em `pedacos` eventos SSE espalhados pela latência configurada."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        quantidade = max(1, self.server.pedacos)
+        tamanho = -(-len(texto) // quantidade)
+        for inicio in range(0, len(texto), tamanho):
+            time.sleep(self.server.latencia / quantidade)
+            pedaco = {'id': 'chatcmpl-falso', 'object': 'chat.completion.chunk', 'created': int(time.time()),
+                      'model': modelo, 'choices': [{'index': 0, 'delta': {'content': texto[inicio:inicio + tamanho]},
+                                                    'finish_reason': None}]}
+            self.wfile.write(f"data: {json.dumps(pedaco)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+        self.close_connection = True
+
+
+def iniciar(porta=0, **opcoes):
+    """Sobe o servidor numa thread e devolve-o (a URL fica em .url)."""
+    servidor = ServidorGroqFalso(('127.0.0.1', porta), **opcoes)
+    threading.Thread(target=servidor.serve_forever, name="groq-falso", daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--porta', type=int, default=8099)
+    parser.add_argument('--latencia', type=float, default=0.5, help="Segundos até a resposta completa")
+    parser.add_argument('--falhas', type=int, default=0, help="Quantas requisições iniciais falham")
+    parser.add_argument('--status', type=int, default=429, help="Status das falhas simuladas")
+    parser.add_argument('--resposta', help="Texto fixo da resposta")
+    args = parser.parse_args()
+
+    servidor = ServidorGroqFalso(('127.0.0.1', args.porta), latencia=args.latencia, falhas=args.falhas,
+                                 status_falha=args.status, resposta=args.resposta)
+    print(f"Groq falso em {servidor.url} (GROQ_BASE_URL={servidor.url})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
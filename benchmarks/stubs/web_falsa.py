@@ -0,0 +1,126 @@
+"""Servidor falso de busca e de páginas para testes locais (no lugar do DuckDuckGo e dos sites).
+
+Uso: python benchmarks/stubs/web_falsa.py [--porta 8098] [--latencia-busca 0.3] [--latencia-pagina 0.5]
+e depois, no servidor do assistente:
+    WEB_BUSCA_URL=http://127.0.0.1:8098/busca CACHE_WEB_ARQUIVO= python api.py
+
+GET /busca?q=...&max_results=3 devolve resultados no formato do DDGS.text apontando para
+/pagina/<n> no próprio servidor; cada página é um artigo HTML que o trafilatura consegue extrair.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+PARAGRAFOS = [
+    "A interface de áudio converte o sinal analógico dos microfones em digital e envia para o computador "
+    "com baixa latência. Modelos com drivers ASIO costumam ter o melhor desempenho em transmissões ao vivo.",
+    "Para reduzir ruído em estúdios de rádio, ajuste o ganho de entrada antes de aumentar o volume do canal "
+    "e use um noise gate com limiar um pouco acima do ruído de fundo da sala.",
+    "Em transmissões pela internet, a taxa de bits de 128 kbps em MP3 ou 64 kbps em AAC costuma equilibrar "
+    "qualidade e consumo de banda para a maioria dos ouvintes.",
+    "Um processador de áudio com compressor multibanda deixa o volume percebido mais constante entre as "
+    "músicas, comerciais e vinhetas da programação.",
+]
+
+
+class ServidorWebFalso(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, endereco, latencia_busca=0.3, latencia_pagina=0.5, variacao=0.2, falha_paginas=0.0):
+        super().__init__(endereco, _Tratador)
+        self.latencia_busca = latencia_busca
+        self.latencia_pagina = latencia_pagina
+        # Fração da latência sorteada para mais ou para menos em cada resposta
+        self.variacao = variacao
+        # Fração das páginas que respondem 500 (simula sites fora do ar)
+        self.falha_paginas = falha_paginas
+        self.buscas = 0
+        self.paginas = 0
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://{self.server_address[0]}:{self.server_address[1]}"
+
+    def esperar(self, latencia):
+        time.sleep(max(0.0, latencia * (1 + random.uniform(-self.variacao, self.variacao))))
+
+    def contar(self, tipo):
+        with self.lock:
+            setattr(self, tipo, getattr(self, tipo) + 1)
+
+
+class _Tratador(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _responder(self, status, corpo, tipo):
+        corpo = corpo.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', tipo)
+        self.send_header('Content-Length', str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/busca':
+            self.server.contar('buscas')
+            self.server.esperar(self.server.latencia_busca)
+            parametros = parse_qs(url.query)
+            pergunta = parametros.get('q', [''])[0]
+            quantidade = int(parametros.get('max_results', ['3'])[0])
+            resultados = [{'href': f"{self.server.url}/pagina/{n}", 'title': f"{pergunta} - resultado {n + 1}",
+                           'body': PARAGRAFOS[n % len(PARAGRAFOS)][:120]} for n in range(quantidade)]
+            self._responder(200, json.dumps(resultados, ensure_ascii=False), 'application/json')
+        elif url.path.startswith('/pagina/'):
+            self.server.contar('paginas')
+            self.server.esperar(self.server.latencia_pagina)
+            if random.random() < self.server.falha_paginas:
+                self._responder(500, "erro simulado", 'text/plain')
+                return
+            inicio = int(url.path.rsplit('/', 1)[1]) if url.path.rsplit('/', 1)[1].isdigit() else 0
+            corpo = "".join(f"<p>{escape(PARAGRAFOS[(inicio + i) % len(PARAGRAFOS)])}</p>" for i in range(len(PARAGRAFOS)))
+            html = (f"<html><head><title>Artigo {inicio}</title></head><body><nav>Início | Contato</nav>"
+                    f"<article><h1>Artigo {inicio}</h1>{corpo}</article><footer>Rodapé</footer></body></html>")
+            self._responder(200, html, 'text/html; charset=utf-8')
+        elif url.path == '/contagem':
+            self._responder(200, json.dumps({'buscas': self.server.buscas, 'paginas': self.server.paginas}),
+                            'application/json')
+        else:
+            self._responder(404, "rota inexistente", 'text/plain')
+
+
+def iniciar(porta=0, **opcoes):
+    """Sobe o servidor numa thread e devolve-o (a URL fica em .url; a busca em .url + '/busca')."""
+    servidor = ServidorWebFalso(('127.0.0.1', porta), **opcoes)
+    threading.Thread(target=servidor.serve_forever, name="web-falsa", daemon=True).start()
+    return servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--porta', type=int, default=8098)
+    parser.add_argument('--latencia-busca', type=float, default=0.3)
+    parser.add_argument('--latencia-pagina', type=float, default=0.5)
+    parser.add_argument('--falha-paginas', type=float, default=0.0, help="Fração das páginas que falham")
+    args = parser.parse_args()
+
+    servidor = ServidorWebFalso(('127.0.0.1', args.porta), latencia_busca=args.latencia_busca,
+                                latencia_pagina=args.latencia_pagina, falha_paginas=args.falha_paginas)
+    print(f"Web falsa em {servidor.url} (WEB_BUSCA_URL={servidor.url}/busca)")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,49 @@
+"""Gera os artefatos de busca semântica (indice_faiss.bin e chunks.pkl) usados pelo app.py.
+
+Uso: python construir_indice.py [--forcar] [--lote 64] [--tipo flat|sq8|pq] [--onnx]
+
+Lê manual_limpo.txt e todos os documentos de conhecimento/. Chunks que não mudaram desde a
+última execução reaproveitam o embedding salvo em embeddings_cache.npz.
+
+--tipo sq8 ou pq grava o índice quantizado (menor, com distâncias aproximadas). --onnx também
+exporta o modelo de embedding para codificador_onnx/ (ONNX com pesos int8), usado pelo servidor
+com RECUPERACAO_CODIFICADOR=onnx.
+"""
+import argparse
+import os
+
+from nucleo.codificador import PASTA_ONNX, exportar_onnx, ler_manifesto_onnx
+from nucleo.indice_denso import MODELO_EMBEDDING, SUBQUANTIZADORES, TIPO_INDICE, TIPOS_INDICE, construir_indice
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Constrói o índice FAISS do manual e de conhecimento/.")
+    parser.add_argument('--raiz', default='.', help="Pasta onde estão manual_limpo.txt e conhecimento/")
+    parser.add_argument('--lote', type=int, default=64, help="Quantidade de chunks por chamada ao modelo")
+    parser.add_argument('--forcar', action='store_true', help="Ignora o cache e recalcula todos os embeddings")
+    parser.add_argument('--tipo', choices=TIPOS_INDICE, default=TIPO_INDICE, help="Formato dos vetores no índice")
+    parser.add_argument('--subquantizadores', type=int, default=SUBQUANTIZADORES,
+                        help="Bytes por vetor no índice pq (divisor da dimensão do modelo)")
+    parser.add_argument('--onnx', action='store_true', help="Exporta também o codificador ONNX int8 das perguntas")
+    args = parser.parse_args()
+
+    resultado = construir_indice(raiz=args.raiz, tamanho_lote=args.lote, forcar=args.forcar,
+                                 tipo_indice=args.tipo, subquantizadores=args.subquantizadores)
+    if resultado['atualizado']:
+        print(f"Índice gerado ({args.tipo}): {resultado['chunks']} chunks, {resultado['novos']} embeddings novos "
+              f"em {resultado['segundos']:.1f}s.")
+    else:
+        print(f"Índice já atualizado ({resultado['chunks']} chunks), nada a fazer.")
+
+    if args.onnx:
+        pasta = os.path.join(args.raiz, PASTA_ONNX)
+        if not args.forcar and ler_manifesto_onnx(pasta).get('modelo') == MODELO_EMBEDDING:
+            print(f"Codificador ONNX já exportado em {pasta}.")
+        else:
+            exportacao = exportar_onnx(MODELO_EMBEDDING, pasta)
+            print(f"Codificador ONNX exportado: {exportacao['arquivo']} ({exportacao['bytes'] / 1e6:.1f} MB) "
+                  f"em {exportacao['segundos']:.1f}s.")
+
+
+if __name__ == '__main__':
+    main()
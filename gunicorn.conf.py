@@ -0,0 +1,26 @@
+"""Configuração do gunicorn para o api.py (gunicorn api:app) e o api_async.py.
+
+Com preload_app o api.py é importado uma única vez no master: manual, chunks e índices são
+montados ali e os workers os herdam por copy-on-write em vez de cada um carregar sua cópia.
+"""
+import gc
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", "60"))
+preload_app = True
+
+
+def pre_fork(server, worker):
+    # Move o que o master já criou para a geração permanente do GC. Sem isso, a primeira coleta
+    # em cada worker mexe nos cabeçalhos de todos esses objetos e as páginas deixam de ser compartilhadas.
+    gc.freeze()
+
+
+def when_ready(server):
+    # As sessões das conversas (nucleo/sessoes.py) ficam no processo: com vários workers, só redis as compartilha
+    if workers > 1 and not os.environ.get("SESSOES_URL"):
+        server.log.warning("SESSOES_URL não definido: com %d workers, perguntas seguintes de uma conversa "
+                           "podem cair num worker sem o histórico dela.", workers)
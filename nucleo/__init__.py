@@ -0,0 +1 @@
+"""Lógica compartilhada do assistente (busca, idioma, respostas)."""
@@ -0,0 +1,225 @@
+"""Controle de admissão do /ask: faixas separadas para perguntas baratas e caras.
+
+Depois da intenção, da recuperação e da decisão da cascata (todas em microssegundos), cada
+pergunta cai numa faixa:
+
+- PRONTA: resposta pronta, da FAQ pré-gerada ou do cache. Nunca espera nem é recusada;
+- MANUAL: uma chamada ao LLM com o contexto do manual, inclusive na rota especulativa, em que a
+  busca web roda em paralelo no pool da cascata (limitado por CASCATA_THREADS) e não nesta thread;
+- WEB: provável fallback (busca, downloads e LLM), a mais lenta.
+
+MANUAL e WEB dividem uma capacidade de GUNICORN_THREADS - ADMISSAO_RESERVA perguntas *em
+execução* no processo: as threads da reserva não ficam presas em chamadas ao LLM ou downloads,
+mesmo num pico de perguntas que caem na web. Dentro da capacidade, cada faixa tem seu limite de
+execuções simultâneas (a WEB fica com cerca de metade, para não tomar o lugar do MANUAL) e sua
+própria fila. Quem está na fila espera por uma vaga da faixa e da capacidade ao mesmo tempo e não
+conta na capacidade; quem passa ADMISSAO_ESPERA segundos na fila, ou chega com a fila cheia,
+recebe a mensagem de "tente de novo".
+
+A fila só funciona se houver thread para esperar nela: no gthread, uma pergunta na fila também
+segura uma thread. As filas padrão são curtas e a espera é limitada, então uma pergunta pronta
+espera no máximo ADMISSAO_ESPERA segundos por uma thread durante um pico.
+
+Cada cliente (IP, ou o primeiro endereço de ADMISSAO_CABECALHO_CLIENTE atrás de um proxy) tem um
+balde de ADMISSAO_RAJADA_CLIENTE perguntas caras que enche a ADMISSAO_TAXA_CLIENTE por segundo.
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+PRONTA = 'pronta'
+MANUAL = 'manual'
+WEB = 'web'
+
+ATIVA = os.environ.get("ADMISSAO_ATIVA", "1") != "0"
+THREADS = int(os.environ.get("GUNICORN_THREADS", "4"))
+RESERVA = int(os.environ.get("ADMISSAO_RESERVA", "1"))
+ESPERA = float(os.environ.get("ADMISSAO_ESPERA", "3"))
+# Perguntas caras por segundo e rajada por cliente; taxa 0 desliga o limite por cliente
+TAXA_CLIENTE = float(os.environ.get("ADMISSAO_TAXA_CLIENTE", "0.5"))
+RAJADA_CLIENTE = float(os.environ.get("ADMISSAO_RAJADA_CLIENTE", "10"))
+CABECALHO_CLIENTE = os.environ.get("ADMISSAO_CABECALHO_CLIENTE", "")
+MAXIMO_CLIENTES = 10000
+
+
+CAPACIDADE = int(os.environ.get("ADMISSAO_CAPACIDADE", max(1, THREADS - RESERVA)))
+
+
+def limites_padrao(capacidade=CAPACIDADE):
+    """{faixa: (simultâneas, fila)}: o MANUAL pode usar toda a capacidade, a WEB metade e uma fila curta.
+
+    Os padrões partem do gthread padrão (4 threads, 1 de reserva, capacidade 3):
+
+    - MANUAL: limite e fila iguais à capacidade. Uma chamada ao LLM leva de 1 a 3 s, então quem entra
+      na fila costuma ser atendido antes de ADMISSAO_ESPERA;
+    - WEB: metade da capacidade arredondada para cima (2 com o padrão), para que um pico de perguntas
+      fora do manual não tome todas as vagas do MANUAL, e uma fila de um quarto da capacidade, nunca
+      menos de 1. Com limite 1 e fila 0 a segunda pergunta web simultânea era recusada mesmo com a
+      capacidade livre; a fila não passa disso porque uma pergunta web leva até WEB_PRAZO_TOTAL mais
+      o LLM, mais que ADMISSAO_ESPERA, e cada pergunta nela segura uma thread enquanto espera.
+    """
+    return {
+        MANUAL: (int(os.environ.get("ADMISSAO_MANUAL_LIMITE", capacidade)),
+                 int(os.environ.get("ADMISSAO_MANUAL_FILA", capacidade))),
+        WEB: (int(os.environ.get("ADMISSAO_WEB_LIMITE", (capacidade + 1) // 2)),
+              int(os.environ.get("ADMISSAO_WEB_FILA", max(1, capacidade // 4)))),
+    }
+
+
+class RequisicaoRecusada(Exception):
+    """Pergunta não admitida. `motivo` é 'sobrecarga' ou 'limite_cliente'; `espera` vai no Retry-After."""
+
+    def __init__(self, motivo, faixa, espera):
+        super().__init__(f"{motivo} na faixa {faixa}")
+        self.motivo = motivo
+        self.faixa = faixa
+        self.espera = espera
+
+
+class Capacidade:
+    """Vagas de execução divididas por várias faixas; as filas de todas esperam na mesma condição."""
+
+    def __init__(self, limite):
+        self.limite = limite
+        self.ocupadas = 0
+        self.condicao = threading.Condition()
+
+
+class Faixa:
+    """Limite de execuções simultâneas com uma fila de tamanho e espera máximos.
+
+    Com `capacidade`, cada execução ocupa também uma vaga dela; quem está na fila não ocupa.
+    """
+
+    def __init__(self, nome, limite, fila=0, espera=ESPERA, relogio=time.monotonic, capacidade=None):
+        self.nome = nome
+        self.limite = limite
+        self.fila = fila
+        self.espera = espera
+        self.relogio = relogio
+        self.capacidade = capacidade
+        self.ativas = 0
+        self.esperando = 0
+        self.recusadas = 0
+        self._condicao = capacidade.condicao if capacidade is not None else threading.Condition()
+
+    def _livre(self):
+        if self.ativas >= self.limite:
+            return False
+        return self.capacidade is None or self.capacidade.ocupadas < self.capacidade.limite
+
+    def _ocupar(self):
+        self.ativas += 1
+        if self.capacidade is not None:
+            self.capacidade.ocupadas += 1
+
+    def entrar(self):
+        """Ocupa uma vaga; levanta RequisicaoRecusada se a fila estiver cheia ou a espera passar do prazo."""
+        with self._condicao:
+            if self._livre():
+                self._ocupar()
+                return
+            if self.esperando >= self.fila:
+                self.recusadas += 1
+                raise RequisicaoRecusada('sobrecarga', self.nome, max(1, math.ceil(self.espera)))
+            self.esperando += 1
+            limite = self.relogio() + self.espera
+            try:
+                while not self._livre():
+                    restante = limite - self.relogio()
+                    if restante <= 0:
+                        self.recusadas += 1
+                        raise RequisicaoRecusada('sobrecarga', self.nome, max(1, math.ceil(self.espera)))
+                    self._condicao.wait(restante)
+                self._ocupar()
+            finally:
+                self.esperando -= 1
+
+    def sair(self):
+        with self._condicao:
+            self.ativas -= 1
+            if self.capacidade is None:
+                self._condicao.notify()
+                return
+            self.capacidade.ocupadas -= 1
+            # A vaga da capacidade serve a qualquer faixa: acorda todas e cada uma confere a sua
+            self._condicao.notify_all()
+
+
+class LimitadorClientes:
+    """Balde de fichas por cliente: `rajada` perguntas de uma vez, repostas a `taxa` por segundo."""
+
+    def __init__(self, taxa=TAXA_CLIENTE, rajada=RAJADA_CLIENTE, maximo_clientes=MAXIMO_CLIENTES,
+                 relogio=time.monotonic):
+        self.taxa = taxa
+        self.rajada = rajada
+        self.maximo_clientes = maximo_clientes
+        self.relogio = relogio
+        self._baldes = OrderedDict()  # cliente -> (fichas, instante da última atualização)
+        self._lock = threading.Lock()
+
+    def permitir(self, cliente):
+        """Retorna 0 se a pergunta pode seguir, ou os segundos até a próxima ficha."""
+        if self.taxa <= 0:
+            return 0
+        agora = self.relogio()
+        with self._lock:
+            fichas, antes = self._baldes.pop(cliente, (self.rajada, agora))
+            fichas = min(self.rajada, fichas + (agora - antes) * self.taxa)
+            permitido = fichas >= 1
+            if permitido:
+                fichas -= 1
+            self._baldes[cliente] = (fichas, agora)
+            # Clientes que somem saem pelo lado mais antigo (o balde deles já estaria cheio de novo)
+            while len(self._baldes) > self.maximo_clientes:
+                self._baldes.popitem(last=False)
+        return 0 if permitido else (1 - fichas) / self.taxa
+
+
+class ControleAdmissao:
+    """Faixas MANUAL e WEB com limites próprios dentro de uma capacidade comum, e o limite por cliente."""
+
+    def __init__(self, capacidade=CAPACIDADE, limites=None, limitador=None, espera=ESPERA, ativo=ATIVA):
+        limites = limites or limites_padrao(capacidade)
+        self.capacidade = Capacidade(capacidade)
+        self.faixas = {nome: Faixa(nome, limite, fila, espera, capacidade=self.capacidade)
+                       for nome, (limite, fila) in limites.items()}
+        self.limitador = limitador or LimitadorClientes()
+        self.ativo = ativo
+
+    def entrar(self, faixa, cliente):
+        """Ocupa uma vaga da faixa (PRONTA, e tudo se desligado, passa direto); toda entrada pede um sair()."""
+        if not self.ativo or faixa not in self.faixas:
+            return
+        self.verificar_cliente(faixa, cliente)
+        self.faixas[faixa].entrar()
+
+    def verificar_cliente(self, faixa, cliente):
+        """Só o limite por cliente; levanta RequisicaoRecusada('limite_cliente') se o balde estiver vazio."""
+        if not self.ativo:
+            return
+        espera = self.limitador.permitir(cliente)
+        if espera:
+            raise RequisicaoRecusada('limite_cliente', faixa, max(1, math.ceil(espera)))
+
+    def sair(self, faixa):
+        if self.ativo and faixa in self.faixas:
+            self.faixas[faixa].sair()
+
+    def estatisticas(self):
+        faixas = {nome: {'ativas': faixa.ativas, 'esperando': faixa.esperando, 'limite': faixa.limite,
+                         'fila': faixa.fila, 'recusadas': faixa.recusadas}
+                  for nome, faixa in self.faixas.items()}
+        return {'capacidade': self.capacidade.limite, 'ocupadas': self.capacidade.ocupadas,
+                'recusadas': sum(faixa.recusadas for faixa in self.faixas.values()), 'faixas': faixas}
+
+
+def identificar_cliente(endereco, cabecalhos, cabecalho=CABECALHO_CLIENTE):
+    """Chave do cliente para o limite: o primeiro endereço do cabeçalho do proxy, se configurado, ou o IP."""
+    if cabecalho:
+        valor = cabecalhos.get(cabecalho, "")
+        if valor:
+            return valor.split(',')[0].strip()
+    return endereco or "desconhecido"
@@ -0,0 +1,153 @@
+"""Base de conhecimento imutável (chunks + índices) com troca atômica quando os arquivos mudam.
+
+Com o gunicorn em preload_app, a base é montada uma vez no master e os workers a herdam por
+copy-on-write. Cada requisição pega `BaseConhecimento.atual` uma única vez e usa essa versão
+até o fim, então uma recarga no meio do caminho não afeta quem já está sendo atendido.
+"""
+import os
+import threading
+import time
+
+from nucleo import registro
+from nucleo.corpus import carregar_corpus, ler_reforcos
+from nucleo.documentos import NOME_MANUAL_LIMPO, PASTA_CONHECIMENTO, hash_texto
+from nucleo.faq import NOME_ARQUIVO_FAQ, TabelaFAQ
+from nucleo.indice_denso import NOME_ARQUIVO_CHUNKS, NOME_ARQUIVO_INDICE
+from nucleo.recuperacao import criar_recuperador
+
+log = registro.obter('base')
+
+# De quanto em quanto tempo (segundos) os arquivos são conferidos; 0 desliga a recarga automática
+INTERVALO_VERIFICACAO = float(os.environ.get("BASE_INTERVALO_VERIFICACAO", "5"))
+# Fator que multiplica o score dos chunks de cada fonte, ex.: "conhecimento/manual_limpo.txt=1.2"
+REFORCOS_FONTES = ler_reforcos(os.environ.get("RECUPERACAO_REFORCO_FONTES", ""))
+
+
+class VersaoBase:
+    """Uma versão carregada da base. Nunca é alterada depois de criada.
+
+    `faq` tem só as respostas pré-geradas cujo contexto bate com este corpus.
+    """
+
+    def __init__(self, corpus, recuperador, modo, versao, assinatura, faq=None):
+        self.corpus = corpus
+        self.chunks = corpus.chunks
+        self.recuperador = recuperador
+        self.modo = modo
+        self.versao = versao
+        self.assinatura = assinatura
+        self.faq = faq if faq is not None else TabelaFAQ()
+        self.carregada_em = time.time()
+
+
+def assinatura_arquivos(raiz="."):
+    """(caminho, mtime, tamanho) de tudo que, se mudar, exige recarregar a base."""
+    caminhos = [os.path.join(raiz, nome) for nome in (NOME_MANUAL_LIMPO, NOME_ARQUIVO_INDICE, NOME_ARQUIVO_CHUNKS,
+                                                             NOME_ARQUIVO_FAQ)]
+    pasta = os.path.join(raiz, PASTA_CONHECIMENTO)
+    if os.path.isdir(pasta):
+        # A própria pasta entra para detectar arquivos adicionados ou removidos
+        caminhos.append(pasta)
+        caminhos.extend(os.path.join(pasta, nome) for nome in sorted(os.listdir(pasta)))
+
+    assinatura = []
+    for caminho in caminhos:
+        try:
+            estado = os.stat(caminho)
+        except FileNotFoundError:
+            continue
+        assinatura.append((caminho, estado.st_mtime_ns, estado.st_size))
+    return tuple(assinatura)
+
+
+def _modelo_denso(recuperador):
+    """Modelo de embedding já carregado pelo recuperador, para não carregá-lo de novo na recarga."""
+    while hasattr(recuperador, 'recuperador'):  # RecuperadorFAQ envolve o recuperador de verdade
+        recuperador = recuperador.recuperador
+    denso = getattr(recuperador, 'denso', recuperador)
+    return getattr(denso, '_modelo', None)
+
+
+class BaseConhecimento:
+    """Guarda a versão atual da base e a substitui por inteiro quando os arquivos mudam.
+
+    `ao_trocar(versao)` é chamado depois de cada carga (usado para versionar o cache de respostas).
+    """
+
+    def __init__(self, raiz=".", modo="keyword", intervalo_verificacao=INTERVALO_VERIFICACAO, ao_trocar=None,
+                 reforcos=None):
+        self.raiz = raiz
+        self.modo_configurado = modo
+        self.reforcos = REFORCOS_FONTES if reforcos is None else reforcos
+        self.intervalo_verificacao = intervalo_verificacao
+        self.ao_trocar = ao_trocar
+        self.atual = None
+        self._lock_recarga = threading.Lock()
+        self._proxima_verificacao = 0.0
+        self.carregar()
+
+    def _montar(self, assinatura):
+        anterior = self.atual.corpus if self.atual is not None else None
+        corpus, processados = carregar_corpus(self.raiz, anterior=anterior)
+        if not corpus.chunks:
+            log.warning(f"AVISO: Nenhum documento encontrado ('{NOME_MANUAL_LIMPO}' ou '{PASTA_CONHECIMENTO}/').")
+        elif anterior is not None:
+            log.info(f"[BASE] {processados} de {len(corpus.arquivos)} documentos processados de novo.")
+
+        modelo = _modelo_denso(self.atual.recuperador) if self.atual is not None else None
+        recuperador, modo = criar_recuperador(
+            self.modo_configurado, corpus,
+            caminho_indice=os.path.join(self.raiz, NOME_ARQUIVO_INDICE),
+            caminho_chunks=os.path.join(self.raiz, NOME_ARQUIVO_CHUNKS),
+            modelo=modelo, reforcos=self.reforcos,
+        )
+
+        # A versão cobre tudo o que a busca usa: o conteúdo dos documentos e, fora do modo keyword, o índice semântico
+        identidade = repr([(arquivo.fonte, arquivo.hash) for arquivo in corpus.arquivos])
+        if modo != 'keyword':
+            identidade += repr([item[1:] for item in assinatura if item[0].endswith((NOME_ARQUIVO_INDICE, NOME_ARQUIVO_CHUNKS))])
+        faq = TabelaFAQ.carregar(os.path.join(self.raiz, NOME_ARQUIVO_FAQ), corpus)
+        return VersaoBase(corpus, recuperador, modo, hash_texto(identidade), assinatura, faq)
+
+    def carregar(self):
+        """Monta uma versão nova e a publica com uma única atribuição."""
+        assinatura = assinatura_arquivos(self.raiz)
+        nova = self._montar(assinatura)
+        anterior = self.atual
+        self.atual = nova
+        if self.ao_trocar is not None:
+            self.ao_trocar(nova)
+        if anterior is None:
+            log.info(f"Base de conhecimento carregada: {len(nova.corpus.arquivos)} documentos, {len(nova.chunks)} chunks, "
+                  f"{len(nova.corpus.idf)} termos, {len(nova.faq)} respostas da FAQ, modo '{nova.modo}'.")
+        else:
+            log.info(f"[BASE] Arquivos alterados: base recarregada ({len(anterior.chunks)} -> {len(nova.chunks)} chunks).")
+        return nova
+
+    def verificar(self):
+        """Confere os arquivos (no máximo uma vez por intervalo) e agenda a recarga se mudaram.
+
+        Barato o bastante para rodar a cada requisição. A recarga acontece numa thread separada;
+        até ela terminar, as requisições continuam usando a versão anterior.
+        """
+        if self.intervalo_verificacao <= 0:
+            return False
+        agora = time.monotonic()
+        if agora < self._proxima_verificacao:
+            return False
+        self._proxima_verificacao = agora + self.intervalo_verificacao
+        if assinatura_arquivos(self.raiz) == self.atual.assinatura:
+            return False
+        if not self._lock_recarga.acquire(blocking=False):
+            return False  # outra thread já está recarregando
+        threading.Thread(target=self._recarregar, name="recarga-base", daemon=True).start()
+        return True
+
+    def _recarregar(self):
+        try:
+            self.carregar()
+        except Exception as e:
+            # Arquivo pela metade ou índice inválido: mantém a versão atual e tenta de novo depois
+            log.error(f"[BASE] Falha ao recarregar a base, mantendo a versão atual: {e}")
+        finally:
+            self._lock_recarga.release()
@@ -0,0 +1,173 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from nucleo import registro
+from nucleo.metricas import CACHE_RESPOSTAS, ERROS_UPSTREAM
+from nucleo.recuperacao import normalizar_pergunta
+
+log = registro.obter('cache')
+
+
+class CacheLRU:
+    """Cache em memória do processo, com limite de itens e tempo de vida."""
+
+    def __init__(self, capacidade=1024, ttl=3600, relogio=time.monotonic):
+        self.capacidade = capacidade
+        self.ttl = ttl
+        self.relogio = relogio
+        self._itens = OrderedDict()  # chave -> (expira_em, valor)
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._itens.get(chave)
+            if item is None:
+                return None
+            expira_em, valor = item
+            if expira_em <= self.relogio():
+                del self._itens[chave]
+                return None
+            self._itens.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl=None):
+        with self._lock:
+            self._itens[chave] = (self.relogio() + (ttl or self.ttl), valor)
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.capacidade:
+                self._itens.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._itens.clear()
+
+    def __len__(self):
+        return len(self._itens)
+
+
+class BackendMemoria:
+    """Substituto local do backend compartilhado (mesma interface do BackendRedis)."""
+
+    def __init__(self, relogio=time.time):
+        self.relogio = relogio
+        self._dados = {}
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None or item[0] <= self.relogio():
+                self._dados.pop(chave, None)
+                return None
+            return item[1]
+
+    def set(self, chave, valor, ttl):
+        with self._lock:
+            self._dados[chave] = (self.relogio() + ttl, valor)
+
+
+class BackendRedis:
+    """Backend compartilhado entre workers e máquinas. Requer o pacote redis."""
+
+    def __init__(self, url):
+        import redis
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, chave):
+        valor = self._redis.get(chave)
+        return valor.decode('utf-8') if valor is not None else None
+
+    def set(self, chave, valor, ttl):
+        self._redis.set(chave, valor.encode('utf-8'), ex=int(ttl))
+
+
+def hash_contexto(contexto):
+    return hashlib.sha256(contexto.encode('utf-8')).hexdigest()
+
+
+class CacheRespostas:
+    """Cache de respostas do /ask: LRU local na frente de um backend compartilhado opcional.
+
+    A versão do manual entra na chave, então trocar o manual invalida todas as respostas antigas.
+    """
+
+    def __init__(self, local=None, compartilhado=None, ttl=3600):
+        self.local = local if local is not None else CacheLRU(ttl=ttl)
+        self.compartilhado = compartilhado
+        self.ttl = ttl
+        self.versao = ""
+        self.acertos = 0
+        self.falhas = 0
+        self.erros_backend = 0
+        self._lock = threading.Lock()
+
+    def definir_versao(self, versao):
+        """Invalida o cache quando o conteúdo do manual muda."""
+        if versao != self.versao:
+            self.versao = versao
+            self.local.limpar()
+
+    def chave(self, pergunta, idioma, contexto):
+        base = f"{normalizar_pergunta(pergunta)}\x00{idioma}\x00{hash_contexto(contexto)}"
+        return f"resposta:{self.versao[:16]}:{hashlib.sha256(base.encode('utf-8')).hexdigest()}"
+
+    def _contar(self, acertou):
+        with self._lock:
+            if acertou:
+                self.acertos += 1
+            else:
+                self.falhas += 1
+        CACHE_RESPOSTAS.inc(resultado='acerto' if acertou else 'falha')
+
+    def obter(self, pergunta, idioma, contexto):
+        chave = self.chave(pergunta, idioma, contexto)
+        resposta = self.local.get(chave)
+        if resposta is None and self.compartilhado is not None:
+            try:
+                resposta = self.compartilhado.get(chave)
+            except Exception as e:
+                self.erros_backend += 1
+                ERROS_UPSTREAM.inc(servico='cache')
+                log.warning(f"[CACHE] Erro ao ler do backend compartilhado: {e}")
+            if resposta is not None:
+                self.local.set(chave, resposta)
+        self._contar(resposta is not None)
+        return resposta
+
+    def guardar(self, pergunta, idioma, contexto, resposta):
+        chave = self.chave(pergunta, idioma, contexto)
+        self.local.set(chave, resposta)
+        if self.compartilhado is not None:
+            try:
+                self.compartilhado.set(chave, resposta, self.ttl)
+            except Exception as e:
+                self.erros_backend += 1
+                ERROS_UPSTREAM.inc(servico='cache')
+                log.warning(f"[CACHE] Erro ao gravar no backend compartilhado: {e}")
+
+    def estatisticas(self):
+        total = self.acertos + self.falhas
+        return {
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / total if total else 0.0,
+            "itens_locais": len(self.local),
+            "erros_backend": self.erros_backend,
+        }
+
+
+def criar_cache_respostas():
+    """Monta o cache a partir das variáveis CACHE_RESPOSTAS_TTL, CACHE_RESPOSTAS_ITENS e CACHE_RESPOSTAS_URL."""
+    ttl = int(os.environ.get("CACHE_RESPOSTAS_TTL", "3600"))
+    local = CacheLRU(capacidade=int(os.environ.get("CACHE_RESPOSTAS_ITENS", "1024")), ttl=ttl)
+    compartilhado = None
+    url = os.environ.get("CACHE_RESPOSTAS_URL")
+    if url:
+        try:
+            compartilhado = BackendRedis(url)
+        except ImportError:
+            log.warning("AVISO: CACHE_RESPOSTAS_URL definido, mas o pacote 'redis' não está instalado. Usando só o cache local.")
+    return CacheRespostas(local=local, compartilhado=compartilhado, ttl=ttl)
@@ -0,0 +1,193 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+NOME_ARQUIVO_CACHE_WEB = "cache_web.sqlite3"
+# Inserções deste processo entre duas somas completas do tamanho (pega o que os outros workers gravaram)
+RESSINCRONIZAR_A_CADA = 256
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS buscas (
+    chave TEXT PRIMARY KEY,
+    resultados TEXT NOT NULL,
+    salvo_em REAL NOT NULL,
+    acessado_em REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS paginas (
+    url TEXT PRIMARY KEY,
+    texto TEXT NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    salvo_em REAL NOT NULL,
+    acessado_em REAL NOT NULL,
+    tamanho INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS paginas_acessado_em ON paginas (acessado_em);
+"""
+
+
+class PaginaEmCache:
+    """Texto extraído de uma página, com os validadores HTTP para revalidação condicional."""
+
+    def __init__(self, texto, etag, last_modified, fresca):
+        self.texto = texto
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fresca = fresca
+
+    def cabecalhos_condicionais(self):
+        cabecalhos = {}
+        if self.etag:
+            cabecalhos["If-None-Match"] = self.etag
+        if self.last_modified:
+            cabecalhos["If-Modified-Since"] = self.last_modified
+        return cabecalhos
+
+
+class CacheWeb:
+    """Cache em disco (SQLite) das buscas no DuckDuckGo e do texto extraído das páginas.
+
+    Pode ser usado por vários workers ao mesmo tempo: cada processo abre sua própria conexão
+    e o banco roda em modo WAL. Quando passa de tamanho_maximo bytes de texto, as páginas
+    acessadas há mais tempo são removidas.
+
+    O total de bytes é somado no banco ao conectar e depois estimado a cada inserção; a soma
+    completa só roda de novo quando a estimativa passa do limite ou a cada RESSINCRONIZAR_A_CADA
+    inserções, para contar também o que os outros workers gravaram.
+
+    Páginas sem texto aproveitável são guardadas vazias e valem só ttl_negativo: evita baixar de
+    novo a cada pergunta sem prender por dias um site que estava fora do ar ou mudou de layout.
+    """
+
+    def __init__(self, caminho=NOME_ARQUIVO_CACHE_WEB, ttl_busca=24 * 3600, ttl_pagina=7 * 24 * 3600,
+                 tamanho_maximo=200 * 1024 * 1024, relogio=time.time, ttl_negativo=3600):
+        self.caminho = caminho
+        self.ttl_busca = ttl_busca
+        self.ttl_pagina = ttl_pagina
+        self.ttl_negativo = ttl_negativo
+        self.tamanho_maximo = tamanho_maximo
+        self.relogio = relogio
+        self._lock = threading.Lock()
+        self._conexao = None
+        self._pid = None
+        self._total = None
+        self._insercoes = 0
+
+    def _conectar(self):
+        # Conexões SQLite não podem atravessar um fork (gunicorn com preload_app)
+        if self._conexao is None or self._pid != os.getpid():
+            conexao = sqlite3.connect(self.caminho, timeout=5, check_same_thread=False, isolation_level=None)
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+            conexao.executescript(_ESQUEMA)
+            self._conexao = conexao
+            self._pid = os.getpid()
+            self._total = None
+        return self._conexao
+
+    @staticmethod
+    def chave_busca(pergunta, regiao, max_resultados):
+        return f"{regiao}\x00{max_resultados}\x00{' '.join(pergunta.lower().split())}"
+
+    def obter_busca(self, pergunta, regiao, max_resultados):
+        chave = self.chave_busca(pergunta, regiao, max_resultados)
+        agora = self.relogio()
+        with self._lock:
+            conexao = self._conectar()
+            linha = conexao.execute("SELECT resultados, salvo_em FROM buscas WHERE chave = ?", (chave,)).fetchone()
+            if linha is None:
+                return None
+            if linha[1] + self.ttl_busca <= agora:
+                conexao.execute("DELETE FROM buscas WHERE chave = ?", (chave,))
+                return None
+            conexao.execute("UPDATE buscas SET acessado_em = ? WHERE chave = ?", (agora, chave))
+        return json.loads(linha[0])
+
+    def guardar_busca(self, pergunta, regiao, max_resultados, resultados):
+        chave = self.chave_busca(pergunta, regiao, max_resultados)
+        agora = self.relogio()
+        with self._lock:
+            self._conectar().execute(
+                "INSERT OR REPLACE INTO buscas (chave, resultados, salvo_em, acessado_em) VALUES (?, ?, ?, ?)",
+                (chave, json.dumps(resultados, ensure_ascii=False), agora, agora))
+
+    def obter_pagina(self, url):
+        """Retorna um PaginaEmCache (fresca ou vencida) ou None se a URL nunca foi baixada."""
+        agora = self.relogio()
+        with self._lock:
+            conexao = self._conectar()
+            linha = conexao.execute("SELECT texto, etag, last_modified, salvo_em FROM paginas WHERE url = ?",
+                                    (url,)).fetchone()
+            if linha is None:
+                return None
+            conexao.execute("UPDATE paginas SET acessado_em = ? WHERE url = ?", (agora, url))
+        texto, etag, last_modified, salvo_em = linha
+        ttl = self.ttl_pagina if texto else self.ttl_negativo
+        return PaginaEmCache(texto, etag, last_modified, fresca=salvo_em + ttl > agora)
+
+    def guardar_pagina(self, url, texto, etag=None, last_modified=None):
+        """Guarda o texto extraído; sem texto (None ou vazio) a entrada vale só ttl_negativo."""
+        texto = texto or ""
+        tamanho = len(texto.encode('utf-8'))
+        agora = self.relogio()
+        with self._lock:
+            conexao = self._conectar()
+            anterior = conexao.execute("SELECT tamanho FROM paginas WHERE url = ?", (url,)).fetchone()
+            conexao.execute(
+                "INSERT OR REPLACE INTO paginas (url, texto, etag, last_modified, salvo_em, acessado_em, tamanho) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, texto, etag, last_modified, agora, agora, tamanho))
+            self._despejar(conexao, tamanho - (anterior[0] if anterior else 0))
+
+    def renovar_pagina(self, url):
+        """O servidor respondeu 304: o texto guardado continua válido por mais um ttl_pagina."""
+        agora = self.relogio()
+        with self._lock:
+            self._conectar().execute("UPDATE paginas SET salvo_em = ?, acessado_em = ? WHERE url = ?",
+                                     (agora, agora, url))
+
+    @staticmethod
+    def _somar(conexao):
+        return conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM paginas").fetchone()[0]
+
+    def _despejar(self, conexao, acrescimo):
+        self._insercoes += 1
+        if self._total is None or self._insercoes >= RESSINCRONIZAR_A_CADA:
+            self._total = self._somar(conexao)
+            self._insercoes = 0
+        else:
+            self._total += acrescimo
+            if self._total <= self.tamanho_maximo:
+                return
+            self._total = self._somar(conexao)
+        if self._total <= self.tamanho_maximo:
+            return
+        # Libera até 90% do limite para não despejar a cada inserção
+        alvo = self._total - int(self.tamanho_maximo * 0.9)
+        liberado = 0
+        remover = []
+        for url, tamanho in conexao.execute("SELECT url, tamanho FROM paginas ORDER BY acessado_em"):
+            remover.append((url,))
+            liberado += tamanho
+            if liberado >= alvo:
+                break
+        conexao.executemany("DELETE FROM paginas WHERE url = ?", remover)
+        self._total -= liberado
+        conexao.execute("DELETE FROM buscas WHERE salvo_em + ? <= ?", (self.ttl_busca, self.relogio()))
+
+
+def criar_cache_web():
+    """Cache configurado por CACHE_WEB_ARQUIVO (vazio desliga), CACHE_WEB_TTL_BUSCA, CACHE_WEB_TTL_PAGINA,
+    CACHE_WEB_TTL_NEGATIVO e CACHE_WEB_MB."""
+    caminho = os.environ.get("CACHE_WEB_ARQUIVO", NOME_ARQUIVO_CACHE_WEB)
+    if not caminho:
+        return None
+    return CacheWeb(
+        caminho,
+        ttl_busca=float(os.environ.get("CACHE_WEB_TTL_BUSCA", 24 * 3600)),
+        ttl_pagina=float(os.environ.get("CACHE_WEB_TTL_PAGINA", 7 * 24 * 3600)),
+        tamanho_maximo=int(float(os.environ.get("CACHE_WEB_MB", "200")) * 1024 * 1024),
+        ttl_negativo=float(os.environ.get("CACHE_WEB_TTL_NEGATIVO", 3600)),
+    )
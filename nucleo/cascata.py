@@ -0,0 +1,90 @@
+"""Escolha da fonte (manual ou web) antes de gerar a resposta, pela confiança da recuperação.
+
+A confiança é a cobertura da pergunta pelos chunks recuperados: a fração do idf dos termos da
+pergunta que aparece nesses chunks. Palavras que não existem em nenhum lugar do manual contam com
+o maior idf possível, então "Quem ganhou a Copa de 2002?" fica perto de zero e "Como instalar o
+software?" perto de um (benchmarks/dados: perguntas do manual ≥ 0.35, perguntas de fora ≤ 0.23;
+metade das do manual fica abaixo de 0.6, então a faixa especulativa é estreita para não buscar à toa).
+
+- confiança ≥ CASCATA_LIMITE_MANUAL: responde com o manual (a busca web só se o LLM disser que não achou);
+- confiança < CASCATA_LIMITE_WEB: vai direto para a web, sem gastar uma chamada ao LLM com o manual;
+- entre os dois: gera com o manual e, em paralelo, já busca na web; se o manual falhar, o contexto
+  da web está pronto e a espera é o maior dos dois tempos, e não a soma.
+
+O manual é em português: em outros idiomas a cobertura não diz muito e a pergunta nunca pula o manual.
+"""
+import asyncio
+import math
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from nucleo.indice_lexico import STOP_WORDS, tokenizar
+
+LIMITE_MANUAL = float(os.environ.get("CASCATA_LIMITE_MANUAL", "0.4"))
+LIMITE_WEB = float(os.environ.get("CASCATA_LIMITE_WEB", "0.25"))
+
+MANUAL = 'manual'
+WEB = 'web'
+ESPECULAR = 'especular'
+
+# Buscas especulativas rodam aqui, e não no executor de nucleo/web.py, que elas mesmas usam para os downloads
+THREADS = int(os.environ.get("CASCATA_THREADS", "4"))
+_executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="cascata")
+_vagas = threading.BoundedSemaphore(THREADS)
+
+
+def cobertura(pergunta, chunks, corpus):
+    """Fração (0 a 1) do idf dos termos da pergunta presente em algum dos chunks."""
+    termos = set(tokenizar(pergunta)) - STOP_WORDS
+    if not termos:
+        return 0.0
+    # idf de um termo que não aparece em nenhum chunk (df = 0)
+    idf_ausente = math.log(1 + (len(corpus) + 0.5) / 0.5)
+    presentes = set()
+    for chunk in chunks:
+        presentes.update(tokenizar(chunk))
+    total = sum(corpus.idf.get(termo, idf_ausente) for termo in termos)
+    cobertos = sum(corpus.idf.get(termo, idf_ausente) for termo in termos if termo in presentes)
+    return cobertos / total
+
+
+class ControladorCascata:
+    """Decide a rota de cada pergunta: MANUAL, WEB ou ESPECULAR (manual com a web buscada em paralelo)."""
+
+    def __init__(self, limite_manual=LIMITE_MANUAL, limite_web=LIMITE_WEB):
+        self.limite_manual = limite_manual
+        self.limite_web = limite_web
+
+    def decidir(self, pergunta, resultados, corpus, idioma='pt'):
+        """Retorna (rota, confiança) a partir dos pares (chunk, score) do recuperador."""
+        if not resultados:
+            return WEB, 0.0
+        confianca = cobertura(pergunta, [chunk for chunk, _ in resultados], corpus)
+        if confianca >= self.limite_manual:
+            return MANUAL, confianca
+        if confianca < self.limite_web and idioma == 'pt':
+            return WEB, confianca
+        return ESPECULAR, confianca
+
+
+def especular(funcao, *args):
+    """Começa `funcao(*args)` numa thread e devolve o Future; o resultado só é lido se o manual falhar.
+
+    Com todas as vagas ocupadas devolve None e a pergunta segue a cascata em série: uma busca
+    especulativa não pode atrasar a fila das buscas que já são necessárias.
+    """
+    if not _vagas.acquire(blocking=False):
+        return None
+    futuro = _executor.submit(funcao, *args)
+    futuro.add_done_callback(lambda _: _vagas.release())
+    return futuro
+
+
+def especular_async(funcao, *args):
+    """Versão para asyncio: cria a task da corrotina `funcao(*args)`, ou devolve None sem vagas."""
+    if not _vagas.acquire(blocking=False):
+        return None
+    tarefa = asyncio.ensure_future(funcao(*args))
+    tarefa.add_done_callback(lambda _: _vagas.release())
+    return tarefa
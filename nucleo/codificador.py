@@ -0,0 +1,161 @@
+"""Codificador das perguntas da busca semântica: SentenceTransformer (PyTorch) ou ONNX int8 na CPU.
+
+O SentenceTransformer importa o torch e carrega o modelo inteiro em float32, o que domina o
+tempo de partida e a memória de cada worker. `construir_indice.py --onnx` exporta o mesmo modelo
+(transformer + mean pooling) para ONNX, quantiza os pesos para int8 e grava em codificador_onnx/
+junto com o tokenizer. Com RECUPERACAO_CODIFICADOR=onnx as perguntas são codificadas pelo
+onnxruntime, sem importar o torch; o índice continua sendo gerado com o modelo original.
+
+Os dois expõem o mesmo `encode(textos, normalize_embeddings=...)` usado pelo recuperador.
+"""
+import json
+import os
+import time
+
+from nucleo import registro
+from nucleo.dependencias import ModuloPreguicoso
+from nucleo.indice_denso import MODELO_EMBEDDING, escrever_atomicamente
+
+log = registro.obter('codificador')
+
+np = ModuloPreguicoso('numpy')
+
+CODIFICADORES = ('torch', 'onnx')
+CODIFICADOR = os.environ.get("RECUPERACAO_CODIFICADOR", "torch")
+PASTA_ONNX = "codificador_onnx"
+NOME_ARQUIVO_MANIFESTO_ONNX = "codificador.json"
+# Threads do onnxruntime por sessão; cada pergunta é um texto curto, e os workers já rodam em paralelo
+THREADS_ONNX = int(os.environ.get("CODIFICADOR_THREADS", "1"))
+
+
+class CodificadorONNX:
+    """Mesma interface do SentenceTransformer.encode, com o modelo exportado por exportar_onnx."""
+
+    def __init__(self, pasta=PASTA_ONNX, threads=THREADS_ONNX):
+        import onnxruntime
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(pasta, NOME_ARQUIVO_MANIFESTO_ONNX), "r", encoding="utf-8") as f:
+            self.manifesto = json.load(f)
+        opcoes = onnxruntime.SessionOptions()
+        opcoes.intra_op_num_threads = threads
+        opcoes.inter_op_num_threads = 1
+        self.sessao = onnxruntime.InferenceSession(
+            os.path.join(pasta, self.manifesto['arquivo']), opcoes, providers=['CPUExecutionProvider'])
+        self.entradas = {entrada.name for entrada in self.sessao.get_inputs()}
+        self.tokenizer = Tokenizer.from_file(os.path.join(pasta, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.manifesto['max_tokens'])
+        self.tokenizer.enable_padding(pad_id=self.manifesto['pad_id'], pad_token=self.manifesto['pad_token'])
+
+    def get_sentence_embedding_dimension(self):
+        return self.manifesto['dimensao']
+
+    def encode(self, textos, batch_size=32, normalize_embeddings=False, convert_to_numpy=True, **_):
+        vetores = []
+        for inicio in range(0, len(textos), batch_size):
+            codificados = self.tokenizer.encode_batch(list(textos[inicio:inicio + batch_size]))
+            entradas = {
+                'input_ids': np.array([item.ids for item in codificados], dtype='int64'),
+                'attention_mask': np.array([item.attention_mask for item in codificados], dtype='int64'),
+            }
+            if 'token_type_ids' in self.entradas:
+                entradas['token_type_ids'] = np.array([item.type_ids for item in codificados], dtype='int64')
+            vetores.append(self.sessao.run(None, entradas)[0])
+        if not vetores:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype='float32')
+        matriz = np.vstack(vetores).astype('float32')
+        if normalize_embeddings:
+            matriz /= np.maximum(np.linalg.norm(matriz, axis=1, keepdims=True), 1e-12)
+        return matriz
+
+
+def ler_manifesto_onnx(pasta=PASTA_ONNX):
+    caminho = os.path.join(pasta, NOME_ARQUIVO_MANIFESTO_ONNX)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def carregar_codificador(nome_modelo=MODELO_EMBEDDING, codificador=CODIFICADOR, raiz="."):
+    """Codificador configurado; volta para o SentenceTransformer se o ONNX não estiver disponível."""
+    if codificador not in CODIFICADORES:
+        log.warning(f"AVISO: Codificador '{codificador}' desconhecido. Usando 'torch'.")
+    elif codificador == 'onnx':
+        pasta = os.path.join(raiz, PASTA_ONNX)
+        manifesto = ler_manifesto_onnx(pasta)
+        if manifesto.get('modelo') != nome_modelo:
+            log.warning(f"AVISO: '{pasta}' não tem o modelo '{nome_modelo}'. Rode construir_indice.py --onnx. "
+                        "Usando 'torch'.")
+        else:
+            try:
+                return CodificadorONNX(pasta)
+            except ImportError as e:
+                log.warning(f"AVISO: Dependências do codificador ONNX ausentes ({e}). Usando 'torch'.")
+
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(nome_modelo)
+
+
+def exportar_onnx(nome_modelo=MODELO_EMBEDDING, pasta=PASTA_ONNX, quantizar=True, modelo=None):
+    """Exporta o SentenceTransformer (transformer + mean pooling) para ONNX e quantiza os pesos para int8.
+
+    Precisa de torch, onnx e onnxruntime; só roda offline. Retorna um dicionário com estatísticas.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    inicio = time.perf_counter()
+    if modelo is None:
+        from sentence_transformers import SentenceTransformer
+        modelo = SentenceTransformer(nome_modelo, device='cpu')
+    transformer, pooling = modelo[0], modelo[1]
+    # 'pooling_mode' nas versões novas do sentence-transformers, flags pooling_mode_*_tokens nas antigas
+    if getattr(pooling, 'pooling_mode', None) != 'mean' and not getattr(pooling, 'pooling_mode_mean_tokens', False):
+        raise ValueError(f"O modelo '{nome_modelo}' não usa mean pooling; a exportação só cobre esse caso.")
+
+    class TransformerComPooling(torch.nn.Module):
+        def __init__(self, auto_model):
+            super().__init__()
+            self.auto_model = auto_model
+
+        def forward(self, input_ids, attention_mask):
+            tokens = self.auto_model(input_ids=input_ids, attention_mask=attention_mask)[0]
+            mascara = attention_mask.unsqueeze(-1).to(tokens.dtype)
+            return (tokens * mascara).sum(1) / mascara.sum(1).clamp(min=1e-9)
+
+    rede = TransformerComPooling(transformer.auto_model).eval()
+    tokenizer = transformer.tokenizer
+    exemplo = tokenizer(["Como instalar o Console Mix?"], return_tensors='pt')
+    os.makedirs(pasta, exist_ok=True)
+    caminho_float = os.path.join(pasta, "modelo.onnx")
+    dinamicos = {'input_ids': {0: 'lote', 1: 'tokens'}, 'attention_mask': {0: 'lote', 1: 'tokens'},
+                 'embedding': {0: 'lote'}}
+    with torch.no_grad():
+        torch.onnx.export(rede, (exemplo['input_ids'], exemplo['attention_mask']), caminho_float,
+                          input_names=['input_ids', 'attention_mask'], output_names=['embedding'],
+                          dynamic_axes=dinamicos, opset_version=17, dynamo=False)
+
+    arquivo = "modelo.onnx"
+    if quantizar:
+        arquivo = "modelo_int8.onnx"
+        quantize_dynamic(caminho_float, os.path.join(pasta, arquivo), weight_type=QuantType.QInt8)
+        os.remove(caminho_float)
+    tokenizer.save_pretrained(pasta)
+
+    manifesto = {
+        'modelo': nome_modelo, 'arquivo': arquivo, 'quantizado': quantizar,
+        'dimensao': modelo.get_sentence_embedding_dimension(), 'max_tokens': modelo.max_seq_length,
+        'pad_id': tokenizer.pad_token_id, 'pad_token': tokenizer.pad_token,
+        'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+    def salvar_manifesto(caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump(manifesto, f, ensure_ascii=False, indent=2)
+
+    # O manifesto vai por último: sem ele o servidor não usa a pasta
+    escrever_atomicamente(os.path.join(pasta, NOME_ARQUIVO_MANIFESTO_ONNX), salvar_manifesto)
+    return {'arquivo': os.path.join(pasta, arquivo),
+            'bytes': os.path.getsize(os.path.join(pasta, arquivo)),
+            'segundos': time.perf_counter() - inicio}
@@ -0,0 +1,215 @@
+"""Corpus com todos os documentos da base (manual_limpo.txt + conhecimento/), indexado por documento.
+
+Cada documento guarda seus chunks (com fonte e seção) e suas próprias postings. Numa recarga,
+só os documentos cujo conteúdo mudou são divididos e tokenizados de novo; as estatísticas
+globais do BM25 (df/idf e comprimento médio) são somadas a partir das postings prontas.
+"""
+import heapq
+import math
+import os
+from collections import Counter, defaultdict
+
+from nucleo import registro
+from nucleo.documentos import (MAX_TOKENS_CHUNK, SOBREPOSICAO_TOKENS, dividir_por_perguntas, hash_texto, ler_documento,
+                                listar_documentos, separar_pergunta)
+from nucleo.indice_lexico import STOP_WORDS, contar_termos, tokenizar
+
+log = registro.obter('corpus')
+
+TAMANHO_MAXIMO_TITULO = 60
+
+
+class Chunk:
+    """Trecho de um documento com a origem: arquivo (fonte), seção e posição dentro do arquivo.
+
+    `pergunta` é a pergunta do manual que o chunk responde (formato "Pergunta? Resposta"), se houver.
+    """
+
+    __slots__ = ('texto', 'fonte', 'secao', 'posicao', 'pergunta')
+
+    def __init__(self, texto, fonte, secao, posicao, pergunta=None):
+        self.texto = texto
+        self.fonte = fonte
+        self.secao = secao
+        self.posicao = posicao
+        self.pergunta = pergunta
+
+    def __repr__(self):
+        return f"<Chunk {self.fonte}#{self.posicao} secao={self.secao!r}>"
+
+
+def titulo_do_paragrafo(paragrafo):
+    """Título de seção no início do parágrafo, ou None.
+
+    Reconhece a pergunta inicial do formato pergunta/resposta e linhas curtas sem ponto final
+    (como "Processo de Instalação" ou "Sound (Configurações da Interface de Áudio):").
+    """
+    primeira_linha = paragrafo.strip().split('\n', 1)[0].strip()
+    if not primeira_linha:
+        return None
+    pergunta, _ = separar_pergunta(primeira_linha)
+    if pergunta:
+        return pergunta
+    if len(primeira_linha) <= TAMANHO_MAXIMO_TITULO and not primeira_linha.endswith(('.', ',', ';')):
+        return primeira_linha.rstrip(':').strip()
+    return None
+
+
+def dividir_documento(texto, fonte, max_tokens=MAX_TOKENS_CHUNK, sobreposicao=SOBREPOSICAO_TOKENS):
+    """Divide o documento em Chunks; um chunk sem título próprio herda a seção do anterior."""
+    chunks = []
+    secao_atual = None
+    for posicao, (pergunta, texto_chunk) in enumerate(dividir_por_perguntas(texto, max_tokens, sobreposicao)):
+        if pergunta:
+            secao = secao_atual = pergunta
+        else:
+            titulos = [titulo for titulo in map(titulo_do_paragrafo, texto_chunk.split('\n\n')) if titulo]
+            secao = titulos[0] if titulos else secao_atual
+            if titulos:
+                secao_atual = titulos[-1]
+        chunks.append(Chunk(texto_chunk, fonte, secao, posicao, pergunta))
+    return chunks
+
+
+def chave_pergunta(pergunta):
+    """Forma da pergunta usada na tabela de perguntas: sem acentos, caixa, pontuação e espaços extras."""
+    return ' '.join(tokenizar(pergunta))
+
+
+class DocumentoCorpus:
+    """Um arquivo já dividido e indexado. Reaproveitado enquanto o hash do conteúdo não mudar.
+
+    Guarda só o que não depende do resto do corpus: postings locais e o comprimento dos chunks.
+    """
+
+    def __init__(self, fonte, texto, max_tokens=MAX_TOKENS_CHUNK, sobreposicao=SOBREPOSICAO_TOKENS):
+        self.fonte = fonte
+        self.hash = hash_texto(texto)
+        self.parametros = (max_tokens, sobreposicao)
+        self.chunks = dividir_documento(texto, fonte, max_tokens, sobreposicao)
+        self.postings = defaultdict(list)  # termo -> [(posição do chunk no arquivo, frequência)]
+        self.comprimentos = []
+        for posicao, chunk in enumerate(self.chunks):
+            contagem, comprimento = contar_termos(chunk.texto)
+            self.comprimentos.append(comprimento)
+            for termo, frequencia in contagem.items():
+                self.postings[termo].append((posicao, frequencia))
+
+
+class Corpus:
+    """BM25 sobre os chunks de todos os documentos, com filtro e reforço por fonte.
+
+    O idf e o comprimento médio são do corpus inteiro, mas as postings ficam separadas por
+    arquivo: uma busca filtrada só percorre os arquivos pedidos. Expõe `documentos` e `buscar`
+    como o IndiceBM25, então serve direto no RecuperadorLexico.
+    """
+
+    def __init__(self, arquivos, k1=1.5, b=0.75):
+        self.arquivos = list(arquivos)
+        self.k1 = k1
+        self.b = b
+        self.chunks = []
+        # Os chunks de cada arquivo ficam contíguos: fonte -> (primeiro id, último id + 1)
+        self.faixas = {}
+        self._inicio = {}
+        frequencia_documentos = Counter()
+        comprimentos = []
+        for arquivo in self.arquivos:
+            inicio = len(self.chunks)
+            self.chunks.extend(arquivo.chunks)
+            comprimentos.extend(arquivo.comprimentos)
+            self.faixas[arquivo.fonte] = (inicio, len(self.chunks))
+            self._inicio[arquivo.fonte] = inicio
+            for termo, lista in arquivo.postings.items():
+                frequencia_documentos[termo] += len(lista)
+        self.documentos = [chunk.texto for chunk in self.chunks]
+
+        # Pergunta do manual -> ids dos chunks com a resposta (mais de um se a resposta foi dividida)
+        self.perguntas = {}
+        for idx, chunk in enumerate(self.chunks):
+            if chunk.pergunta:
+                self.perguntas.setdefault(chave_pergunta(chunk.pergunta), []).append(idx)
+
+        total = len(self.chunks)
+        media = sum(comprimentos) / total if total else 0.0
+        self.normalizacao = [k1 * (1 - b + b * comprimento / media) if media else k1 for comprimento in comprimentos]
+        self.idf = {termo: math.log(1 + (total - df + 0.5) / (df + 0.5)) for termo, df in frequencia_documentos.items()}
+
+    def __len__(self):
+        return len(self.chunks)
+
+    @property
+    def fontes(self):
+        return list(self.faixas)
+
+    def buscar_pergunta(self, pergunta, fontes=None):
+        """Ids dos chunks que respondem exatamente esta pergunta do manual (lista vazia se nenhum)."""
+        ids = self.perguntas.get(chave_pergunta(pergunta), [])
+        if fontes:
+            ids = [idx for idx in ids if self.chunks[idx].fonte in fontes]
+        return ids
+
+    def pontuar(self, consulta, fontes=None):
+        """Retorna {id do chunk: score}, olhando só os arquivos de `fontes` (todos se None)."""
+        termos = [termo for termo in set(tokenizar(consulta)) - STOP_WORDS if termo in self.idf]
+        arquivos = self.arquivos if not fontes else [arquivo for arquivo in self.arquivos if arquivo.fonte in fontes]
+        scores = defaultdict(float)
+        k1_mais_1 = self.k1 + 1
+        normalizacao = self.normalizacao
+        for arquivo in arquivos:
+            inicio = self._inicio[arquivo.fonte]
+            for termo in termos:
+                lista = arquivo.postings.get(termo)
+                if not lista:
+                    continue
+                idf = self.idf[termo]
+                for posicao, frequencia in lista:
+                    idx = inicio + posicao
+                    scores[idx] += idf * frequencia * k1_mais_1 / (frequencia + normalizacao[idx])
+        return scores
+
+    def buscar(self, consulta, top_k=3, fontes=None, reforcos=None):
+        """Retorna até top_k pares (id do chunk, score).
+
+        `fontes` restringe a busca a esses arquivos; `reforcos` ({fonte: fator}) multiplica o
+        score dos chunks de cada fonte.
+        """
+        scores = self.pontuar(consulta, fontes)
+        if reforcos:
+            chunks = self.chunks
+            scores = {idx: score * reforcos.get(chunks[idx].fonte, 1.0) for idx, score in scores.items()}
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+
+def carregar_corpus(raiz=".", anterior=None, max_tokens=MAX_TOKENS_CHUNK, sobreposicao=SOBREPOSICAO_TOKENS):
+    """Lê todos os documentos da base; os que não mudaram desde `anterior` não são reprocessados.
+
+    Retorna (corpus, número de documentos processados de novo).
+    """
+    existentes = {arquivo.fonte: arquivo for arquivo in anterior.arquivos} if anterior is not None else {}
+    arquivos = []
+    processados = 0
+    for caminho in listar_documentos(raiz):
+        fonte = os.path.relpath(caminho, raiz)
+        texto = ler_documento(caminho)
+        arquivo = existentes.get(fonte)
+        if (arquivo is None or arquivo.hash != hash_texto(texto)
+                or arquivo.parametros != (max_tokens, sobreposicao)):
+            arquivo = DocumentoCorpus(fonte, texto, max_tokens, sobreposicao)
+            processados += 1
+        arquivos.append(arquivo)
+    return Corpus(arquivos), processados
+
+
+def ler_reforcos(texto):
+    """Converte "fonte=fator,fonte=fator" (variável RECUPERACAO_REFORCO_FONTES) em dicionário."""
+    reforcos = {}
+    for item in texto.split(','):
+        if '=' not in item:
+            continue
+        fonte, fator = item.rsplit('=', 1)
+        try:
+            reforcos[fonte.strip()] = float(fator)
+        except ValueError:
+            log.warning(f"AVISO: Reforço inválido para a fonte '{fonte.strip()}': {fator!r}")
+    return reforcos
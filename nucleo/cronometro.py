@@ -0,0 +1,57 @@
+"""Tempo gasto em cada etapa de uma pergunta (intenção, recuperação, LLM, web).
+
+O api.py devolve as medições no cabeçalho Server-Timing do /ask, que o benchmarks/bench_carga.py
+lê para calcular os percentis por etapa, e as envia aos histogramas de nucleo/metricas.py.
+"""
+import time
+from contextlib import contextmanager
+
+
+class Cronometro:
+    """Acumula a duração de cada etapa; uma etapa repetida (ex.: duas chamadas ao LLM) soma.
+
+    `ao_medir(etapa, segundos)` é chamado a cada medição (ex.: metricas.observar_etapa).
+    """
+
+    def __init__(self, relogio=time.perf_counter, ao_medir=None):
+        self.relogio = relogio
+        self.ao_medir = ao_medir
+        self.inicio = relogio()
+        self.etapas = {}
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = self.relogio()
+        try:
+            yield
+        finally:
+            self.registrar(etapa, self.relogio() - inicio)
+
+    def registrar(self, etapa, segundos):
+        self.etapas[etapa] = self.etapas.get(etapa, 0.0) + segundos
+        if self.ao_medir is not None:
+            self.ao_medir(etapa, segundos)
+
+    def total(self):
+        return self.relogio() - self.inicio
+
+    def server_timing(self):
+        """Valor do cabeçalho Server-Timing (durações em milissegundos), com o total no fim."""
+        partes = [f"{etapa};dur={segundos * 1000:.1f}" for etapa, segundos in self.etapas.items()]
+        partes.append(f"total;dur={self.total() * 1000:.1f}")
+        return ", ".join(partes)
+
+
+def ler_server_timing(cabecalho):
+    """Converte "etapa;dur=12.3, ..." em {etapa: milissegundos}."""
+    etapas = {}
+    for parte in (cabecalho or "").split(','):
+        nome, _, parametros = parte.strip().partition(';')
+        for parametro in parametros.split(';'):
+            chave, _, valor = parametro.strip().partition('=')
+            if nome and chave == 'dur':
+                try:
+                    etapas[nome] = float(valor)
+                except ValueError:
+                    pass
+    return etapas
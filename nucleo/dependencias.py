@@ -0,0 +1,41 @@
+"""Importação sob demanda das dependências pesadas (faiss, torch, trafilatura...).
+
+Um worker do gunicorn ou o app do Streamlit só paga o custo de importar um backend quando
+ele é usado de fato: com RECUPERACAO_MODO=keyword, por exemplo, faiss e sentence_transformers
+nunca são carregados.
+"""
+import importlib
+import importlib.util
+import threading
+
+
+class ModuloPreguicoso:
+    """Representa um módulo que só é importado no primeiro acesso a um atributo."""
+
+    def __init__(self, nome):
+        self._nome = nome
+        self._modulo = None
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        if self._modulo is None:
+            with self._lock:
+                if self._modulo is None:
+                    self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+
+    @property
+    def carregado(self):
+        return self._modulo is not None
+
+    def __getattr__(self, atributo):
+        return getattr(self.carregar(), atributo)
+
+    def __repr__(self):
+        estado = "carregado" if self.carregado else "não carregado"
+        return f"<ModuloPreguicoso {self._nome} ({estado})>"
+
+
+def disponivel(nome):
+    """Verifica se um pacote opcional está instalado sem importá-lo."""
+    return importlib.util.find_spec(nome) is not None
@@ -0,0 +1,149 @@
+import hashlib
+import os
+import re
+
+NOME_MANUAL_LIMPO = "manual_limpo.txt"
+PASTA_CONHECIMENTO = "conhecimento"
+EXTENSOES_SUPORTADAS = ('.txt', '.md')
+
+# Limite de tamanho de cada chunk e quantos tokens do fim de um pedaço se repetem no começo do próximo
+MAX_TOKENS_CHUNK = int(os.environ.get("CHUNK_MAX_TOKENS", "256"))
+SOBREPOSICAO_TOKENS = int(os.environ.get("CHUNK_SOBREPOSICAO_TOKENS", "0"))
+
+# "Pergunta? Resposta": a pergunta que abre o parágrafo no formato do manual
+_PERGUNTA_INICIAL = re.compile(r'^([^?.!\n]{3,200}\?)\s*')
+_FIM_DE_FRASE = re.compile(r'(?<=[.!?;])\s+')
+
+
+def dividir_em_chunks(texto, tamanho_chunk=500):
+    """Divide o texto em chunks menores baseados em parágrafos."""
+    paragrafos = texto.split('\n\n')
+    chunks = []
+    chunk_atual = ""
+
+    for paragrafo in paragrafos:
+        if len(chunk_atual) + len(paragrafo) < tamanho_chunk:
+            chunk_atual += paragrafo + "\n\n"
+        else:
+            if chunk_atual:
+                chunks.append(chunk_atual.strip())
+            chunk_atual = paragrafo + "\n\n"
+
+    if chunk_atual:
+        chunks.append(chunk_atual.strip())
+
+    return chunks
+
+
+def estimar_tokens(texto):
+    """Estimativa do número de tokens do LLM (~4 caracteres por token em pt/es/en)."""
+    return (len(texto) + 3) // 4
+
+
+def separar_pergunta(paragrafo):
+    """Retorna (pergunta, resposta) se o parágrafo começa com uma pergunta, senão (None, paragrafo)."""
+    encontrada = _PERGUNTA_INICIAL.match(paragrafo)
+    if not encontrada:
+        return None, paragrafo
+    return ' '.join(encontrada.group(1).split()), paragrafo[encontrada.end():]
+
+
+def _frases(texto, max_tokens):
+    """Quebra em frases; uma frase maior que max_tokens é cortada entre palavras."""
+    frases = []
+    for frase in _FIM_DE_FRASE.split(texto.strip()):
+        if estimar_tokens(frase) <= max_tokens:
+            frases.append(frase)
+            continue
+        pedaco = ""
+        for palavra in frase.split():
+            if pedaco and estimar_tokens(pedaco) + estimar_tokens(palavra) + 1 > max_tokens:
+                frases.append(pedaco)
+                pedaco = ""
+            pedaco = f"{pedaco} {palavra}" if pedaco else palavra
+        if pedaco:
+            frases.append(pedaco)
+    return frases
+
+
+def _janelas(texto, max_tokens, sobreposicao):
+    """Agrupa as frases do texto em janelas de até max_tokens, repetindo até `sobreposicao` tokens."""
+    janelas, atual = [], []
+    for frase in _frases(texto, max_tokens):
+        if atual and estimar_tokens(' '.join(atual + [frase])) > max_tokens:
+            janelas.append(' '.join(atual))
+            repetidas = []
+            for anterior in reversed(atual):
+                candidatas = [anterior] + repetidas
+                if (estimar_tokens(' '.join(candidatas)) > sobreposicao
+                        or estimar_tokens(' '.join(candidatas + [frase])) > max_tokens):
+                    break
+                repetidas.insert(0, anterior)
+            atual = repetidas
+        atual.append(frase)
+    if atual:
+        janelas.append(' '.join(atual))
+    return janelas
+
+
+def dividir_por_perguntas(texto, max_tokens=MAX_TOKENS_CHUNK, sobreposicao=SOBREPOSICAO_TOKENS):
+    """Divide o texto em pares (pergunta ou None, chunk), com no máximo max_tokens por chunk.
+
+    Cada parágrafo "Pergunta? Resposta" vira um chunk próprio; se passar do limite, a resposta é
+    dividida por frases e cada pedaço repete a pergunta no início. Parágrafos sem pergunta são
+    agrupados como no dividir_em_chunks, mas pelo limite de tokens.
+    """
+    chunks = []
+    acumulados = []
+
+    def fechar_acumulados():
+        if acumulados:
+            chunks.append((None, '\n\n'.join(acumulados)))
+            acumulados.clear()
+
+    for paragrafo in texto.split('\n\n'):
+        paragrafo = paragrafo.strip()
+        if not paragrafo:
+            continue
+        pergunta, resposta = separar_pergunta(paragrafo)
+        if pergunta is not None:
+            fechar_acumulados()
+            if estimar_tokens(paragrafo) <= max_tokens:
+                chunks.append((pergunta, paragrafo))
+            else:
+                espaco = max(max_tokens - estimar_tokens(pergunta) - 1, max_tokens // 2)
+                chunks.extend((pergunta, f"{pergunta} {janela}") for janela in _janelas(resposta, espaco, sobreposicao))
+        elif estimar_tokens(paragrafo) > max_tokens:
+            fechar_acumulados()
+            chunks.extend((None, janela) for janela in _janelas(paragrafo, max_tokens, sobreposicao))
+        else:
+            if acumulados and estimar_tokens('\n\n'.join(acumulados + [paragrafo])) > max_tokens:
+                fechar_acumulados()
+            acumulados.append(paragrafo)
+    fechar_acumulados()
+    return chunks
+
+
+def hash_texto(texto):
+    """Hash estável do conteúdo, usado para saber se um chunk mudou."""
+    return hashlib.sha256(texto.encode('utf-8')).hexdigest()
+
+
+def listar_documentos(raiz="."):
+    """Lista o manual principal e todos os documentos de conhecimento/, em ordem estável."""
+    caminhos = []
+    manual = os.path.join(raiz, NOME_MANUAL_LIMPO)
+    if os.path.exists(manual):
+        caminhos.append(manual)
+
+    pasta = os.path.join(raiz, PASTA_CONHECIMENTO)
+    if os.path.isdir(pasta):
+        for nome in sorted(os.listdir(pasta)):
+            if nome.lower().endswith(EXTENSOES_SUPORTADAS):
+                caminhos.append(os.path.join(pasta, nome))
+    return caminhos
+
+
+def ler_documento(caminho):
+    with open(caminho, "r", encoding="utf-8") as f:
+        return f.read()
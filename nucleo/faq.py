@@ -0,0 +1,307 @@
+"""Respostas pré-geradas para as perguntas do manual, em pt, es e en.
+
+O precomputar_faq.py pega cada pergunta do manual (os chunks "Pergunta? Resposta") mais as
+paráfrases conhecidas de faq_parafrases.json, traduz as perguntas para es e en e gera a resposta
+de cada idioma com o mesmo prompt do /ask. O resultado vai para faq_respostas.json:
+
+    {"formato": 1, "versao": ..., "modelo": ..., "prompt": ..., "entradas": [
+        {"pergunta": ..., "fontes": [...], "hash": <hash do contexto>, "parafrases": [...],
+         "idiomas": {"pt": {"perguntas": [...], "resposta": ...}, "es": {...}, "en": {...}}}]}
+
+Cada entrada guarda o hash do contexto (os chunks que respondem à pergunta) usado para gerá-la.
+Numa nova execução só as entradas cujo contexto mudou são geradas de novo; no servidor, uma
+entrada cujo contexto não bate mais com a base carregada é ignorada até a próxima execução.
+
+O /ask consulta a tabela antes da recuperação: a pergunta é comparada às perguntas da tabela no
+mesmo idioma (cosseno entre vetores tf-idf) e, a partir de FAQ_SIMILARIDADE, a resposta pronta é
+devolvida sem chamar o LLM.
+"""
+import json
+import math
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from nucleo import registro
+from nucleo.corpus import chave_pergunta
+from nucleo.documentos import hash_texto
+from nucleo.idioma import IDIOMAS
+from nucleo.indice_denso import escrever_atomicamente
+from nucleo.indice_lexico import STOP_WORDS, tokenizar
+from nucleo.llm import MODELO_PADRAO
+from nucleo.prompts import SEPARADOR_CHUNKS, montar_prompt, montar_prompt_traducao
+from nucleo.respostas import eh_mensagem_de_falha
+
+log = registro.obter('faq')
+
+NOME_ARQUIVO_FAQ = "faq_respostas.json"
+NOME_ARQUIVO_PARAFRASES = "faq_parafrases.json"
+FORMATO = 1
+# Abaixo disso a pergunta segue o caminho normal (recuperação e LLM)
+SIMILARIDADE_MINIMA = float(os.environ.get("FAQ_SIMILARIDADE", "0.8"))
+# Mesmo top_k do /ask: é o contexto que o RecuperadorFAQ devolveria para a pergunta exata
+CHUNKS_POR_PERGUNTA = 3
+
+
+def contexto_da_pergunta(corpus, pergunta):
+    """(fontes, contexto) dos chunks do corpus que respondem à pergunta do manual, ou ([], "")."""
+    ids = corpus.buscar_pergunta(pergunta)
+    fontes = sorted({corpus.chunks[idx].fonte for idx in ids})
+    return fontes, SEPARADOR_CHUNKS.join(corpus.documentos[idx] for idx in ids[:CHUNKS_POR_PERGUNTA])
+
+
+def assinatura_prompt():
+    """Hash do prompt do /ask em todos os idiomas: mudar o prompt invalida todas as respostas."""
+    modelos = [montar_prompt("{pergunta}", [], "{contexto}", "Manual Técnico", idioma) for idioma in IDIOMAS]
+    return hash_texto("\x00".join(modelos))
+
+
+def ler_tabela(caminho):
+    """Tabela gravada pelo precomputar_faq.py, ou None se não existir ou for de outro formato."""
+    if not os.path.exists(caminho):
+        return None
+    try:
+        with open(caminho, "r", encoding="utf-8") as f:
+            tabela = json.load(f)
+    except (OSError, ValueError) as e:
+        log.warning(f"AVISO: Não foi possível ler '{caminho}': {e}")
+        return None
+    if tabela.get('formato') != FORMATO:
+        log.warning(f"AVISO: '{caminho}' é de outro formato. Rode precomputar_faq.py de novo.")
+        return None
+    return tabela
+
+
+def ler_parafrases(caminho):
+    """{chave da pergunta do manual: [paráfrases em português]} de faq_parafrases.json."""
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, "r", encoding="utf-8") as f:
+        dados = json.load(f)
+    return {chave_pergunta(pergunta): list(parafrases) for pergunta, parafrases in dados.items()}
+
+
+def _termos(texto):
+    return [termo for termo in tokenizar(texto) if termo not in STOP_WORDS]
+
+
+class _IndiceIdioma:
+    """Vetores tf-idf normalizados das perguntas da tabela num idioma."""
+
+    def __init__(self, perguntas):
+        # perguntas: [(texto, posição da entrada)]
+        documentos = [(Counter(_termos(texto)), posicao) for texto, posicao in perguntas]
+        documentos = [(contagem, posicao) for contagem, posicao in documentos if contagem]
+        frequencia = Counter(termo for contagem, _ in documentos for termo in contagem)
+        total = len(documentos)
+        self.idf = {termo: math.log(1 + (total + 0.5) / (df + 0.5)) for termo, df in frequencia.items()}
+        # Termo que nenhuma pergunta da tabela usa: pesa como o mais raro, e afasta a pergunta das entradas
+        self.idf_ausente = math.log(1 + (total + 0.5) / 0.5)
+        self.vetores = [(self._vetor(contagem), posicao) for contagem, posicao in documentos]
+
+    def _vetor(self, contagem):
+        vetor = {termo: frequencia * self.idf.get(termo, self.idf_ausente) for termo, frequencia in contagem.items()}
+        norma = math.sqrt(sum(peso * peso for peso in vetor.values()))
+        return {termo: peso / norma for termo, peso in vetor.items()}
+
+    def mais_parecida(self, pergunta, permitidas=None):
+        """(similaridade, posição da entrada) da pergunta mais parecida, ou (0.0, None)."""
+        contagem = Counter(_termos(pergunta))
+        if not contagem or not self.vetores:
+            return 0.0, None
+        consulta = self._vetor(contagem)
+        melhor = (0.0, None)
+        for vetor, posicao in self.vetores:
+            if permitidas is not None and posicao not in permitidas:
+                continue
+            similaridade = sum(peso * vetor.get(termo, 0.0) for termo, peso in consulta.items())
+            if similaridade > melhor[0]:
+                melhor = (similaridade, posicao)
+        return melhor
+
+
+class TabelaFAQ:
+    """Consulta às respostas pré-geradas que ainda valem para o corpus carregado."""
+
+    def __init__(self, entradas=(), corpus=None, similaridade_minima=SIMILARIDADE_MINIMA, versao=""):
+        self.similaridade_minima = similaridade_minima
+        self.versao = versao
+        self.entradas = []
+        self.descartadas = 0
+        for entrada in entradas:
+            if corpus is not None:
+                _, contexto = contexto_da_pergunta(corpus, entrada['pergunta'])
+                if not contexto or hash_texto(contexto) != entrada['hash']:
+                    self.descartadas += 1
+                    continue
+            self.entradas.append(entrada)
+
+        self.exatas = {}  # (idioma, chave da pergunta) -> posição da entrada
+        self.indices = {}
+        for idioma in IDIOMAS:
+            perguntas = []
+            for posicao, entrada in enumerate(self.entradas):
+                dados = entrada['idiomas'].get(idioma)
+                if not dados or not dados.get('resposta'):
+                    continue
+                for pergunta in dados['perguntas']:
+                    self.exatas.setdefault((idioma, chave_pergunta(pergunta)), posicao)
+                    perguntas.append((pergunta, posicao))
+            self.indices[idioma] = _IndiceIdioma(perguntas)
+
+    @classmethod
+    def carregar(cls, caminho, corpus):
+        """Tabela do arquivo, só com as entradas cujo contexto não mudou; vazia se o arquivo não existir."""
+        tabela = ler_tabela(caminho)
+        if tabela is None:
+            return cls()
+        faq = cls(tabela['entradas'], corpus, versao=tabela.get('versao', ""))
+        if faq.descartadas:
+            log.info(f"[FAQ] {faq.descartadas} respostas desatualizadas ignoradas. Rode precomputar_faq.py.")
+        return faq
+
+    def __len__(self):
+        return len(self.entradas)
+
+    def buscar(self, pergunta, idioma, fontes=None):
+        """Resposta pré-gerada para a pergunta no idioma, ou None."""
+        if not self.entradas:
+            return None
+        permitidas = None
+        if fontes:
+            permitidas = {posicao for posicao, entrada in enumerate(self.entradas)
+                          if any(fonte in fontes for fonte in entrada['fontes'])}
+        posicao = self.exatas.get((idioma, chave_pergunta(pergunta)))
+        if posicao is None or (permitidas is not None and posicao not in permitidas):
+            indice = self.indices.get(idioma)
+            if indice is None:
+                return None
+            similaridade, posicao = indice.mais_parecida(pergunta, permitidas)
+            if similaridade < self.similaridade_minima:
+                return None
+            log.debug(f"[FAQ] '{pergunta}' ~ '{self.entradas[posicao]['pergunta']}' ({similaridade:.2f})")
+        return self.entradas[posicao]['idiomas'][idioma]['resposta']
+
+
+def _perguntas_do_manual(corpus):
+    """[(pergunta, fontes, contexto)] de cada pergunta distinta do corpus, na ordem dos documentos."""
+    perguntas = []
+    for ids in corpus.perguntas.values():
+        pergunta = corpus.chunks[ids[0]].pergunta
+        fontes, contexto = contexto_da_pergunta(corpus, pergunta)
+        perguntas.append((pergunta, fontes, contexto))
+    return perguntas
+
+
+class GeradorFAQ:
+    """Gera as entradas da tabela com o gateway do LLM, reaproveitando o que não mudou em `anterior`."""
+
+    def __init__(self, gateway, orcamento, modelo=MODELO_PADRAO, idiomas=IDIOMAS):
+        self.gateway = gateway
+        self.orcamento = orcamento
+        self.modelo = modelo
+        self.idiomas = idiomas
+        self.chamadas = 0
+
+    def _completar(self, prompt):
+        self.chamadas += 1
+        return self.gateway.completar([{"role": "user", "content": prompt}], modelo=self.modelo).strip()
+
+    def traduzir(self, pergunta, idioma):
+        if idioma == 'pt':
+            return pergunta
+        traducao = self._completar(montar_prompt_traducao(pergunta, idioma)).split('\n', 1)[0].strip()
+        return traducao.strip('"') or pergunta
+
+    def responder(self, pergunta, contexto, idioma):
+        """Resposta do /ask sem histórico; None se o LLM não achou a resposta no contexto."""
+        prompt = self.orcamento.montar_prompt(pergunta, [], contexto, "Manual Técnico", idioma)
+        if prompt is None:
+            return None
+        resposta = self._completar(prompt)
+        return None if eh_mensagem_de_falha(resposta) else resposta
+
+    def gerar_entrada(self, pergunta, fontes, contexto, parafrases, anterior=None, reaproveitar_respostas=True):
+        """Entrada da tabela; traduções e respostas de `anterior` são reaproveitadas quando ainda valem."""
+        hash_contexto = hash_texto(contexto)
+        mesmas_perguntas = anterior is not None and anterior.get('parafrases') == parafrases
+        mesmas_respostas = (reaproveitar_respostas and anterior is not None and anterior.get('hash') == hash_contexto)
+        idiomas = {}
+        for idioma in self.idiomas:
+            antigo = (anterior or {}).get('idiomas', {}).get(idioma)
+            if mesmas_perguntas and antigo:
+                perguntas = antigo['perguntas']
+            else:
+                perguntas = [self.traduzir(texto, idioma) for texto in [pergunta] + parafrases]
+            if mesmas_respostas and antigo and antigo['perguntas'][0] == perguntas[0]:
+                resposta = antigo['resposta']
+            else:
+                resposta = self.responder(perguntas[0], contexto, idioma)
+            idiomas[idioma] = {'perguntas': perguntas, 'resposta': resposta}
+        return {'pergunta': pergunta, 'fontes': fontes, 'hash': hash_contexto, 'parafrases': parafrases,
+                'idiomas': idiomas}
+
+
+def precomputar_faq(corpus, gateway, orcamento, raiz=".", forcar=False, paralelas=4, modelo=MODELO_PADRAO):
+    """Gera faq_respostas.json, refazendo só as entradas cujo contexto, paráfrases ou prompt mudaram.
+
+    Retorna um dicionário com estatísticas da execução.
+    """
+    inicio = time.perf_counter()
+    caminho = os.path.join(raiz, NOME_ARQUIVO_FAQ)
+    tabela_anterior = None if forcar else ler_tabela(caminho)
+    assinatura = assinatura_prompt()
+    anteriores = {}
+    reaproveitar_respostas = False
+    if tabela_anterior is not None:
+        anteriores = {chave_pergunta(entrada['pergunta']): entrada for entrada in tabela_anterior['entradas']}
+        reaproveitar_respostas = (tabela_anterior.get('prompt') == assinatura
+                                  and tabela_anterior.get('modelo') == modelo)
+    parafrases = ler_parafrases(os.path.join(raiz, NOME_ARQUIVO_PARAFRASES))
+
+    gerador = GeradorFAQ(gateway, orcamento, modelo)
+    perguntas = _perguntas_do_manual(corpus)
+    reaproveitadas = 0
+    pendentes = []
+    entradas = [None] * len(perguntas)
+    for posicao, (pergunta, fontes, contexto) in enumerate(perguntas):
+        chave = chave_pergunta(pergunta)
+        anterior = anteriores.get(chave)
+        lista = parafrases.get(chave, [])
+        if (reaproveitar_respostas and anterior is not None and anterior['hash'] == hash_texto(contexto)
+                and anterior.get('parafrases') == lista and anterior.get('fontes') == fontes):
+            entradas[posicao] = anterior
+            reaproveitadas += 1
+        else:
+            pendentes.append((posicao, pergunta, fontes, contexto, lista, anterior))
+
+    # As chamadas respeitam o limite de concorrência do gateway (LLM_CONCORRENCIA)
+    with ThreadPoolExecutor(max_workers=max(1, paralelas)) as executor:
+        futuros = {posicao: executor.submit(gerador.gerar_entrada, pergunta, fontes, contexto, lista, anterior,
+                                            reaproveitar_respostas)
+                   for posicao, pergunta, fontes, contexto, lista, anterior in pendentes}
+        for posicao, futuro in futuros.items():
+            entradas[posicao] = futuro.result()
+
+    sem_resposta = sum(1 for entrada in entradas for dados in entrada['idiomas'].values() if not dados['resposta'])
+    tabela = {
+        'formato': FORMATO,
+        'versao': hash_texto(json.dumps(entradas, ensure_ascii=False, sort_keys=True))[:16],
+        'modelo': modelo,
+        'prompt': assinatura,
+        'gerada_em': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'entradas': entradas,
+    }
+    if tabela_anterior is None or tabela_anterior.get('versao') != tabela['versao']:
+        def salvar(caminho_temporario):
+            with open(caminho_temporario, 'w', encoding='utf-8') as f:
+                json.dump(tabela, f, ensure_ascii=False, indent=2)
+        escrever_atomicamente(caminho, salvar)
+        atualizada = True
+    else:
+        atualizada = False
+
+    return {'entradas': len(entradas), 'geradas': len(pendentes), 'reaproveitadas': reaproveitadas,
+            'sem_resposta': sem_resposta, 'chamadas': gerador.chamadas, 'versao': tabela['versao'],
+            'atualizada': atualizada, 'segundos': time.perf_counter() - inicio}
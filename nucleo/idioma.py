@@ -0,0 +1,101 @@
+import re
+
+IDIOMAS = ('pt', 'es', 'en')
+
+# Palavras com peso por idioma: só palavras gramaticais e verbos comuns, nada do vocabulário do
+# manual, para não decorar as frases do benchmark. Palavras iguais em pt e es (como, para, por)
+# aparecem nos dois e se anulam; quem decide são as palavras e marcas exclusivas de cada língua.
+_PALAVRAS = {
+    'pt': {
+        'o': 3, 'a': 2, 'os': 2, 'as': 2, 'do': 3, 'da': 3, 'dos': 3, 'das': 3, 'ao': 3, 'aos': 3,
+        'no': 1, 'na': 3, 'nos': 2, 'nas': 3, 'um': 3, 'uma': 3, 'e': 2, 'é': 3, 'em': 3, 'com': 3,
+        'ou': 3, 'pelo': 4, 'pela': 4, 'mais': 3, 'já': 3, 'só': 3, 'até': 3, 'depois': 4, 'agora': 3,
+        'não': 5, 'nao': 4, 'são': 5, 'sao': 3, 'você': 5, 'voce': 4, 'vocês': 5, 'voces': 4,
+        'tem': 3, 'têm': 5, 'tenho': 4, 'qual': 3, 'quais': 4, 'quanto': 3, 'quantos': 3,
+        'fazer': 3, 'faço': 5, 'faco': 4, 'pra': 4, 'também': 5, 'tambem': 4, 'está': 1, 'estou': 4,
+        'posso': 4, 'preciso': 4, 'consigo': 4, 'quero': 4, 'onde': 3, 'meu': 4, 'minha': 5, 'isso': 4,
+        'esse': 3, 'essa': 3, 'ele': 2, 'ela': 2, 'eu': 4, 'fica': 3, 'dá': 3, 'obrigado': 5,
+        'obrigada': 5, 'muito': 4, 'bom': 3, 'boa': 3, 'dia': 2, 'tudo': 4, 'bem': 3,
+    },
+    'es': {
+        'el': 5, 'la': 4, 'los': 4, 'las': 4, 'del': 4, 'al': 3, 'un': 3, 'y': 4, 'en': 3, 'con': 3,
+        'lo': 3, 'le': 3, 'les': 3, 'hay': 5, 'muy': 4, 'más': 3, 'ya': 3, 'eso': 4, 'esto': 4,
+        'es': 3, 'son': 3, 'está': 1, 'esta': 1, 'qué': 5, 'cómo': 5, 'cuál': 5, 'cuáles': 5, 'cual': 3,
+        'cuales': 4, 'cuánto': 5, 'cuanto': 4, 'cuántos': 5, 'cuantos': 4, 'dónde': 5, 'donde': 4,
+        'hacer': 4, 'hago': 5, 'tiene': 5, 'tienen': 5, 'tengo': 4, 'puedo': 5, 'puede': 4, 'quiero': 4,
+        'se': 2, 'me': 2, 'mi': 3, 'yo': 4, 'usted': 5, 'ustedes': 5, 'necesito': 5, 'también': 2,
+        'pero': 3, 'gracias': 5, 'mucho': 4, 'buenos': 4, 'buenas': 4, 'días': 3, 'estás': 4,
+    },
+    'en': {
+        'the': 5, 'is': 4, 'are': 4, 'does': 5, 'do': 2, 'did': 4, 'how': 5, 'what': 5, 'which': 5,
+        'where': 5, 'when': 4, 'who': 4, 'why': 4, 'can': 4, 'could': 4, 'should': 4, 'would': 4,
+        'will': 4, 'be': 4, 'was': 4, 'an': 2, 'at': 3, 'about': 4, 'if': 3, 'after': 4, 'any': 4,
+        'i': 4, 'my': 4, 'you': 5, 'your': 5, 'it': 4, 'this': 4, 'that': 4, 'these': 4, 'those': 4,
+        'have': 4, 'has': 4, 'to': 3, 'for': 3, 'of': 3, 'in': 2, 'on': 3, 'with': 4, 'and': 4, 'or': 2,
+        'from': 4, 'there': 4, 'much': 3, 'many': 4, 'not': 4, 'no': 1, 'get': 3, 'need': 4,
+        'want': 4, 'help': 4, 'thanks': 5, 'thank': 5, 'good': 4, 'morning': 5,
+    },
+}
+
+# Marcas dentro da palavra: sufixos e letras que só aparecem em uma das línguas
+_SUFIXOS = (
+    ('ções', (5, 0, 0)), ('ção', (5, 0, 0)), ('ões', (4, 0, 0)), ('ão', (4, 0, 0)), ('dade', (2, 0, 0)),
+    ('ciones', (0, 5, 0)), ('ción', (0, 5, 0)), ('dad', (0, 2, 0)), ('tions', (0, 0, 5)), ('tion', (0, 0, 5)),
+    ('ing', (0, 0, 2)), ('ly', (0, 0, 1)), ('mente', (1, 1, 0)),
+)
+_LETRAS = {
+    'ã': (4, 0, 0), 'õ': (4, 0, 0), 'ç': (4, 0, 0), 'ê': (2, 0, 0), 'â': (2, 0, 0), 'ô': (2, 0, 0),
+    'ñ': (0, 5, 0), 'á': (1, 1, 0), 'é': (1, 1, 0), 'í': (1, 1, 0), 'ó': (1, 1, 0), 'ú': (1, 1, 0),
+    'w': (0, 0, 1), 'k': (0, 0, 1),
+}
+_PONTUACAO = {'¿': (0, 5, 0), '¡': (0, 5, 0)}
+
+
+def _compilar_tabela():
+    """Junta as três listas numa tabela palavra -> (peso pt, peso es, peso en)."""
+    tabela = {}
+    for posicao, idioma in enumerate(IDIOMAS):
+        for palavra, peso in _PALAVRAS[idioma].items():
+            pesos = list(tabela.get(palavra, (0, 0, 0)))
+            pesos[posicao] = peso
+            tabela[palavra] = tuple(pesos)
+    return tabela
+
+
+_TABELA = _compilar_tabela()
+_TOKEN = re.compile(r"[¿¡]|[^\W\d_]+")
+
+
+def _pesos_da_forma(token):
+    """Pesos de uma palavra fora da tabela, a partir de sufixos e letras características."""
+    for sufixo, pesos in _SUFIXOS:
+        if token.endswith(sufixo):
+            return pesos
+    pt = es = en = 0
+    for letra in set(token).intersection(_LETRAS):
+        letra_pt, letra_es, letra_en = _LETRAS[letra]
+        pt += letra_pt
+        es += letra_es
+        en += letra_en
+    return pt, es, en
+
+
+def pontuar_idiomas(texto):
+    """Retorna (score pt, score es, score en) percorrendo o texto uma única vez."""
+    pt = es = en = 0
+    for token in _TOKEN.findall(texto.lower()):
+        pesos = _TABELA.get(token) or _PONTUACAO.get(token) or _pesos_da_forma(token)
+        pt += pesos[0]
+        es += pesos[1]
+        en += pesos[2]
+    return pt, es, en
+
+
+def detectar_idioma(texto):
+    """Detecta o idioma do texto (pt, es, en). Em caso de empate, o padrão é português."""
+    pt, es, en = pontuar_idiomas(texto)
+    if es > pt and es > en:
+        return 'es'
+    if en > pt and en > es:
+        return 'en'
+    return 'pt'
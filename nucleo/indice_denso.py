@@ -0,0 +1,184 @@
+import json
+import math
+import os
+import pickle
+import tempfile
+import time
+
+from nucleo import registro
+from nucleo.corpus import carregar_corpus
+from nucleo.dependencias import ModuloPreguicoso
+from nucleo.documentos import MAX_TOKENS_CHUNK, SOBREPOSICAO_TOKENS, hash_texto
+
+log = registro.obter('indice_denso')
+
+np = ModuloPreguicoso('numpy')
+
+NOME_ARQUIVO_INDICE = "indice_faiss.bin"
+NOME_ARQUIVO_CHUNKS = "chunks.pkl"
+NOME_ARQUIVO_MANIFESTO = "indice_manifesto.json"
+NOME_ARQUIVO_CACHE_EMBEDDINGS = "embeddings_cache.npz"
+MODELO_EMBEDDING = 'paraphrase-multilingual-MiniLM-L12-v2'
+# flat: float32 (exato); sq8: 1 byte por dimensão (4x menor); pq: SUBQUANTIZADORES bytes por vetor
+TIPOS_INDICE = ('flat', 'sq8', 'pq')
+TIPO_INDICE = os.environ.get("INDICE_TIPO", "flat")
+SUBQUANTIZADORES = 48
+# Vetores de treino por centróide que o k-means do FAISS pede para não avisar de treino insuficiente
+VETORES_POR_CENTROIDE = 39
+
+
+def escrever_atomicamente(caminho, escrever):
+    """Escreve num arquivo temporário da mesma pasta e troca pelo definitivo com os.replace.
+
+    Quem lê o arquivo ao mesmo tempo vê a versão antiga inteira ou a nova inteira, nunca metade.
+    """
+    pasta = os.path.dirname(os.path.abspath(caminho))
+    fd, temporario = tempfile.mkstemp(dir=pasta, prefix=".tmp-", suffix=os.path.basename(caminho))
+    os.close(fd)
+    try:
+        escrever(temporario)
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def ler_manifesto(raiz="."):
+    caminho = os.path.join(raiz, NOME_ARQUIVO_MANIFESTO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def carregar_cache_embeddings(raiz=".", modelo=MODELO_EMBEDDING):
+    """Retorna {hash do chunk: vetor} das execuções anteriores com o mesmo modelo."""
+    caminho = os.path.join(raiz, NOME_ARQUIVO_CACHE_EMBEDDINGS)
+    if not os.path.exists(caminho):
+        return {}
+    dados = np.load(caminho, allow_pickle=False)
+    if str(dados['modelo']) != modelo:
+        return {}
+    return dict(zip(dados['hashes'].tolist(), dados['vetores']))
+
+
+def coletar_chunks(raiz=".", max_tokens=MAX_TOKENS_CHUNK, sobreposicao=SOBREPOSICAO_TOKENS):
+    """Chunks de todos os documentos da base, na mesma ordem do Corpus usado pelo BM25.
+
+    Retorna (textos dos chunks, {fonte: hash do documento}, {fonte: [primeiro id, último id + 1]}).
+    """
+    corpus, _ = carregar_corpus(raiz, max_tokens=max_tokens, sobreposicao=sobreposicao)
+    documentos = {arquivo.fonte: arquivo.hash for arquivo in corpus.arquivos}
+    faixas = {fonte: list(faixa) for fonte, faixa in corpus.faixas.items()}
+    return list(corpus.documentos), documentos, faixas
+
+
+def criar_indice_faiss(matriz, tipo=TIPO_INDICE, subquantizadores=SUBQUANTIZADORES):
+    """Índice FAISS com distância L2 sobre os vetores normalizados da matriz, no formato `tipo`.
+
+    sq8 e pq são treinados com os próprios vetores. No pq, cada vetor vira `subquantizadores`
+    códigos (a dimensão precisa ser divisível por ele) de até 8 bits: com poucos chunks, menos
+    bits, para que cada um dos 2 ** bits centróides tenha VETORES_POR_CENTROIDE vetores de treino.
+    O sq8 com menos de 2 vetores, ou o pq sem vetores para 2 centróides, sai flat.
+    """
+    import faiss
+
+    dimensao = matriz.shape[1]
+    if tipo not in TIPOS_INDICE:
+        raise ValueError(f"Tipo de índice '{tipo}' desconhecido (use {', '.join(TIPOS_INDICE)}).")
+    bits = min(8, int(math.log2(len(matriz) / VETORES_POR_CENTROIDE))) if len(matriz) else 0
+    if 0 < len(matriz) and ((tipo == 'sq8' and len(matriz) < 2) or (tipo == 'pq' and bits < 1)):
+        log.warning(f"AVISO: {len(matriz)} vetor(es) não bastam para treinar o índice '{tipo}'. Usando 'flat'.")
+        tipo = 'flat'
+    if tipo == 'flat' or len(matriz) == 0:
+        indice = faiss.IndexFlatL2(dimensao)
+    elif tipo == 'sq8':
+        indice = faiss.IndexScalarQuantizer(dimensao, faiss.ScalarQuantizer.QT_8bit, faiss.METRIC_L2)
+    else:
+        if dimensao % subquantizadores:
+            raise ValueError(f"A dimensão {dimensao} não é divisível por {subquantizadores} subquantizadores.")
+        indice = faiss.IndexPQ(dimensao, subquantizadores, bits, faiss.METRIC_L2)
+    if not indice.is_trained:
+        indice.train(matriz)
+    indice.add(matriz)
+    return indice
+
+
+def construir_indice(raiz=".", tamanho_lote=64, forcar=False, modelo=None, nome_modelo=MODELO_EMBEDDING,
+                     tipo_indice=TIPO_INDICE, subquantizadores=SUBQUANTIZADORES):
+    """Gera indice_faiss.bin e chunks.pkl, reaproveitando os embeddings de chunks que não mudaram.
+
+    `tipo_indice` ('flat', 'sq8' ou 'pq') define como os vetores ficam guardados no índice; o
+    cache de embeddings continua em float32, então trocar de tipo não chama o modelo de novo.
+    Retorna um dicionário com estatísticas da construção.
+    """
+    import faiss
+
+    inicio = time.perf_counter()
+    chunks, documentos, faixas = coletar_chunks(raiz)
+    hashes = [hash_texto(chunk) for chunk in chunks]
+
+    manifesto = ler_manifesto(raiz)
+    artefatos_existem = all(os.path.exists(os.path.join(raiz, nome))
+                            for nome in (NOME_ARQUIVO_INDICE, NOME_ARQUIVO_CHUNKS))
+    if (not forcar and artefatos_existem and manifesto.get('modelo') == nome_modelo
+            and manifesto.get('chunks') == hashes and manifesto.get('faixas') == faixas
+            and manifesto.get('tipo_indice', 'flat') == tipo_indice):
+        return {'chunks': len(chunks), 'novos': 0, 'atualizado': False,
+                'segundos': time.perf_counter() - inicio}
+
+    cache = {} if forcar else carregar_cache_embeddings(raiz, nome_modelo)
+    pendentes = {}
+    for chunk, hash_chunk in zip(chunks, hashes):
+        if hash_chunk not in cache:
+            pendentes.setdefault(hash_chunk, chunk)
+
+    if pendentes:
+        if modelo is None:
+            from sentence_transformers import SentenceTransformer
+            modelo = SentenceTransformer(nome_modelo)
+        hashes_pendentes = list(pendentes)
+        for i in range(0, len(hashes_pendentes), tamanho_lote):
+            lote = hashes_pendentes[i:i + tamanho_lote]
+            vetores = modelo.encode([pendentes[h] for h in lote], batch_size=tamanho_lote,
+                                    normalize_embeddings=True, convert_to_numpy=True)
+            cache.update(zip(lote, vetores.astype('float32')))
+
+    if chunks:
+        matriz = np.vstack([cache[h] for h in hashes]).astype('float32')
+    else:
+        dimensao = modelo.get_sentence_embedding_dimension() if modelo is not None else 384
+        matriz = np.zeros((0, dimensao), dtype='float32')
+
+    # Distância L2 sobre vetores normalizados, como app.buscar_contexto_local espera
+    indice = criar_indice_faiss(matriz, tipo_indice, subquantizadores)
+
+    # Só mantém no cache os embeddings que ainda estão em uso
+    em_uso = sorted(set(hashes))
+    cache_hashes = np.array(em_uso)
+    cache_vetores = np.vstack([cache[h] for h in em_uso]) if em_uso else matriz
+
+    def salvar_cache(caminho):
+        with open(caminho, 'wb') as f:
+            np.savez(f, modelo=np.array(nome_modelo), hashes=cache_hashes, vetores=cache_vetores)
+
+    def salvar_chunks(caminho):
+        with open(caminho, 'wb') as f:
+            pickle.dump(chunks, f)
+
+    def salvar_manifesto(caminho):
+        with open(caminho, 'w', encoding='utf-8') as f:
+            json.dump({'modelo': nome_modelo, 'max_tokens_chunk': MAX_TOKENS_CHUNK,
+                       'sobreposicao_tokens': SOBREPOSICAO_TOKENS, 'documentos': documentos,
+                       'faixas': faixas, 'chunks': hashes, 'tipo_indice': tipo_indice, 'gerado_em': time.strftime('%Y-%m-%dT%H:%M:%S')},
+                      f, ensure_ascii=False, indent=2)
+
+    escrever_atomicamente(os.path.join(raiz, NOME_ARQUIVO_CACHE_EMBEDDINGS), salvar_cache)
+    escrever_atomicamente(os.path.join(raiz, NOME_ARQUIVO_INDICE), lambda caminho: faiss.write_index(indice, caminho))
+    escrever_atomicamente(os.path.join(raiz, NOME_ARQUIVO_CHUNKS), salvar_chunks)
+    # O manifesto vai por último: se algo falhar antes, a próxima execução reconstrói
+    escrever_atomicamente(os.path.join(raiz, NOME_ARQUIVO_MANIFESTO), salvar_manifesto)
+
+    return {'chunks': len(chunks), 'novos': len(pendentes), 'atualizado': True,
+            'segundos': time.perf_counter() - inicio}
@@ -0,0 +1,76 @@
+import heapq
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+# Palavras muito comuns que não ajudam a escolher um chunk
+STOP_WORDS = {'o', 'a', 'de', 'da', 'do', 'em', 'para', 'com', 'um', 'uma', 'os', 'as', 'dos', 'das', 'e', 'ou'}
+
+_PADRAO_PALAVRA = re.compile(r'\w+')
+
+
+def remover_acentos(texto):
+    """Remove acentos para que 'instalacao' e 'instalação' sejam o mesmo termo."""
+    decomposto = unicodedata.normalize('NFKD', texto)
+    return ''.join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokenizar(texto):
+    """Quebra o texto em termos minúsculos e sem acento."""
+    return _PADRAO_PALAVRA.findall(remover_acentos(texto.lower()))
+
+
+def contar_termos(documento):
+    """Retorna (Counter dos termos, número de termos) de um documento."""
+    termos = tokenizar(documento)
+    return Counter(termos), len(termos)
+
+
+class IndiceBM25:
+    """Índice invertido com pontuação BM25, construído uma única vez sobre os chunks."""
+
+    def __init__(self, documentos, k1=1.5, b=0.75):
+        self.documentos = list(documentos)
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(list)  # termo -> [(id do documento, frequência)]
+        self.comprimentos = []
+
+        for idx, documento in enumerate(self.documentos):
+            contagem, comprimento = contar_termos(documento)
+            self.comprimentos.append(comprimento)
+            for termo, frequencia in contagem.items():
+                self.postings[termo].append((idx, frequencia))
+
+        total = len(self.documentos)
+        media = sum(self.comprimentos) / total if total else 0.0
+        self.media_comprimento = media
+
+        # Parte do denominador do BM25 que só depende do documento
+        self.normalizacao = [k1 * (1 - b + b * comprimento / media) if media else k1
+                             for comprimento in self.comprimentos]
+        self.idf = {termo: math.log(1 + (total - len(lista) + 0.5) / (len(lista) + 0.5))
+                    for termo, lista in self.postings.items()}
+
+    def __len__(self):
+        return len(self.documentos)
+
+    def pontuar(self, consulta):
+        """Retorna {id do documento: score} só para os documentos que contêm algum termo."""
+        termos = set(tokenizar(consulta)) - STOP_WORDS
+        scores = defaultdict(float)
+        k1_mais_1 = self.k1 + 1
+        for termo in termos:
+            lista = self.postings.get(termo)
+            if not lista:
+                continue
+            idf = self.idf[termo]
+            for idx, frequencia in lista:
+                scores[idx] += idf * frequencia * k1_mais_1 / (frequencia + self.normalizacao[idx])
+        return scores
+
+    def buscar(self, consulta, top_k=3):
+        """Retorna até top_k pares (id do documento, score), do mais relevante para o menos."""
+        scores = self.pontuar(consulta)
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
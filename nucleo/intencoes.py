@@ -0,0 +1,81 @@
+"""Roteamento de intenções com resposta pronta (valores, horário do suporte, downloads).
+
+As expressões de cada intenção são normalizadas (minúsculas, sem acento) e guardadas numa
+tabela indexada pela primeira palavra, montada uma vez na importação. A pergunta é quebrada
+em palavras inteiras e cada palavra custa uma consulta ao dicionário (mais a comparação das
+poucas expressões que começam com ela): o custo depende do tamanho da pergunta, não do número
+de expressões, e "plan" não casa mais com "planilha" nem "cost" com "costura".
+
+Para uma intenção nova, acrescente as expressões em INTENCOES e a resposta em
+respostas.RESPOSTAS_PRONTAS.
+"""
+import re
+
+# Em ordem de prioridade: se a pergunta casa com mais de uma, vence a primeira
+INTENCOES = {
+    'valores': [
+        # Português
+        'quanto custa', 'custa', 'custo', 'preco', 'precos', 'valor da licenca', 'valor do plano',
+        'valor do software', 'valor do console mix', 'valor do consolemix', 'licenca', 'planos',
+        'mensalidade', 'assinatura', 'pagar', 'pagamento', 'reais', 'r$', 'qual plano', 'plano mensal', 'plano anual',
+        # Espanhol
+        'cuanto cuesta', 'cuesta', 'costo', 'precio', 'precios', 'licencia', 'plan', 'planes', 'mensualidad',
+        'suscripcion', 'pago',
+        # Inglês
+        'how much does', 'how much is', 'price', 'prices', 'pricing', 'cost', 'costs', 'license', 'plans',
+        'monthly fee', 'subscription', 'pay', 'payment',
+    ],
+    'horario_suporte': [
+        'horario de atendimento', 'horario do atendimento', 'horario de suporte', 'horario do suporte',
+        'que horas o suporte', 'que horas atende', 'que horas voces atendem',
+        'horario de atencion', 'horario del soporte', 'horario de soporte', 'a que hora atienden',
+        'support hours', 'business hours', 'opening hours', 'what time does support',
+    ],
+    'downloads': [
+        'link de download', 'link do download', 'link para download', 'link para baixar', 'onde baixo',
+        'onde baixar', 'onde faco o download', 'onde faco download',
+        'enlace de descarga', 'link de descarga', 'donde descargo', 'donde puedo descargar',
+        'download link', 'where can i download', 'where do i download', 'where to download',
+    ],
+}
+
+_PALAVRA = re.compile(r'r\$|\w+')
+# Tabela fixa em vez do unicodedata (indice_lexico.remover_acentos): esta checagem roda em toda pergunta
+_SEM_ACENTO = str.maketrans('áàâãäéèêëíìîïóòôõöúùûüçñ', 'aaaaaeeeeiiiiooooouuuucn')
+
+
+def _palavras(texto):
+    return _PALAVRA.findall(texto.lower().translate(_SEM_ACENTO))
+
+
+def _montar_tabela(intencoes):
+    """Tabela primeira palavra -> [(palavras seguintes, prioridade, intenção)]."""
+    tabela = {}
+    for prioridade, (intencao, expressoes) in enumerate(intencoes.items()):
+        for expressao in expressoes:
+            palavras = _palavras(expressao)
+            if palavras:
+                tabela.setdefault(palavras[0], []).append((tuple(palavras[1:]), prioridade, intencao))
+    return tabela
+
+
+_TABELA = _montar_tabela(INTENCOES)
+
+
+def detectar_intencao(pergunta):
+    """Retorna o nome da intenção com resposta pronta ('valores', 'horario_suporte', 'downloads') ou None."""
+    palavras = _palavras(pergunta)
+    encontrada = None
+    for posicao, palavra in enumerate(palavras):
+        # A maioria das palavras não inicia nenhuma expressão e custa uma consulta ao dicionário
+        candidatas = _TABELA.get(palavra)
+        if candidatas is None:
+            continue
+        for seguintes, prioridade, intencao in candidatas:
+            if encontrada is not None and prioridade >= encontrada[0]:
+                continue
+            if tuple(palavras[posicao + 1:posicao + 1 + len(seguintes)]) == seguintes:
+                if prioridade == 0:
+                    return intencao
+                encontrada = (prioridade, intencao)
+    return encontrada[1] if encontrada else None
@@ -0,0 +1,412 @@
+"""Gateway de chamadas ao LLM (Groq): conexões reaproveitadas, prazo, novas tentativas e limite de concorrência.
+
+Todas as chamadas do api.py, api_async.py e app.py passam por aqui em vez de usar o cliente
+da Groq direto:
+
+- cada chamada tem um prazo total (LLM_PRAZO), que inclui a fila e as novas tentativas;
+- 429, 5xx e falhas de conexão são repetidos com espera exponencial com jitter (ou o
+  Retry-After do servidor), até LLM_TENTATIVAS vezes;
+- no máximo LLM_CONCORRENCIA chamadas ficam abertas ao mesmo tempo por processo;
+- prompts idênticos em andamento ao mesmo tempo (um recarregar de página, vários usuários
+  com a mesma pergunta) compartilham uma única chamada à Groq.
+
+GROQ_BASE_URL aponta o cliente para outro servidor, como o falso de benchmarks/stubs/groq_falso.py.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+
+from nucleo import registro
+from nucleo.metricas import ERROS_UPSTREAM
+
+log = registro.obter('llm')
+
+MODELO_PADRAO = "llama-3.1-8b-instant"
+PRAZO = float(os.environ.get("LLM_PRAZO", "30"))
+TIMEOUT_CONEXAO = float(os.environ.get("LLM_TIMEOUT_CONEXAO", "5"))
+TENTATIVAS = int(os.environ.get("LLM_TENTATIVAS", "3"))
+CONCORRENCIA = int(os.environ.get("LLM_CONCORRENCIA", "8"))
+CONEXOES = int(os.environ.get("LLM_CONEXOES", "20"))
+ESPERA_BASE = 0.5
+ESPERA_MAXIMA = 8.0
+
+
+class ErroLLM(Exception):
+    """Falha definitiva na chamada ao LLM (prazo esgotado, tentativas esgotadas ou erro que não adianta repetir)."""
+
+
+def pode_repetir(erro):
+    """429, 5xx, timeout e erro de conexão são temporários; 400, 401, 404 etc. não."""
+    import groq
+
+    if isinstance(erro, (groq.APITimeoutError, groq.APIConnectionError)):
+        return True
+    if isinstance(erro, groq.APIStatusError):
+        return erro.status_code == 429 or erro.status_code >= 500
+    return False
+
+
+def tempo_de_espera(tentativa, erro=None):
+    """Retry-After do servidor, se houver; senão espera exponencial com jitter completo."""
+    resposta = getattr(erro, 'response', None)
+    if resposta is not None:
+        try:
+            return min(float(resposta.headers.get('retry-after')), ESPERA_MAXIMA)
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** tentativa))
+
+
+def chave_chamada(mensagens, modelo, parametros):
+    """Identifica chamadas idênticas (mesmo modelo, mensagens e parâmetros)."""
+    conteudo = json.dumps([modelo, mensagens, parametros], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(conteudo.encode('utf-8')).hexdigest()
+
+
+def _texto_da_resposta(resposta):
+    return resposta.choices[0].message.content
+
+
+def _texto_do_pedaco(pedaco):
+    return pedaco.choices[0].delta.content if pedaco.choices else None
+
+
+class _Voo:
+    """Uma chamada em andamento, compartilhada por todos que pediram o mesmo prompt."""
+
+    def __init__(self):
+        self.condicao = threading.Condition()
+        self.pedacos = []
+        self.terminado = False
+        self.erro = None
+
+
+class GatewayLLM:
+    """Cliente síncrono (Flask, Streamlit). `cliente` permite injetar um cliente da Groq já configurado."""
+
+    def __init__(self, api_key=None, base_url=None, cliente=None, prazo=PRAZO, tentativas=TENTATIVAS,
+                 concorrencia=CONCORRENCIA, conexoes=CONEXOES, coalescer=True, dormir=time.sleep):
+        if cliente is None:
+            import httpx
+            from groq import Groq
+
+            cliente = Groq(
+                api_key=api_key or os.environ.get("GROQ_API_KEY"),
+                base_url=base_url,
+                max_retries=0,  # as novas tentativas são feitas aqui, dentro do prazo
+                timeout=httpx.Timeout(prazo, connect=TIMEOUT_CONEXAO),
+                http_client=httpx.Client(limits=httpx.Limits(max_connections=conexoes,
+                                                             max_keepalive_connections=conexoes)),
+            )
+        self.cliente = cliente
+        self.prazo = prazo
+        self.tentativas = tentativas
+        self.coalescer = coalescer
+        self.dormir = dormir
+        self._semaforo = threading.BoundedSemaphore(concorrencia)
+        self._voos = {}
+        self._lock = threading.Lock()
+        self.estatisticas = {'chamadas': 0, 'compartilhadas': 0, 'repeticoes': 0, 'falhas': 0}
+
+    def _contar(self, nome):
+        with self._lock:
+            self.estatisticas[nome] += 1
+
+    def _executar(self, criar, limite):
+        """Roda criar(timeout) com semáforo e novas tentativas até o instante `limite`."""
+        ultimo_erro = None
+        for tentativa in range(self.tentativas):
+            restante = limite - time.monotonic()
+            if restante <= 0 or not self._semaforo.acquire(timeout=restante):
+                break
+            try:
+                self._contar('chamadas')
+                return criar(limite - time.monotonic())
+            except Exception as e:
+                ERROS_UPSTREAM.inc(servico='groq')
+                if not pode_repetir(e):
+                    self._contar('falhas')
+                    raise
+                ultimo_erro = e
+            finally:
+                self._semaforo.release()
+
+            espera = tempo_de_espera(tentativa, ultimo_erro)
+            if tentativa + 1 >= self.tentativas or time.monotonic() + espera >= limite:
+                break
+            self._contar('repeticoes')
+            log.warning(f"[LLM] {ultimo_erro!r}; nova tentativa em {espera:.2f}s")
+            self.dormir(espera)
+        self._contar('falhas')
+        raise ErroLLM(f"LLM indisponível: {ultimo_erro or 'prazo esgotado aguardando vaga'}") from ultimo_erro
+
+    def _entrar_no_voo(self, chave):
+        """Retorna (voo, é o primeiro?). Sem coalescência, todo pedido abre seu próprio voo."""
+        if not self.coalescer:
+            return _Voo(), True
+        with self._lock:
+            voo = self._voos.get(chave)
+            if voo is not None:
+                self.estatisticas['compartilhadas'] += 1
+                return voo, False
+            voo = self._voos[chave] = _Voo()
+            return voo, True
+
+    def _encerrar_voo(self, chave, voo, erro=None):
+        with self._lock:
+            if self._voos.get(chave) is voo:
+                del self._voos[chave]
+        with voo.condicao:
+            voo.erro = erro
+            voo.terminado = True
+            voo.condicao.notify_all()
+
+    def completar(self, mensagens, modelo=MODELO_PADRAO, **parametros):
+        """Retorna o texto da resposta."""
+        chave = chave_chamada(mensagens, modelo, parametros)
+        voo, primeiro = self._entrar_no_voo(chave)
+        if primeiro:
+            limite = time.monotonic() + self.prazo
+            try:
+                resposta = self._executar(
+                    lambda timeout: self.cliente.chat.completions.create(
+                        messages=mensagens, model=modelo, timeout=timeout, **parametros),
+                    limite)
+                voo.pedacos.append(_texto_da_resposta(resposta))
+            except Exception as e:
+                self._encerrar_voo(chave, voo, e)
+                raise
+            self._encerrar_voo(chave, voo)
+        return ''.join(self._acompanhar(voo))
+
+    def transmitir(self, mensagens, modelo=MODELO_PADRAO, **parametros):
+        """Gera os pedaços de texto conforme chegam.
+
+        A leitura do stream da Groq roda numa thread própria: se quem abriu a chamada
+        desistir no meio (cliente desconectou), os outros pedidos idênticos continuam recebendo.
+        """
+        chave = chave_chamada(mensagens, modelo, dict(parametros, stream=True))
+        voo, primeiro = self._entrar_no_voo(chave)
+        if primeiro:
+            threading.Thread(target=self._ler_stream, args=(chave, voo, mensagens, modelo, parametros),
+                             name="llm-stream", daemon=True).start()
+        return self._acompanhar(voo)
+
+    def _ler_stream(self, chave, voo, mensagens, modelo, parametros):
+        limite = time.monotonic() + self.prazo
+
+        def ler(timeout):
+            # A vaga do semáforo fica ocupada até o fim do stream, não só até os cabeçalhos
+            stream = self.cliente.chat.completions.create(
+                messages=mensagens, model=modelo, stream=True, timeout=timeout, **parametros)
+            try:
+                for pedaco in stream:
+                    conteudo = _texto_do_pedaco(pedaco)
+                    if conteudo:
+                        with voo.condicao:
+                            voo.pedacos.append(conteudo)
+                            voo.condicao.notify_all()
+                    # O timeout do cliente vale para cada leitura; o prazo, para o stream inteiro
+                    if time.monotonic() >= limite:
+                        raise ErroLLM(f"Stream do LLM passou do prazo de {self.prazo:g}s")
+            except ErroLLM:
+                raise
+            except Exception as e:
+                # Depois do primeiro pedaço não dá para repetir: o texto já foi entregue
+                if voo.pedacos:
+                    raise ErroLLM(f"Stream do LLM interrompido: {e!r}") from e
+                raise
+            finally:
+                stream.close()
+
+        try:
+            self._executar(ler, limite)
+        except Exception as e:
+            self._encerrar_voo(chave, voo, e)
+            return
+        self._encerrar_voo(chave, voo)
+
+    @staticmethod
+    def _acompanhar(voo):
+        """Entrega os pedaços do voo desde o começo, esperando pelos próximos até ele terminar."""
+        posicao = 0
+        while True:
+            with voo.condicao:
+                while posicao >= len(voo.pedacos) and not voo.terminado:
+                    voo.condicao.wait()
+                novos = voo.pedacos[posicao:]
+                terminado, erro = voo.terminado, voo.erro
+            for pedaco in novos:
+                yield pedaco
+            posicao += len(novos)
+            if terminado and posicao >= len(voo.pedacos):
+                if erro is not None:
+                    raise erro
+                return
+
+
+class GatewayLLMAsync:
+    """Mesma política do GatewayLLM para o modo assíncrono (api_async.py), com AsyncGroq."""
+
+    def __init__(self, api_key=None, base_url=None, cliente=None, prazo=PRAZO, tentativas=TENTATIVAS,
+                 concorrencia=CONCORRENCIA, conexoes=CONEXOES, coalescer=True):
+        if cliente is None:
+            import httpx
+            from groq import AsyncGroq
+
+            cliente = AsyncGroq(
+                api_key=api_key or os.environ.get("GROQ_API_KEY"),
+                base_url=base_url,
+                max_retries=0,
+                timeout=httpx.Timeout(prazo, connect=TIMEOUT_CONEXAO),
+                http_client=httpx.AsyncClient(limits=httpx.Limits(max_connections=conexoes,
+                                                                  max_keepalive_connections=conexoes)),
+            )
+        self.cliente = cliente
+        self.prazo = prazo
+        self.tentativas = tentativas
+        self.coalescer = coalescer
+        self._semaforo = asyncio.Semaphore(concorrencia)
+        self._voos = {}
+        self.estatisticas = {'chamadas': 0, 'compartilhadas': 0, 'repeticoes': 0, 'falhas': 0}
+
+    async def fechar(self):
+        await self.cliente.close()
+
+    async def _executar(self, criar, limite):
+        ultimo_erro = None
+        for tentativa in range(self.tentativas):
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._semaforo.acquire(), timeout=restante)
+            except asyncio.TimeoutError:
+                break
+            try:
+                self.estatisticas['chamadas'] += 1
+                return await criar(limite - time.monotonic())
+            except Exception as e:
+                ERROS_UPSTREAM.inc(servico='groq')
+                if not pode_repetir(e):
+                    self.estatisticas['falhas'] += 1
+                    raise
+                ultimo_erro = e
+            finally:
+                self._semaforo.release()
+
+            espera = tempo_de_espera(tentativa, ultimo_erro)
+            if tentativa + 1 >= self.tentativas or time.monotonic() + espera >= limite:
+                break
+            self.estatisticas['repeticoes'] += 1
+            log.warning(f"[LLM] {ultimo_erro!r}; nova tentativa em {espera:.2f}s")
+            await asyncio.sleep(espera)
+        self.estatisticas['falhas'] += 1
+        raise ErroLLM(f"LLM indisponível: {ultimo_erro or 'prazo esgotado aguardando vaga'}") from ultimo_erro
+
+    def _entrar_no_voo(self, chave):
+        if not self.coalescer:
+            return {'pedacos': [], 'terminado': False, 'erro': None, 'evento': asyncio.Event()}, True
+        voo = self._voos.get(chave)
+        if voo is not None:
+            self.estatisticas['compartilhadas'] += 1
+            return voo, False
+        voo = self._voos[chave] = {'pedacos': [], 'terminado': False, 'erro': None, 'evento': asyncio.Event()}
+        return voo, True
+
+    def _avisar(self, voo):
+        # Acorda quem está esperando e prepara um evento novo para o próximo pedaço
+        evento, voo['evento'] = voo['evento'], asyncio.Event()
+        evento.set()
+
+    def _encerrar_voo(self, chave, voo, erro=None):
+        if self._voos.get(chave) is voo:
+            del self._voos[chave]
+        voo['erro'] = erro
+        voo['terminado'] = True
+        self._avisar(voo)
+
+    async def completar(self, mensagens, modelo=MODELO_PADRAO, **parametros):
+        chave = chave_chamada(mensagens, modelo, parametros)
+        voo, primeiro = self._entrar_no_voo(chave)
+        if primeiro:
+            limite = time.monotonic() + self.prazo
+            try:
+                resposta = await self._executar(
+                    lambda timeout: self.cliente.chat.completions.create(
+                        messages=mensagens, model=modelo, timeout=timeout, **parametros),
+                    limite)
+                voo['pedacos'].append(_texto_da_resposta(resposta))
+            except Exception as e:
+                self._encerrar_voo(chave, voo, e)
+                raise
+            self._encerrar_voo(chave, voo)
+        return ''.join([pedaco async for pedaco in self._acompanhar(voo)])
+
+    def transmitir(self, mensagens, modelo=MODELO_PADRAO, **parametros):
+        chave = chave_chamada(mensagens, modelo, dict(parametros, stream=True))
+        voo, primeiro = self._entrar_no_voo(chave)
+        if primeiro:
+            voo['tarefa'] = asyncio.create_task(self._ler_stream(chave, voo, mensagens, modelo, parametros))
+        return self._acompanhar(voo)
+
+    async def _ler_stream(self, chave, voo, mensagens, modelo, parametros):
+        limite = time.monotonic() + self.prazo
+
+        async def ler(timeout):
+            stream = await self.cliente.chat.completions.create(
+                messages=mensagens, model=modelo, stream=True, timeout=timeout, **parametros)
+            try:
+                async for pedaco in stream:
+                    conteudo = _texto_do_pedaco(pedaco)
+                    if conteudo:
+                        voo['pedacos'].append(conteudo)
+                        self._avisar(voo)
+                    if time.monotonic() >= limite:
+                        raise ErroLLM(f"Stream do LLM passou do prazo de {self.prazo:g}s")
+            except ErroLLM:
+                raise
+            except Exception as e:
+                if voo['pedacos']:
+                    raise ErroLLM(f"Stream do LLM interrompido: {e!r}") from e
+                raise
+            finally:
+                await stream.close()
+
+        try:
+            await self._executar(ler, limite)
+        except Exception as e:
+            self._encerrar_voo(chave, voo, e)
+            return
+        self._encerrar_voo(chave, voo)
+
+    @staticmethod
+    async def _acompanhar(voo):
+        posicao = 0
+        while True:
+            if posicao >= len(voo['pedacos']) and not voo['terminado']:
+                await voo['evento'].wait()
+                continue
+            novos = voo['pedacos'][posicao:]
+            for pedaco in novos:
+                yield pedaco
+            posicao += len(novos)
+            if voo['terminado'] and posicao >= len(voo['pedacos']):
+                if voo['erro'] is not None:
+                    raise voo['erro']
+                return
+
+
+def criar_gateway(api_key=None):
+    """GatewayLLM configurado pelas variáveis de ambiente; None se não houver chave da Groq."""
+    try:
+        gateway = GatewayLLM(api_key=api_key)
+    except Exception as e:
+        log.error(f"ERRO: Chave da API da Groq não encontrada. Configure a variável de ambiente. Erro: {e}")
+        return None
+    log.info("Cliente da API da Groq configurado.")
+    return gateway
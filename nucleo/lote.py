@@ -0,0 +1,107 @@
+"""Perguntas em lote do /ask/batch e do perguntar_lote.py.
+
+O lote chega inteiro de uma vez: perguntas repetidas (mesma forma normalizada e mesmas fontes)
+são respondidas uma só vez, a recuperação roda de uma vez para todas (uma chamada ao modelo de
+embedding e uma busca no FAISS) e as chamadas ao LLM saem em paralelo, com no máximo
+LOTE_CONCORRENCIA por lote. Somando todos os lotes do processo, saem no máximo LOTE_TAXA_LLM
+chamadas por segundo e ficam abertas no máximo LOTE_VAGAS_LLM: as outras vagas do gateway
+(LLM_CONCORRENCIA) ficam sempre para o /ask interativo.
+As respostas voltam em JSON Lines, na ordem em que ficam prontas.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from nucleo.admissao import Faixa, LimitadorClientes
+from nucleo.llm import CONCORRENCIA as CONCORRENCIA_LLM
+from nucleo.recuperacao import normalizar_pergunta
+
+MAXIMO_PERGUNTAS = int(os.environ.get("LOTE_MAXIMO", "500"))
+CONCORRENCIA = int(os.environ.get("LOTE_CONCORRENCIA", "4"))
+TAXA_LLM = float(os.environ.get("LOTE_TAXA_LLM", "4"))
+# Um lote segura uma thread do servidor até a última resposta: poucos de cada vez, sem fila
+SIMULTANEOS = int(os.environ.get("LOTE_SIMULTANEOS", "1"))
+# Vagas do semáforo do gateway que os lotes podem ocupar juntos (um quarto, e nunca todas)
+VAGAS_LLM = max(1, min(int(os.environ.get("LOTE_VAGAS_LLM", CONCORRENCIA_LLM // 4)), CONCORRENCIA_LLM - 1))
+
+# Chamadas ao LLM dos lotes (balde de fichas e vagas, compartilhados por todos os lotes do processo)
+_limitador_llm = LimitadorClientes(taxa=TAXA_LLM, rajada=max(1, CONCORRENCIA))
+_vagas_llm = threading.BoundedSemaphore(VAGAS_LLM)
+FAIXA_LOTES = Faixa('lote', SIMULTANEOS, fila=0)
+
+
+class ItemLote:
+    """Uma pergunta do lote: `posicao` no pedido, `id` do cliente (ou a posição) e fontes opcionais."""
+
+    __slots__ = ('posicao', 'id', 'pergunta', 'fontes')
+
+    def __init__(self, posicao, id, pergunta, fontes=None):
+        self.posicao = posicao
+        self.id = id
+        self.pergunta = pergunta
+        self.fontes = fontes
+
+    @property
+    def chave(self):
+        return normalizar_pergunta(self.pergunta), tuple(sorted(self.fontes)) if self.fontes else None
+
+
+def ler_itens(data, maximo=MAXIMO_PERGUNTAS):
+    """Itens do corpo do /ask/batch; levanta ValueError com a mensagem para o cliente.
+
+    Aceita {"questions": ["...", {"id": ..., "question": "...", "sources": [...]}, ...], "sources": [...]}:
+    `sources` no nível de cima vale para as perguntas que não trazem as suas.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("O corpo deve ser um objeto JSON com a lista de perguntas (questions).")
+    perguntas = data.get('questions')
+    if not isinstance(perguntas, list) or not perguntas:
+        raise ValueError("A lista de perguntas (questions) é obrigatória.")
+    if len(perguntas) > maximo:
+        raise ValueError(f"O lote aceita no máximo {maximo} perguntas.")
+    fontes_do_lote = _fontes(data.get('sources'), "sources")
+    itens = []
+    for posicao, pergunta in enumerate(perguntas):
+        if isinstance(pergunta, str):
+            pergunta = {'question': pergunta}
+        if not isinstance(pergunta, dict) or not isinstance(pergunta.get('question'), str) \
+                or not pergunta['question'].strip():
+            raise ValueError(f"A pergunta {posicao} não tem o campo question.")
+        fontes = _fontes(pergunta['sources'], f"sources da pergunta {posicao}") if 'sources' in pergunta \
+            else fontes_do_lote
+        itens.append(ItemLote(posicao, pergunta.get('id', posicao), pergunta['question'], fontes))
+    return itens
+
+
+def _fontes(fontes, campo):
+    if fontes is None:
+        return None
+    if not isinstance(fontes, list) or not all(isinstance(fonte, str) for fonte in fontes):
+        raise ValueError(f"O campo {campo} deve ser uma lista de arquivos.")
+    return fontes or None
+
+
+def agrupar(itens):
+    """{chave: [itens]} na ordem da primeira ocorrência; cada chave é respondida uma vez."""
+    grupos = {}
+    for item in itens:
+        grupos.setdefault(item.chave, []).append(item)
+    return grupos
+
+
+def esperar_vez_do_llm(limitador=_limitador_llm, dormir=time.sleep):
+    """Bloqueia até haver ficha para mais uma chamada ao LLM dos lotes."""
+    while True:
+        espera = limitador.permitir('lote')
+        if not espera:
+            return
+        dormir(espera)
+
+
+@contextmanager
+def vez_do_llm(limitador=_limitador_llm, vagas=_vagas_llm, dormir=time.sleep):
+    """Espera a ficha e uma das VAGAS_LLM; a vaga fica ocupada até o fim do bloco (a chamada ao LLM)."""
+    esperar_vez_do_llm(limitador, dormir)
+    with vagas:
+        yield
@@ -0,0 +1,166 @@
+"""Métricas do assistente no formato texto do Prometheus, servidas em /metrics.
+
+Implementação própria e pequena (sem o pacote prometheus_client): contadores e histogramas com
+rótulos, protegidos por lock, que custam uma busca binária e uma soma por observação.
+
+Com vários workers do gunicorn cada processo tem os seus números e cada coleta vê um deles;
+para números do servidor inteiro, some por instância no Prometheus ou use um worker com mais threads.
+
+Taxa de fallback para a web:
+    rate(assistente_fallback_web_total[5m]) / rate(assistente_respostas_total{origem=~"manual|web|falha_web"}[5m])
+"""
+import bisect
+import threading
+
+# Limites (em segundos) dos baldes dos histogramas: de microssegundos (BM25) a dezenas de segundos (LLM)
+LIMITES_PADRAO = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escapar(valor):
+    return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _formatar_rotulos(nomes, valores, extra=None):
+    pares = list(zip(nomes, valores))
+    if extra:
+        pares.append(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{nome}="{_escapar(valor)}"' for nome, valor in pares) + "}"
+
+
+def _formatar_numero(valor):
+    if valor == float('inf'):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """Contador monotônico com rótulos."""
+
+    tipo = 'counter'
+
+    def __init__(self, nome, ajuda, rotulos=()):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def inc(self, quantidade=1, **rotulos):
+        chave = tuple(rotulos.get(nome, "") for nome in self.rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0) + quantidade
+
+    def valor(self, **rotulos):
+        return self._valores.get(tuple(rotulos.get(nome, "") for nome in self.rotulos), 0)
+
+    def exportar(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        return [f"{self.nome}{_formatar_rotulos(self.rotulos, chave)} {_formatar_numero(valor)}"
+                for chave, valor in valores]
+
+
+class Histograma:
+    """Histograma com baldes fixos (em segundos) e rótulos."""
+
+    tipo = 'histogram'
+
+    def __init__(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        self.nome = nome
+        self.ajuda = ajuda
+        self.rotulos = tuple(rotulos)
+        self.limites = tuple(sorted(limites))
+        self._series = {}  # rótulos -> [contagem por balde (não acumulada) + estouro, soma]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **rotulos):
+        chave = tuple(rotulos.get(nome, "") for nome in self.rotulos)
+        balde = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(chave)
+            if serie is None:
+                serie = self._series[chave] = [[0] * (len(self.limites) + 1), 0.0]
+            serie[0][balde] += 1
+            serie[1] += valor
+
+    def contagem(self, **rotulos):
+        serie = self._series.get(tuple(rotulos.get(nome, "") for nome in self.rotulos))
+        return sum(serie[0]) if serie else 0
+
+    def exportar(self):
+        with self._lock:
+            series = sorted((chave, list(baldes), soma) for chave, (baldes, soma) in self._series.items())
+        linhas = []
+        for chave, baldes, soma in series:
+            acumulado = 0
+            for limite, quantidade in zip(self.limites + (float('inf'),), baldes):
+                acumulado += quantidade
+                rotulos = _formatar_rotulos(self.rotulos, chave, ('le', _formatar_numero(limite)))
+                linhas.append(f"{self.nome}_bucket{rotulos} {acumulado}")
+            rotulos = _formatar_rotulos(self.rotulos, chave)
+            linhas.append(f"{self.nome}_sum{rotulos} {_formatar_numero(soma)}")
+            linhas.append(f"{self.nome}_count{rotulos} {acumulado}")
+        return linhas
+
+
+class Registro:
+    """Conjunto de métricas exportado junto."""
+
+    def __init__(self):
+        self._metricas = []
+
+    def _registrar(self, metrica):
+        self._metricas.append(metrica)
+        return metrica
+
+    def contador(self, nome, ajuda, rotulos=()):
+        return self._registrar(Contador(nome, ajuda, rotulos))
+
+    def histograma(self, nome, ajuda, rotulos=(), limites=LIMITES_PADRAO):
+        return self._registrar(Histograma(nome, ajuda, rotulos, limites))
+
+    def exportar(self):
+        """Texto no formato de exposição do Prometheus (versão 0.0.4)."""
+        linhas = []
+        for metrica in self._metricas:
+            linhas.append(f"# HELP {metrica.nome} {metrica.ajuda}")
+            linhas.append(f"# TYPE {metrica.nome} {metrica.tipo}")
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+METRICAS = Registro()
+DURACAO_ETAPAS = METRICAS.histograma(
+    'assistente_etapa_segundos',
+    "Duração de cada etapa (idioma, intencao, faq, recuperacao, cache, llm, web, busca, download, extracao, total)",
+    ('etapa',))
+RESPOSTAS = METRICAS.contador(
+    'assistente_respostas_total', "Respostas entregues por origem (intencao, faq, cache, manual, web, falha_web, recusada, erro)",
+    ('origem',))
+CACHE_RESPOSTAS = METRICAS.contador(
+    'assistente_cache_respostas_total', "Consultas ao cache de respostas (acerto ou falha)", ('resultado',))
+FALLBACK_WEB = METRICAS.contador(
+    'assistente_fallback_web_total', "Perguntas que o manual não respondeu e seguiram para a busca web")
+DECISOES_CASCATA = METRICAS.contador(
+    'assistente_cascata_total', "Rota escolhida pela confiança da recuperação (manual, web, especular)", ('rota',))
+BUSCAS_ESPECULATIVAS = METRICAS.contador(
+    'assistente_busca_especulativa_total', "Buscas web feitas em paralelo ao manual (usada ou descartada)",
+    ('resultado',))
+RECUSAS_ADMISSAO = METRICAS.contador(
+    'assistente_admissao_recusadas_total', "Perguntas recusadas pelo controle de admissão por faixa e motivo",
+    ('faixa', 'motivo'))
+PERGUNTAS_LOTE = METRICAS.contador(
+    'assistente_lote_perguntas_total', "Perguntas recebidas pelo /ask/batch (unica ou repetida dentro do lote)",
+    ('tipo',))
+ERROS_UPSTREAM = METRICAS.contador(
+    'assistente_erros_upstream_total', "Falhas de serviços externos por tentativa (groq, busca, pagina, cache)",
+    ('servico',))
+
+
+def observar_etapa(etapa, segundos):
+    """Callback do Cronometro: cada etapa medida vai para o histograma."""
+    DURACAO_ETAPAS.observar(segundos, etapa=etapa)
@@ -0,0 +1,215 @@
+"""Orçamento de tokens do prompt: mede, corta o histórico e comprime o contexto antes de chamar a Groq.
+
+O prompt nunca passa de ORCAMENTO_PROMPT_TOKENS. O histórico perde primeiro as mensagens
+repetidas e depois as mais antigas, e nunca ocupa os ORCAMENTO_CONTEXTO_MINIMO_TOKENS reservados
+ao contexto; se nem essa reserva cabe, não há prompt e a pergunta recebe a mensagem de falha. Do contexto do manual saem primeiro os chunks menos
+relevantes (os últimos). Um artigo da web fica só com as frases mais próximas da pergunta.
+"""
+import logging
+import os
+import re
+import threading
+
+from nucleo import registro
+from nucleo.dependencias import disponivel
+from nucleo.documentos import estimar_tokens
+from nucleo.indice_lexico import IndiceBM25, tokenizar
+from nucleo.prompts import SEPARADOR_CHUNKS, montar_prompt, montar_prompt_relatorio
+
+log = registro.obter('orcamento')
+
+MAXIMO_PROMPT = int(os.environ.get("ORCAMENTO_PROMPT_TOKENS", "2500"))
+MAXIMO_HISTORICO = int(os.environ.get("ORCAMENTO_HISTORICO_TOKENS", "500"))
+MAXIMO_CONTEXTO = int(os.environ.get("ORCAMENTO_CONTEXTO_TOKENS", "1200"))
+# Abaixo disso o LLM responderia só com as regras e o histórico: melhor nem chamar
+MINIMO_CONTEXTO = int(os.environ.get("ORCAMENTO_CONTEXTO_MINIMO_TOKENS", "150"))
+MAXIMO_PERGUNTA = int(os.environ.get("ORCAMENTO_PERGUNTA_TOKENS", "300"))
+MAXIMO_RESUMO = int(os.environ.get("ORCAMENTO_RESUMO_TOKENS", "200"))
+# tokenizer.json do modelo (ex.: o do Llama 3.1) para contar tokens de verdade; sem ele, usa a estimativa
+ARQUIVO_TOKENIZADOR = os.environ.get("TOKENIZADOR_ARQUIVO", "")
+
+_FRASES = re.compile(r'(?<=[.!?])\s+|\n+')
+
+
+class ContadorTokens:
+    """Conta tokens com o tokenizer local (pacote `tokenizers`) ou pela estimativa de ~4 caracteres/token."""
+
+    def __init__(self, arquivo=ARQUIVO_TOKENIZADOR):
+        self.arquivo = arquivo
+        self._tokenizador = None
+        self._lock = threading.Lock()
+        self.exato = bool(arquivo) and os.path.exists(arquivo) and disponivel('tokenizers')
+        if arquivo and not self.exato:
+            log.warning(f"AVISO: Tokenizer '{arquivo}' indisponível (arquivo ou pacote 'tokenizers' ausente). Usando estimativa.")
+
+    def __call__(self, texto):
+        if not texto:
+            return 0
+        if not self.exato:
+            return estimar_tokens(texto)
+        if self._tokenizador is None:
+            with self._lock:
+                if self._tokenizador is None:
+                    from tokenizers import Tokenizer
+                    self._tokenizador = Tokenizer.from_file(self.arquivo)
+        return len(self._tokenizador.encode(texto, add_special_tokens=False).ids)
+
+
+def cortar(texto, maximo, contar):
+    """Corta o texto entre palavras para caber em `maximo` tokens."""
+    if contar(texto) <= maximo:
+        return texto
+    palavras = texto.split()
+    # Busca binária pelo maior prefixo que cabe: poucas chamadas ao contador mesmo em textos longos
+    baixo, alto = 0, len(palavras)
+    while baixo < alto:
+        meio = (baixo + alto + 1) // 2
+        if contar(' '.join(palavras[:meio])) <= maximo:
+            baixo = meio
+        else:
+            alto = meio - 1
+    return ' '.join(palavras[:baixo])
+
+
+def comprimir_texto(pergunta, texto, maximo, contar):
+    """Mantém só as frases mais relevantes para a pergunta (BM25), na ordem original, até `maximo` tokens."""
+    if contar(texto) <= maximo:
+        return texto
+    frases = []
+    vistas = set()
+    for frase in _FRASES.split(texto):
+        frase = frase.strip()
+        chave = ' '.join(tokenizar(frase))
+        # Menus, rodapés e parágrafos repetidos aparecem várias vezes em páginas extraídas
+        if chave and chave not in vistas:
+            vistas.add(chave)
+            frases.append(frase)
+    if not frases:
+        return ""
+
+    indice = IndiceBM25(frases)
+    scores = indice.pontuar(pergunta)
+    # Sem nenhum termo em comum, as primeiras frases (o lead do artigo) são a melhor aposta
+    ordem = sorted(range(len(frases)), key=lambda idx: (-scores.get(idx, 0.0), idx))
+
+    escolhidas, usados = [], 0
+    for idx in ordem:
+        tokens = contar(frases[idx])
+        if usados + tokens > maximo:
+            continue
+        escolhidas.append(idx)
+        usados += tokens
+    if not escolhidas:
+        return cortar(frases[ordem[0]], maximo, contar)
+    return ' '.join(frases[idx] for idx in sorted(escolhidas))
+
+
+def ajustar_contexto(pergunta, contexto, maximo, contar):
+    """Contexto do manual (chunks separados por SEPARADOR_CHUNKS, do mais relevante para o menos)
+    perde os últimos chunks; um texto único (artigo da web) é comprimido por frases."""
+    if contar(contexto) <= maximo:
+        return contexto
+    chunks = contexto.split(SEPARADOR_CHUNKS)
+    if len(chunks) == 1:
+        return comprimir_texto(pergunta, contexto, maximo, contar)
+
+    mantidos, usados = [], 0
+    custo_separador = contar(SEPARADOR_CHUNKS)
+    for chunk in chunks:
+        tokens = contar(chunk) + (custo_separador if mantidos else 0)
+        if usados + tokens > maximo:
+            break
+        mantidos.append(chunk)
+        usados += tokens
+    if not mantidos:
+        return comprimir_texto(pergunta, chunks[0], maximo, contar)
+    return SEPARADOR_CHUNKS.join(mantidos)
+
+
+def compactar_historico(historico, maximo, contar, pergunta_atual=None):
+    """Remove mensagens repetidas (fica a mais recente) e as mais antigas até caber em `maximo` tokens."""
+    vistas = set()
+    if pergunta_atual:
+        # Clientes que já incluem a pergunta atual no histórico não a mandam duas vezes
+        vistas.add(('user', ' '.join(tokenizar(pergunta_atual))))
+    mantidas, usados = [], 0
+    for mensagem in reversed(historico):
+        conteudo = (mensagem.get('content') or '').strip()
+        chave = (mensagem.get('role'), ' '.join(tokenizar(conteudo)))
+        if not conteudo or chave in vistas:
+            continue
+        vistas.add(chave)
+        tokens = contar(conteudo) + 3  # "Usuário: " / "Assistente: " e a quebra de linha
+        if usados + tokens > maximo:
+            break
+        mantidas.append({'role': mensagem.get('role'), 'content': conteudo})
+        usados += tokens
+    mantidas.reverse()
+    return mantidas
+
+
+class OrcamentoTokens:
+    """Monta os prompts do api.py e do app.py dentro do limite de tokens."""
+
+    def __init__(self, contador=None, maximo_prompt=MAXIMO_PROMPT, maximo_historico=MAXIMO_HISTORICO,
+                 maximo_contexto=MAXIMO_CONTEXTO, maximo_pergunta=MAXIMO_PERGUNTA, maximo_resumo=MAXIMO_RESUMO,
+                 minimo_contexto=MINIMO_CONTEXTO):
+        self.contar = contador or ContadorTokens()
+        self.maximo_prompt = maximo_prompt
+        self.maximo_historico = maximo_historico
+        self.maximo_contexto = maximo_contexto
+        self.minimo_contexto = minimo_contexto
+        self.maximo_pergunta = maximo_pergunta
+        self.maximo_resumo = maximo_resumo
+
+    def comprimir(self, pergunta, texto, maximo=None):
+        """Comprime um texto solto (ex.: um artigo da web) para no máximo `maximo` tokens."""
+        return comprimir_texto(pergunta, texto, maximo or self.maximo_contexto, self.contar)
+
+    def montar_prompt(self, pergunta_atual, historico, contexto, fonte_do_contexto, idioma='pt', resumo=""):
+        """Mesmo prompt de prompts.montar_prompt, com resumo, histórico e contexto ajustados ao orçamento.
+
+        Retorna None se o contexto não cabe: quem chama responde com a mensagem de falha sem chamar o LLM.
+        """
+        pergunta_atual = cortar(pergunta_atual, self.maximo_pergunta, self.contar)
+        # O resumo da sessão fica no fim do próprio texto (as linhas mais recentes)
+        if resumo and self.contar(resumo) > self.maximo_resumo:
+            linhas = resumo.split('\n')
+            while len(linhas) > 1 and self.contar('\n'.join(linhas)) > self.maximo_resumo:
+                linhas.pop(0)
+            resumo = cortar('\n'.join(linhas), self.maximo_resumo, self.contar)
+        # Tokens das regras + pergunta (+ resumo), que sempre vão no prompt
+        disponivel = self.maximo_prompt - self.contar(montar_prompt(pergunta_atual, [], "", fonte_do_contexto, idioma, resumo))
+        if contexto and disponivel < self.minimo_contexto:
+            return self._sem_espaco(disponivel)
+
+        # O histórico só usa o que sobra depois da reserva do contexto
+        maximo_historico = min(self.maximo_historico, max(disponivel - self.minimo_contexto, 0) // 3)
+        historico = compactar_historico(historico, maximo_historico, self.contar, pergunta_atual)[-6:]
+        disponivel -= sum(self.contar(mensagem['content']) + 3 for mensagem in historico)
+        ajustado = ajustar_contexto(pergunta_atual, contexto, min(self.maximo_contexto, max(disponivel, 0)), self.contar)
+        if contexto and not ajustado:
+            return self._sem_espaco(disponivel)
+        contexto = ajustado
+
+        prompt = montar_prompt(pergunta_atual, historico, contexto, fonte_do_contexto, idioma, resumo)
+        # Contar o prompt inteiro custa outra tokenização: só quando o DEBUG está ligado
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(f"[ORÇAMENTO] Prompt com {self.contar(prompt)} tokens (histórico: {len(historico)} mensagens)")
+        return prompt
+
+    def montar_prompt_relatorio(self, pergunta, contexto, fonte, idioma='pt'):
+        """Versão do app.py (sem histórico); None se o contexto não cabe, como em montar_prompt."""
+        pergunta = cortar(pergunta, self.maximo_pergunta, self.contar)
+        disponivel = self.maximo_prompt - self.contar(montar_prompt_relatorio(pergunta, "", fonte, idioma))
+        if contexto and disponivel < self.minimo_contexto:
+            return self._sem_espaco(disponivel)
+        ajustado = ajustar_contexto(pergunta, contexto, min(self.maximo_contexto, max(disponivel, 0)), self.contar)
+        if contexto and not ajustado:
+            return self._sem_espaco(disponivel)
+        return montar_prompt_relatorio(pergunta, ajustado, fonte, idioma)
+
+    @staticmethod
+    def _sem_espaco(disponivel):
+        log.warning(f"[ORÇAMENTO] Só {max(disponivel, 0)} tokens para o contexto: o prompt não é montado")
+        return None
@@ -0,0 +1,108 @@
+"""Construção dos prompts enviados à Groq pelo api.py e pelo app.py."""
+
+# Separa os chunks do manual dentro do contexto, do mais relevante para o menos
+SEPARADOR_CHUNKS = "\n\n---\n\n"
+
+
+def montar_prompt(pergunta_atual, historico, contexto, fonte_do_contexto, idioma='pt', resumo=""):
+    """Monta o prompt enviado à Groq com regras, histórico e contexto.
+
+    `resumo` (das trocas antigas de uma sessão do servidor) entra antes das mensagens recentes.
+    """
+    historico_recente = historico[-6:]
+    historico_formatado = "\n".join([f"Usuário: {msg['content']}" if msg['role'] == 'user' else f"Assistente: {msg['content']}" for msg in historico_recente])
+    if resumo:
+        historico_formatado = f"Resumo do início da conversa:\n{resumo}\n{historico_formatado}"
+
+    # Instruções de idioma
+    instrucoes_idioma = {
+        'pt': "TODA RESPOSTA DEVE SER EM PORTUGUÊS.",
+        'es': "TODA RESPUESTA DEBE SER EN ESPAÑOL.",
+        'en': "ALL RESPONSES MUST BE IN ENGLISH."
+    }
+
+    instrucao_idioma = instrucoes_idioma.get(idioma, instrucoes_idioma['pt'])
+
+    prompt_completo = f"""
+    Você é um assistente técnico especialista. Responda a PERGUNTA ATUAL do usuário baseando-se exclusivamente no CONTEXTO DE CONSULTA.
+
+    REGRAS ESTRITAS:
+    1.  Use o HISTÓRICO DA CONVERSA para entender perguntas de acompanhamento.
+    2.  Sua resposta deve vir APENAS do CONTEXTO DE CONSULTA. Não use conhecimento prévio.
+    3.  Seja direto e não mencione o contexto ou a fonte. NÃO diga coisas do tipo "a fonte que consultei".
+    4.  REGRA DE FALHA: Se a resposta não estiver no CONTEXTO DE CONSULTA, responda APENAS com a frase: "Não encontrei informações sobre isso na fonte consultada."
+    5.  NÃO CORRIJA a ortografia do usuário NEM RESPONDA QUESTÕES DE GRAMATICA. VOCE É UM ASSISTENTE TÉCNICO, não um PROFESSOR.
+    6.  {instrucao_idioma}
+
+    ---
+
+    --- 
+
+    ---
+    HISTÓRICO DA CONVERSA:
+    {historico_formatado}
+    ---
+    CONTEXTO DE CONSULTA (Fonte: {fonte_do_contexto}):
+    {contexto}
+    ---
+    PERGUNTA ATUAL DO USUÁRIO:
+    {pergunta_atual}
+    ---
+    RESPOSTA DIRETA:
+    """
+    return prompt_completo
+
+
+def montar_prompt_relatorio(pergunta, contexto, fonte, idioma='pt'):
+    """Prompt do app.py: resposta mais detalhada, sem histórico de conversa."""
+    # Instruções de idioma
+    instrucoes_idioma = {
+        'pt': "Leia o contexto e sintetize uma resposta clara e útil em português.",
+        'es': "Lea el contexto y sintetice una respuesta clara y útil en español.",
+        'en': "Read the context and synthesize a clear and helpful response in English."
+    }
+
+    mensagens_falha = {
+        'pt': "Não encontrei uma resposta para isso.",
+        'es': "No encontré una respuesta para esto.",
+        'en': "I didn't find an answer for this."
+    }
+
+    instrucao = instrucoes_idioma.get(idioma, instrucoes_idioma['pt'])
+    msg_falha = mensagens_falha.get(idioma, mensagens_falha['pt'])
+
+    prompt = f"""
+    Aja como um assistente técnico especialista. Sua tarefa é responder a PERGUNTA do usuário.
+    A resposta DEVE ser baseada exclusivamente no CONTEXTO fornecido, que veio da fonte: '{fonte}'.
+    - {instrucao}
+    - Não invente informações. Se a resposta não estiver no contexto, diga "{msg_falha}".
+
+    ---
+    CONTEXTO:
+    {contexto}
+    ---
+    PERGUNTA DO USUÁRIO:
+    {pergunta}
+    ---
+    RESPOSTA DETALHADA:
+    """
+    return prompt
+
+
+def montar_prompt_traducao(pergunta, idioma):
+    """Prompt do precomputar_faq.py: traduz uma pergunta do manual, sem responder a ela."""
+    nomes_idioma = {'pt': "português", 'es': "espanhol", 'en': "inglês"}
+
+    prompt = f"""
+    Traduza a PERGUNTA abaixo para {nomes_idioma.get(idioma, nomes_idioma['pt'])}, como um usuário a escreveria.
+    - NÃO responda à pergunta.
+    - Mantenha nomes de produtos, funções e botões (Console Mix, Audio Call, CUE, TALK, vMix...) como estão.
+    - Responda APENAS com a pergunta traduzida, em uma linha.
+
+    ---
+    PERGUNTA:
+    {pergunta}
+    ---
+    TRADUÇÃO:
+    """
+    return prompt
@@ -0,0 +1,240 @@
+import os
+import pickle
+import threading
+from functools import lru_cache
+
+from nucleo import registro
+from nucleo.codificador import CODIFICADOR, carregar_codificador
+from nucleo.dependencias import ModuloPreguicoso
+from nucleo.indice_denso import MODELO_EMBEDDING, NOME_ARQUIVO_CHUNKS, NOME_ARQUIVO_INDICE, ler_manifesto
+
+log = registro.obter('recuperacao')
+
+np = ModuloPreguicoso('numpy')
+
+MODOS_RECUPERACAO = ('keyword', 'denso', 'hibrido')
+
+# Equivale ao corte "distância L2 > 1.0" do app.py para vetores normalizados
+SIMILARIDADE_MINIMA = 0.5
+
+
+def normalizar_pergunta(pergunta):
+    """Forma canônica da pergunta, usada como chave de cache."""
+    return ' '.join(pergunta.lower().split())
+
+
+def ler_indice_mapeado(caminho):
+    """Abre o índice FAISS mapeado em memória, para que os workers do gunicorn compartilhem as páginas."""
+    import faiss
+
+    for flag in ('IO_FLAG_MMAP_IFC', 'IO_FLAG_MMAP'):
+        if hasattr(faiss, flag):
+            try:
+                return faiss.read_index(caminho, getattr(faiss, flag) | faiss.IO_FLAG_READ_ONLY)
+            except RuntimeError:
+                continue
+    # Versões antigas do FAISS não mapeiam índices flat; carrega normalmente
+    return faiss.read_index(caminho)
+
+
+def fonte_do_chunk(faixas, idx):
+    """Fonte cuja faixa [inicio, fim) contém o chunk idx, ou None."""
+    for fonte, (inicio, fim) in faixas.items():
+        if inicio <= idx < fim:
+            return fonte
+    return None
+
+
+class RecuperadorLexico:
+    """Busca por palavras-chave sobre um IndiceBM25 ou um Corpus (que também filtra por fonte)."""
+
+    def __init__(self, indice, reforcos=None):
+        self.indice = indice
+        self.reforcos = reforcos or {}
+
+    def buscar(self, pergunta, top_k=3, fontes=None):
+        """Retorna até top_k pares (chunk, score)."""
+        if fontes or self.reforcos:
+            resultados = self.indice.buscar(pergunta, top_k=top_k, fontes=fontes, reforcos=self.reforcos)
+        else:
+            # IndiceBM25 puro não conhece fontes
+            resultados = self.indice.buscar(pergunta, top_k=top_k)
+        return [(self.indice.documentos[idx], score) for idx, score in resultados]
+
+    def buscar_lote(self, perguntas, top_k=3, fontes=None):
+        return [self.buscar(pergunta, top_k=top_k, fontes=fontes) for pergunta in perguntas]
+
+
+class RecuperadorDenso:
+    """Busca semântica sobre o índice gerado por construir_indice.py.
+
+    `codificador` ('torch' ou 'onnx', RECUPERACAO_CODIFICADOR) escolhe quem codifica as perguntas.
+    """
+
+    def __init__(self, caminho_indice=NOME_ARQUIVO_INDICE, caminho_chunks=NOME_ARQUIVO_CHUNKS,
+                 nome_modelo=MODELO_EMBEDDING, modelo=None, tamanho_cache=1024, faixas=None, reforcos=None,
+                 codificador=CODIFICADOR):
+        self.indice = ler_indice_mapeado(caminho_indice)
+        with open(caminho_chunks, 'rb') as f:
+            self.chunks = pickle.load(f)
+        # Faixa de chunks de cada fonte, gravada no manifesto por construir_indice.py
+        self.faixas = faixas or {}
+        self.reforcos = reforcos or {}
+        self.nome_modelo = nome_modelo
+        self.codificador = codificador
+        self.raiz = os.path.dirname(caminho_indice) or "."
+        self._modelo = modelo
+        self._lock = threading.Lock()
+        # Perguntas repetidas não passam de novo pelo modelo
+        self.codificar = lru_cache(maxsize=tamanho_cache)(self._codificar)
+
+    @property
+    def modelo(self):
+        if self._modelo is None:
+            with self._lock:
+                if self._modelo is None:
+                    self._modelo = carregar_codificador(self.nome_modelo, self.codificador, self.raiz)
+        return self._modelo
+
+    def _codificar(self, pergunta_normalizada):
+        vetor = self.modelo.encode([pergunta_normalizada], normalize_embeddings=True)
+        vetor = np.asarray(vetor, dtype='float32')
+        vetor.setflags(write=False)
+        return vetor
+
+    def buscar(self, pergunta, top_k=3, similaridade_minima=SIMILARIDADE_MINIMA, fontes=None):
+        """Retorna até top_k pares (chunk, similaridade de cosseno) acima do corte."""
+        if self.indice.ntotal == 0:
+            return []
+        vetor = self.codificar(normalizar_pergunta(pergunta))
+        distancias, indices = self.indice.search(vetor, self._candidatos(top_k, fontes))
+        return self._selecionar(distancias[0], indices[0], top_k, similaridade_minima, fontes)
+
+    def buscar_lote(self, perguntas, top_k=3, similaridade_minima=SIMILARIDADE_MINIMA, fontes=None):
+        """buscar() de várias perguntas com uma chamada ao modelo e uma busca no índice."""
+        if not perguntas or self.indice.ntotal == 0:
+            return [[] for _ in perguntas]
+        vetores = self.modelo.encode([normalizar_pergunta(pergunta) for pergunta in perguntas],
+                                     normalize_embeddings=True)
+        vetores = np.asarray(vetores, dtype='float32')
+        distancias, indices = self.indice.search(vetores, self._candidatos(top_k, fontes))
+        return [self._selecionar(linha_distancias, linha_indices, top_k, similaridade_minima, fontes)
+                for linha_distancias, linha_indices in zip(distancias, indices)]
+
+    def _candidatos(self, top_k, fontes):
+        # Com filtro ou reforço por fonte, busca mais candidatos para sobrar top_k depois
+        candidatos = top_k * 4 if (fontes and self.faixas) or self.reforcos else top_k
+        return min(candidatos, self.indice.ntotal)
+
+    def _selecionar(self, distancias, indices, top_k, similaridade_minima, fontes):
+        filtrar = bool(fontes and self.faixas)
+        resultados = []
+        for distancia, idx in zip(distancias, indices):
+            similaridade = 1.0 - float(distancia) / 2.0  # ||a - b||² = 2 - 2cos para vetores unitários
+            if idx < 0 or similaridade < similaridade_minima:
+                continue
+            fonte = fonte_do_chunk(self.faixas, idx) if self.faixas else None
+            if filtrar and fonte not in fontes:
+                continue
+            resultados.append((self.chunks[idx], similaridade, self.reforcos.get(fonte, 1.0)))
+        if self.reforcos:
+            resultados.sort(key=lambda item: item[1] * item[2], reverse=True)
+        return [(chunk, similaridade) for chunk, similaridade, _ in resultados[:top_k]]
+
+
+class RecuperadorHibrido:
+    """Combina o BM25 e a busca semântica por Reciprocal Rank Fusion."""
+
+    def __init__(self, lexico, denso, candidatos=10, k=60):
+        self.lexico = lexico
+        self.denso = denso
+        self.candidatos = candidatos
+        self.k = k
+
+    def buscar(self, pergunta, top_k=3, fontes=None):
+        return self._fundir([self.lexico.buscar(pergunta, top_k=self.candidatos, fontes=fontes),
+                             self.denso.buscar(pergunta, top_k=self.candidatos, fontes=fontes)], top_k)
+
+    def buscar_lote(self, perguntas, top_k=3, fontes=None):
+        lexicos = self.lexico.buscar_lote(perguntas, top_k=self.candidatos, fontes=fontes)
+        densos = self.denso.buscar_lote(perguntas, top_k=self.candidatos, fontes=fontes)
+        return [self._fundir(listas, top_k) for listas in zip(lexicos, densos)]
+
+    def _fundir(self, listas, top_k):
+        scores = {}
+        for resultados in listas:
+            for posicao, (chunk, _) in enumerate(resultados):
+                scores[chunk] = scores.get(chunk, 0.0) + 1.0 / (self.k + posicao + 1)
+        melhores = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+        return melhores[:top_k]
+
+
+class RecuperadorFAQ:
+    """Pergunta idêntica a uma do manual vai direto para o chunk da resposta, sem passar pela busca.
+
+    O score 1.0 indica correspondência exata; as demais perguntas seguem para `recuperador`.
+    """
+
+    def __init__(self, corpus, recuperador):
+        self.corpus = corpus
+        self.recuperador = recuperador
+
+    def buscar(self, pergunta, top_k=3, fontes=None):
+        ids = self.corpus.buscar_pergunta(pergunta, fontes)
+        if ids:
+            return [(self.corpus.documentos[idx], 1.0) for idx in ids[:top_k]]
+        return self.recuperador.buscar(pergunta, top_k=top_k, fontes=fontes)
+
+    def buscar_lote(self, perguntas, top_k=3, fontes=None):
+        """buscar() de várias perguntas; só as que não são do manual vão, juntas, para `recuperador`."""
+        resultados = [None] * len(perguntas)
+        restantes = []
+        for posicao, pergunta in enumerate(perguntas):
+            ids = self.corpus.buscar_pergunta(pergunta, fontes)
+            if ids:
+                resultados[posicao] = [(self.corpus.documentos[idx], 1.0) for idx in ids[:top_k]]
+            else:
+                restantes.append(posicao)
+        encontrados = self.recuperador.buscar_lote([perguntas[posicao] for posicao in restantes], top_k=top_k,
+                                                   fontes=fontes)
+        for posicao, resultado in zip(restantes, encontrados):
+            resultados[posicao] = resultado
+        return resultados
+
+
+def criar_recuperador(modo, indice_lexico, caminho_indice=NOME_ARQUIVO_INDICE, caminho_chunks=NOME_ARQUIVO_CHUNKS,
+                      modelo=None, reforcos=None):
+    """Monta o recuperador configurado; volta para 'keyword' se o índice semântico não estiver disponível.
+
+    `modelo` reaproveita um modelo de embedding já carregado (recarga da base) e `reforcos`
+    ({fonte: fator}) favorece os chunks de algumas fontes.
+    Retorna (recuperador, modo efetivamente usado).
+    """
+    recuperador, modo = _criar_recuperador_por_modo(modo, indice_lexico, caminho_indice, caminho_chunks, modelo, reforcos)
+    if getattr(indice_lexico, 'perguntas', None):
+        recuperador = RecuperadorFAQ(indice_lexico, recuperador)
+    return recuperador, modo
+
+
+def _criar_recuperador_por_modo(modo, indice_lexico, caminho_indice, caminho_chunks, modelo, reforcos):
+    lexico = RecuperadorLexico(indice_lexico, reforcos)
+    if modo not in MODOS_RECUPERACAO:
+        log.warning(f"AVISO: Modo de recuperação '{modo}' desconhecido. Usando 'keyword'.")
+        return lexico, 'keyword'
+    if modo == 'keyword':
+        return lexico, modo
+
+    if not (os.path.exists(caminho_indice) and os.path.exists(caminho_chunks)):
+        log.warning(f"AVISO: '{caminho_indice}' não encontrado. Rode construir_indice.py. Usando 'keyword'.")
+        return lexico, 'keyword'
+    try:
+        faixas = ler_manifesto(os.path.dirname(caminho_indice) or ".").get('faixas', {})
+        denso = RecuperadorDenso(caminho_indice, caminho_chunks, modelo=modelo, faixas=faixas, reforcos=reforcos)
+        denso.modelo  # carrega já na inicialização, e não no primeiro /ask
+    except ImportError as e:
+        log.warning(f"AVISO: Dependências da busca semântica ausentes ({e}). Usando 'keyword'.")
+        return lexico, 'keyword'
+
+    if modo == 'denso':
+        return denso, modo
+    return RecuperadorHibrido(lexico, denso), modo
@@ -0,0 +1,62 @@
+"""Logs do assistente com nível configurável e escrita fora do caminho da requisição.
+
+LOG_LEVEL (DEBUG, INFO, WARNING...) escolhe o que é escrito; os detalhes de cada pergunta
+(idioma, orçamento, downloads) ficam em DEBUG. Com LOG_ASYNC=1 (padrão) a requisição só coloca a
+mensagem numa fila e uma thread a escreve no stdout, então um terminal ou pipe lento não
+atrasa a resposta.
+
+Os workers do gunicorn nascem de um fork do master (preload_app) e não herdam a thread da
+fila: ela é recriada no filho por os.register_at_fork.
+"""
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+NIVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+ASSINCRONO = os.environ.get("LOG_ASYNC", "1") != "0"
+
+_raiz = logging.getLogger("assistente")
+_ouvinte = None
+_fila_handler = None
+
+
+def _iniciar_fila(destino):
+    global _ouvinte, _fila_handler
+    fila = queue.SimpleQueue()
+    if _fila_handler is None:
+        _fila_handler = logging.handlers.QueueHandler(fila)
+        _raiz.addHandler(_fila_handler)
+    else:
+        _fila_handler.queue = fila
+    _ouvinte = logging.handlers.QueueListener(fila, destino, respect_handler_level=True)
+    _ouvinte.start()
+
+
+def _parar_fila():
+    if _ouvinte is not None:
+        _ouvinte.stop()
+
+
+def configurar(nivel=NIVEL, assincrono=ASSINCRONO):
+    """Configura o logger 'assistente' (feito uma vez, na importação deste módulo)."""
+    _raiz.setLevel(getattr(logging, nivel, logging.INFO))
+    _raiz.propagate = False
+    destino = logging.StreamHandler(sys.stdout)
+    destino.setFormatter(logging.Formatter("%(message)s"))
+    if not assincrono:
+        _raiz.addHandler(destino)
+        return
+    _iniciar_fila(destino)
+    atexit.register(_parar_fila)
+    os.register_at_fork(after_in_child=lambda: _iniciar_fila(destino))
+
+
+def obter(nome):
+    """Logger de um módulo (ex.: obter('web') -> 'assistente.web')."""
+    return logging.getLogger(f"assistente.{nome}")
+
+
+configurar()
@@ -0,0 +1,96 @@
+import math
+import os
+import threading
+
+# Faixa de similaridade de cosseno (pergunta x melhor chunk) em que a decisão é duvidosa.
+# Abaixo de LIMIAR_REJEITAR o manual é descartado, acima de LIMIAR_ACEITAR é aceito sem
+# consultar ninguém; só o meio da faixa paga o reranqueador ou a chamada ao LLM.
+# Valores calibrados com benchmarks/avaliar_relevancia.py.
+LIMIAR_REJEITAR = float(os.environ.get("RELEVANCIA_LIMIAR_REJEITAR", "0.45"))
+LIMIAR_ACEITAR = float(os.environ.get("RELEVANCIA_LIMIAR_ACEITAR", "0.70"))
+
+# Cross-encoder opcional (roda em CPU) para resolver a faixa duvidosa antes do LLM
+MODELO_RERANQUEADOR = os.environ.get("MODELO_RERANQUEADOR", "")
+RERANQUEADOR_REJEITAR = float(os.environ.get("RERANQUEADOR_LIMIAR_REJEITAR", "0.3"))
+RERANQUEADOR_ACEITAR = float(os.environ.get("RERANQUEADOR_LIMIAR_ACEITAR", "0.7"))
+
+
+def julgar_com_llm(cliente, pergunta, contexto, modelo="llama-3.1-8b-instant"):
+    """Pergunta ao LLM (um nucleo.llm.GatewayLLM) se o contexto basta para responder (resposta 'SIM' ou 'NÃO')."""
+    prompt = f"""
+    Analise a PERGUNTA e o CONTEXTO a seguir. O contexto contém informação suficiente para responder a pergunta de forma satisfatória?
+    Responda APENAS com a palavra 'SIM' ou 'NÃO'.
+
+    PERGUNTA: "{pergunta}"
+
+    CONTEXTO: "{contexto}"
+    """
+    resposta = cliente.completar(
+        [{"role": "user", "content": prompt}],
+        modelo=modelo,
+        temperature=0, # Baixa temperatura para respostas mais diretas
+    ).strip().upper()
+    return "SIM" in resposta
+
+
+class Reranqueador:
+    """Cross-encoder carregado na primeira vez que a faixa duvidosa aparece."""
+
+    def __init__(self, nome_modelo):
+        self.nome_modelo = nome_modelo
+        self._modelo = None
+        self._lock = threading.Lock()
+
+    def pontuar(self, pergunta, contexto):
+        """Probabilidade (0 a 1) de o contexto responder a pergunta."""
+        if self._modelo is None:
+            with self._lock:
+                if self._modelo is None:
+                    from sentence_transformers import CrossEncoder
+                    self._modelo = CrossEncoder(self.nome_modelo, device='cpu')
+        logit = float(self._modelo.predict([(pergunta, contexto)])[0])
+        return 1.0 / (1.0 + math.exp(-logit))
+
+
+class PortaoRelevancia:
+    """Decide se o contexto do manual serve para a pergunta sem gastar uma chamada ao LLM sempre.
+
+    `juiz` é a função antiga (pergunta, contexto) -> bool que consulta o LLM; ela só é chamada
+    quando a similaridade e o reranqueador (se houver) caem na faixa duvidosa.
+    """
+
+    def __init__(self, juiz=None, reranqueador=None, limiar_rejeitar=LIMIAR_REJEITAR, limiar_aceitar=LIMIAR_ACEITAR,
+                 reranqueador_rejeitar=RERANQUEADOR_REJEITAR, reranqueador_aceitar=RERANQUEADOR_ACEITAR):
+        self.juiz = juiz
+        self.reranqueador = reranqueador
+        self.limiar_rejeitar = limiar_rejeitar
+        self.limiar_aceitar = limiar_aceitar
+        self.reranqueador_rejeitar = reranqueador_rejeitar
+        self.reranqueador_aceitar = reranqueador_aceitar
+
+    def decidir(self, pergunta, contexto, similaridade):
+        """Retorna (relevante, etapa que decidiu: 'limiar', 'reranqueador' ou 'juiz')."""
+        if not contexto or similaridade is None:
+            return False, 'limiar'
+        if similaridade >= self.limiar_aceitar:
+            return True, 'limiar'
+        if similaridade < self.limiar_rejeitar:
+            return False, 'limiar'
+
+        if self.reranqueador is not None:
+            probabilidade = self.reranqueador.pontuar(pergunta, contexto)
+            if probabilidade >= self.reranqueador_aceitar:
+                return True, 'reranqueador'
+            if probabilidade < self.reranqueador_rejeitar or self.juiz is None:
+                return probabilidade >= 0.5, 'reranqueador'
+
+        if self.juiz is None:
+            # Sem juiz, o meio da faixa decide pelo ponto médio
+            return similaridade >= (self.limiar_rejeitar + self.limiar_aceitar) / 2, 'limiar'
+        return self.juiz(pergunta, contexto), 'juiz'
+
+
+def criar_portao_relevancia(juiz=None):
+    """Monta o portão com o reranqueador de MODELO_RERANQUEADOR, se configurado."""
+    reranqueador = Reranqueador(MODELO_RERANQUEADOR) if MODELO_RERANQUEADOR else None
+    return PortaoRelevancia(juiz=juiz, reranqueador=reranqueador)
@@ -0,0 +1,135 @@
+"""Respostas prontas e mensagens fixas do assistente, nos três idiomas."""
+from nucleo.intencoes import detectar_intencao
+
+
+MENSAGENS_FALHA = {
+    'pt': "Não encontrei informações sobre isso na fonte consultada.",
+    'es': "No encontré información sobre esto en la fuente consultada.",
+    'en': "I didn't find information about this in the consulted source."
+}
+
+# Mensagens quando a busca web falha
+MENSAGENS_FALHA_WEB = {
+    'pt': "Desculpe, não encontrei informações sobre isso no manual e também não consegui buscar na internet no momento. Por favor, tente reformular sua pergunta ou entre em contato com o suporte.",
+    'es': "Lo siento, no encontré información sobre esto en el manual y tampoco pude buscar en Internet en este momento. Por favor, intente reformular su pregunta o póngase en contacto con el soporte.",
+    'en': "Sorry, I couldn't find information about this in the manual and I was unable to search the internet at this time. Please try rephrasing your question or contact support."
+}
+
+# Mensagens do controle de admissão (nucleo/admissao.py): servidor cheio ou cliente acima do limite
+MENSAGENS_SOBRECARGA = {
+    'pt': "O assistente está recebendo muitas perguntas agora. Por favor, tente novamente em alguns segundos.",
+    'es': "El asistente está recibiendo muchas preguntas ahora. Por favor, inténtelo de nuevo en unos segundos.",
+    'en': "The assistant is receiving too many questions right now. Please try again in a few seconds."
+}
+
+MENSAGENS_LIMITE_CLIENTE = {
+    'pt': "Você enviou muitas perguntas em pouco tempo. Aguarde alguns segundos e tente novamente.",
+    'es': "Ha enviado muchas preguntas en poco tiempo. Espere unos segundos e inténtelo de nuevo.",
+    'en': "You have sent too many questions in a short time. Please wait a few seconds and try again."
+}
+
+
+def eh_mensagem_de_falha(texto):
+    """Verifica se a resposta gerada é a frase de falha (em qualquer idioma)."""
+    return any(msg in texto.lower() for msg in ["não encontrei", "no encontré", "didn't find"])
+
+
+def verificar_pergunta_sobre_valores(pergunta):
+    """Verifica se a pergunta é sobre valores/preços/licença em qualquer idioma."""
+    return detectar_intencao(pergunta) == 'valores'
+
+
+def obter_resposta_valores(idioma):
+    """Retorna a resposta sobre valores no idioma especificado."""
+    return obter_resposta_pronta('valores', idioma)
+
+
+def obter_resposta_pronta(intencao, idioma):
+    """Resposta fixa de uma intenção de nucleo/intencoes.py no idioma especificado."""
+    respostas = RESPOSTAS_PRONTAS[intencao]
+    return respostas.get(idioma, respostas['pt'])
+
+
+# Respostas das intenções detectadas por intencoes.detectar_intencao
+RESPOSTAS_PRONTAS = {
+    'valores': {
+        'pt': """Para informações sobre valores, planos e licenças do Console Mix, entre em contato diretamente com nossa equipe de suporte:
+
+📞 Telefones:
+• (42) 99985-3754
+• (42) 99848-8284
+
+🕒 Horário de Atendimento:
+Segunda a Sexta, das 9h às 18h (horário de Brasília)
+
+🌐 Site:
+consolemix.com.br/console
+
+Nossa equipe terá prazer em apresentar as melhores opções de planos para você!""",
+
+        'es': """Para información sobre precios, planes y licencias de Console Mix, póngase en contacto directamente con nuestro equipo de soporte:
+
+📞 Teléfonos:
+• (42) 99985-3754
+• (42) 99848-8284
+
+🕒 Horario de Atención:
+Lunes a Viernes, de 9h a 18h (horario de Brasilia)
+
+🌐 Sitio web:
+consolemix.com.br/console
+
+¡Nuestro equipo estará encantado de presentarle las mejores opciones de planes para usted!""",
+
+        'en': """For information about pricing, plans and licenses for Console Mix, please contact our support team directly:
+
+📞 Phone numbers:
+• (42) 99985-3754
+• (42) 99848-8284
+
+🕒 Business Hours:
+Monday to Friday, 9am to 6pm (Brasilia time)
+
+🌐 Website:
+consolemix.com.br/console
+
+Our team will be happy to present you with the best plan options!"""
+    },
+
+    'horario_suporte': {
+        'pt': """🕒 Nosso horário de atendimento é de Segunda a Sexta, das 9h às 18h (horário de Brasília).
+
+📞 Telefones:
+• (42) 99985-3754
+• (42) 99848-8284""",
+
+        'es': """🕒 Nuestro horario de atención es de Lunes a Viernes, de 9h a 18h (horario de Brasilia).
+
+📞 Teléfonos:
+• (42) 99985-3754
+• (42) 99848-8284""",
+
+        'en': """🕒 Our support hours are Monday to Friday, 9am to 6pm (Brasilia time).
+
+📞 Phone numbers:
+• (42) 99985-3754
+• (42) 99848-8284"""
+    },
+
+    'downloads': {
+        'pt': """⬇️ O instalador do Console Mix, as atualizações e os patches ficam no site oficial:
+consolemix.com.br/console
+
+Baixe sempre a versão mais recente e execute o instalador como administrador.""",
+
+        'es': """⬇️ El instalador de Console Mix, las actualizaciones y los parches están en el sitio oficial:
+consolemix.com.br/console
+
+Descargue siempre la versión más reciente y ejecute el instalador como administrador.""",
+
+        'en': """⬇️ The Console Mix installer, updates and patches are available on the official website:
+consolemix.com.br/console
+
+Always download the latest version and run the installer as administrator."""
+    },
+}
@@ -0,0 +1,169 @@
+"""Conversas guardadas no servidor: o widget manda só a pergunta nova e o `conversation_id`.
+
+Cada sessão guarda as últimas SESSOES_TURNOS trocas (pergunta + resposta) e um resumo das
+anteriores. Quando uma troca sai da janela, ela é dobrada no resumo (uma linha curta por troca,
+com as mais antigas descartadas quando passa de SESSOES_RESUMO_TOKENS), então o histórico que vai
+para o prompt tem tamanho fixo por mais longa que seja a conversa.
+
+As sessões ficam num LRU do processo. Com mais de um worker do gunicorn, cada pergunta pode cair
+num worker diferente: defina SESSOES_URL (redis) para que todos leiam o mesmo armazenamento.
+"""
+import json
+import os
+import re
+import secrets
+import threading
+
+from nucleo import registro
+from nucleo.cache_respostas import BackendRedis, CacheLRU
+from nucleo.documentos import estimar_tokens
+
+log = registro.obter('sessoes')
+
+TURNOS = int(os.environ.get("SESSOES_TURNOS", "3"))
+MAXIMO_RESUMO = int(os.environ.get("SESSOES_RESUMO_TOKENS", "150"))
+# Cada mensagem guardada é cortada neste tamanho: o orçamento do prompt corta de novo se precisar
+MAXIMO_CARACTERES_MENSAGEM = 2000
+TAMANHO_LINHA_RESUMO = 160
+
+_ID_VALIDO = re.compile(r'[A-Za-z0-9_-]{8,64}')
+_PRIMEIRA_FRASE = re.compile(r'(?<=[.!?])\s')
+
+
+def _encurtar(texto, tamanho):
+    texto = ' '.join(texto.split())
+    texto = _PRIMEIRA_FRASE.split(texto, 1)[0]
+    return texto if len(texto) <= tamanho else texto[:tamanho - 1].rsplit(' ', 1)[0] + '…'
+
+
+def dobrar_no_resumo(resumo, mensagens, maximo=MAXIMO_RESUMO):
+    """Resumo com as `mensagens` que saíram da janela: uma linha por troca, as mais antigas saem primeiro."""
+    linhas = resumo.split('\n') if resumo else []
+    pergunta = None
+    for mensagem in mensagens:
+        if mensagem['role'] == 'user':
+            pergunta = _encurtar(mensagem['content'], TAMANHO_LINHA_RESUMO)
+        elif pergunta is not None:
+            resposta = _encurtar(mensagem['content'], TAMANHO_LINHA_RESUMO)
+            linhas.append(f"- Perguntou: {pergunta} Resposta: {resposta}")
+            pergunta = None
+    if pergunta is not None:
+        linhas.append(f"- Perguntou: {pergunta}")
+    while linhas and estimar_tokens('\n'.join(linhas)) > maximo:
+        linhas.pop(0)
+    return '\n'.join(linhas)
+
+
+_PALAVRA = re.compile(r'\w+')
+_SEM_ACENTO = str.maketrans('áàâãäéèêëíìîïóòôõöúùûüçñ', 'aaaaaeeeeiiiiooooouuuucn')
+# Palavras que apontam para algo dito antes (pt, es, en)
+REFERENCIAS = frozenset("""
+    isso isto disso disto nisso nisto desse dessa deste desta nesse nessa neste nesta esse essa este
+    ele ela eles elas dele dela deles delas nele nela mesmo mesma tambem anterior acima outro outra
+    eso esto ello ella ellos ellas ese esa estos aquel aquella mismo misma anterior otro otra
+    it its that this these those they them their same also above previous another
+""".split())
+# Começos de pergunta que continuam a anterior ("E no Windows?", "What about Mac?")
+# Comparados sem tirar os acentos: "é" não pode virar o "e" de "E no Windows?"
+CONTINUACOES = frozenset("e y and mas pero but então entao entonces so".split()) | {'what about', 'how about'}
+MINIMO_PALAVRAS_AUTONOMA = 3
+
+
+def depende_da_conversa(pergunta):
+    """Se a pergunta parece depender das trocas anteriores (pronomes, "e no ...?", poucas palavras).
+
+    Erra para o lado seguro: na dúvida diz que depende, e a pergunta não usa o cache de respostas nem a FAQ.
+    """
+    palavras = _PALAVRA.findall(pergunta.lower())
+    if len(palavras) < MINIMO_PALAVRAS_AUTONOMA or palavras[0] in CONTINUACOES \
+            or ' '.join(palavras[:2]) in CONTINUACOES:
+        return True
+    return any(palavra.translate(_SEM_ACENTO) in REFERENCIAS for palavra in palavras)
+
+
+class Sessao:
+    """Resumo das trocas antigas e as mensagens recentes ({'role', 'content'}) de uma conversa."""
+
+    __slots__ = ('resumo', 'mensagens')
+
+    def __init__(self, resumo="", mensagens=None):
+        self.resumo = resumo
+        self.mensagens = mensagens or []
+
+    def para_json(self):
+        return json.dumps({'resumo': self.resumo, 'mensagens': self.mensagens}, ensure_ascii=False)
+
+    @classmethod
+    def de_json(cls, texto):
+        dados = json.loads(texto)
+        return cls(dados.get('resumo', ""), dados.get('mensagens', []))
+
+
+class ArmazemSessoes:
+    """Guarda as sessões como JSON no LRU local ou, se houver, só no backend compartilhado.
+
+    Com o backend compartilhado não há cópia local: outro worker pode ter atualizado a sessão.
+    `resumir(resumo, mensagens)` dobra as mensagens que saem da janela no resumo.
+    """
+
+    def __init__(self, local=None, compartilhado=None, ttl=1800, turnos=TURNOS, resumir=dobrar_no_resumo):
+        self.local = local if local is not None else CacheLRU(ttl=ttl)
+        self.compartilhado = compartilhado
+        self.ttl = ttl
+        self.turnos = turnos
+        self.resumir = resumir
+        self._lock = threading.Lock()
+
+    @property
+    def _armazenamento(self):
+        return self.compartilhado if self.compartilhado is not None else self.local
+
+    @staticmethod
+    def novo_id():
+        return secrets.token_urlsafe(16)
+
+    @staticmethod
+    def id_valido(id_conversa):
+        return isinstance(id_conversa, str) and _ID_VALIDO.fullmatch(id_conversa) is not None
+
+    def _chave(self, id_conversa):
+        return f"sessao:{id_conversa}"
+
+    def carregar(self, id_conversa):
+        """Sessão da conversa; uma conversa nova ou expirada começa vazia."""
+        try:
+            texto = self._armazenamento.get(self._chave(id_conversa))
+        except Exception as e:
+            log.warning(f"[SESSÃO] Erro ao ler a sessão: {e}")
+            texto = None
+        return Sessao.de_json(texto) if texto else Sessao()
+
+    def registrar(self, id_conversa, pergunta, resposta):
+        """Acrescenta a troca à sessão e dobra no resumo o que passar de `turnos` trocas."""
+        with self._lock:
+            sessao = self.carregar(id_conversa)
+            sessao.mensagens.append({'role': 'user', 'content': pergunta[:MAXIMO_CARACTERES_MENSAGEM]})
+            sessao.mensagens.append({'role': 'assistant', 'content': resposta[:MAXIMO_CARACTERES_MENSAGEM]})
+            excesso = len(sessao.mensagens) - 2 * self.turnos
+            if excesso > 0:
+                sessao.resumo = self.resumir(sessao.resumo, sessao.mensagens[:excesso])
+                sessao.mensagens = sessao.mensagens[excesso:]
+            try:
+                self._armazenamento.set(self._chave(id_conversa), sessao.para_json(), self.ttl)
+            except Exception as e:
+                log.warning(f"[SESSÃO] Erro ao gravar a sessão: {e}")
+        return sessao
+
+
+def criar_armazem_sessoes():
+    """Monta o armazém a partir das variáveis SESSOES_TTL, SESSOES_ITENS e SESSOES_URL."""
+    ttl = int(os.environ.get("SESSOES_TTL", "1800"))
+    local = CacheLRU(capacidade=int(os.environ.get("SESSOES_ITENS", "10000")), ttl=ttl)
+    compartilhado = None
+    url = os.environ.get("SESSOES_URL")
+    if url:
+        try:
+            compartilhado = BackendRedis(url)
+        except ImportError:
+            log.warning("AVISO: SESSOES_URL definido, mas o pacote 'redis' não está instalado. Usando sessões locais.")
+    return ArmazemSessoes(local=local, compartilhado=compartilhado, ttl=ttl)
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from nucleo import registro
+from nucleo.cache_web import criar_cache_web
+from nucleo.dependencias import ModuloPreguicoso
+from nucleo.metricas import ERROS_UPSTREAM, observar_etapa
+
+log = registro.obter('web')
+
+# Só são importados na primeira busca web
+requests = ModuloPreguicoso('requests')
+duckduckgo_search = ModuloPreguicoso('duckduckgo_search')
+trafilatura = ModuloPreguicoso('trafilatura')
+
+# Tempo máximo que a busca inteira (todos os downloads) pode levar
+PRAZO_TOTAL_WEB = float(os.environ.get("WEB_PRAZO_TOTAL", "6"))
+# Tempo máximo de conexão/leitura de cada site
+TIMEOUT_POR_HOST = float(os.environ.get("WEB_TIMEOUT_POR_HOST", "4"))
+TAMANHO_MINIMO_ARTIGO = 100
+# Endpoint de busca no lugar do DuckDuckGo (GET ?q=&max_results=&region= -> lista JSON no formato do
+# DDGS.text), como o servidor de benchmarks/stubs/web_falsa.py nos testes de carga
+URL_BUSCA = os.environ.get("WEB_BUSCA_URL", "")
+CABECALHOS = {"User-Agent": "Mozilla/5.0 (compatible; AssistenteConsoleMix/1.0)"}
+
+# Cache em disco de buscas e páginas extraídas (None se CACHE_WEB_ARQUIVO estiver vazio)
+CACHE_WEB = criar_cache_web()
+
+# Pool compartilhado: downloads que estouram o prazo terminam em segundo plano sem criar threads novas
+_executor = ThreadPoolExecutor(max_workers=int(os.environ.get("WEB_THREADS", "16")), thread_name_prefix="web")
+
+
+def buscar_links(pergunta, max_resultados=3, regiao='br-pt', timeout=TIMEOUT_POR_HOST):
+    """Consulta o DuckDuckGo e retorna a lista de resultados ({'href', 'title', 'body'})."""
+    if CACHE_WEB is not None:
+        em_cache = CACHE_WEB.obter_busca(pergunta, regiao, max_resultados)
+        if em_cache is not None:
+            log.debug(f"[WEB CACHE] Busca encontrada no cache ({len(em_cache)} resultados)")
+            return em_cache
+
+    inicio = time.perf_counter()
+    try:
+        if URL_BUSCA:
+            resposta = requests.get(URL_BUSCA, params={'q': pergunta, 'max_results': max_resultados, 'region': regiao},
+                                    timeout=timeout)
+            resposta.raise_for_status()
+            resultados = resposta.json()
+        else:
+            with duckduckgo_search.DDGS(timeout=timeout) as ddgs:
+                resultados = list(ddgs.text(pergunta, max_results=max_resultados, region=regiao))
+    except Exception:
+        ERROS_UPSTREAM.inc(servico='busca')
+        raise
+    finally:
+        observar_etapa('busca', time.perf_counter() - inicio)
+    if CACHE_WEB is not None and resultados:
+        CACHE_WEB.guardar_busca(pergunta, regiao, max_resultados, resultados)
+    return resultados
+
+
+def extrair_texto(html):
+    inicio = time.perf_counter()
+    try:
+        return trafilatura.extract(html, include_comments=False, include_tables=False)
+    finally:
+        observar_etapa('extracao', time.perf_counter() - inicio)
+
+
+def _consultar_cache_pagina(url):
+    """Retorna (página em cache ou None, cabeçalhos do download) para uma URL."""
+    em_cache = CACHE_WEB.obter_pagina(url) if CACHE_WEB is not None else None
+    cabecalhos = dict(CABECALHOS)
+    if em_cache is not None:
+        cabecalhos.update(em_cache.cabecalhos_condicionais())
+    return em_cache, cabecalhos
+
+
+def _processar_download(url, status, cabecalhos_resposta, html, em_cache):
+    """Trata a resposta HTTP: revalida o cache no 304 ou extrai e guarda o texto novo.
+
+    Texto curto demais para servir de artigo vai para o cache vazio, que vence em ttl_negativo.
+    """
+    if status == 304 and em_cache is not None:
+        CACHE_WEB.renovar_pagina(url)
+        return em_cache.texto
+    if status != 200 or not html:
+        ERROS_UPSTREAM.inc(servico='pagina')
+        return None
+    texto = extrair_texto(html)
+    if CACHE_WEB is not None:
+        if texto_util(texto):
+            CACHE_WEB.guardar_pagina(url, texto, cabecalhos_resposta.get('ETag'), cabecalhos_resposta.get('Last-Modified'))
+        else:
+            # Sem validadores: um 304 renovaria a entrada vazia por um ttl_pagina inteiro
+            CACHE_WEB.guardar_pagina(url, None)
+    return texto
+
+
+def baixar_e_extrair(url, timeout=TIMEOUT_POR_HOST):
+    """Baixa a página respeitando o timeout do host e extrai o texto principal (com cache em disco)."""
+    em_cache, cabecalhos = _consultar_cache_pagina(url)
+    if em_cache is not None and em_cache.fresca:
+        return em_cache.texto
+    inicio = time.perf_counter()
+    try:
+        resposta = requests.get(url, timeout=timeout, headers=cabecalhos)
+    except Exception:
+        ERROS_UPSTREAM.inc(servico='pagina')
+        raise
+    finally:
+        observar_etapa('download', time.perf_counter() - inicio)
+    return _processar_download(url, resposta.status_code, resposta.headers, resposta.text, em_cache)
+
+
+def texto_util(texto, tamanho_minimo=TAMANHO_MINIMO_ARTIGO):
+    return bool(texto) and len(texto.strip()) > tamanho_minimo
+
+
+def coletar_artigos(resultados, quantidade=1, prazo=PRAZO_TOTAL_WEB, timeout_por_host=TIMEOUT_POR_HOST,
+                    tamanho_minimo=TAMANHO_MINIMO_ARTIGO, baixar=baixar_e_extrair):
+    """Baixa e extrai todos os resultados em paralelo, dentro de um prazo global.
+
+    Retorna assim que `quantidade` extrações úteis chegam (na ordem em que chegaram), como uma
+    lista de pares (resultado, texto). Downloads que ainda não começaram são cancelados.
+    """
+    if not resultados:
+        return []
+    if prazo <= 0:
+        # A busca já gastou o prazo inteiro: nem começa os downloads
+        log.warning(f"[WEB SEARCH] Prazo esgotado antes dos downloads de {len(resultados)} resultados")
+        return []
+
+    limite = time.monotonic() + prazo
+    futuros = {_executor.submit(baixar, resultado['href'], timeout_por_host): resultado for resultado in resultados}
+    artigos = []
+    pendentes = set(futuros)
+    try:
+        while pendentes and len(artigos) < quantidade:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                log.warning(f"[WEB SEARCH] Prazo de {prazo:.1f}s esgotado com {len(pendentes)} downloads pendentes")
+                break
+            prontos, pendentes = wait(pendentes, timeout=restante, return_when=FIRST_COMPLETED)
+            for futuro in prontos:
+                url = futuros[futuro]['href']
+                try:
+                    texto = futuro.result()
+                except Exception as e:
+                    log.warning(f"[WEB SEARCH] Erro ao processar {url}: {e}")
+                    continue
+                if texto_util(texto, tamanho_minimo):
+                    log.debug(f"[WEB SEARCH] Extraídos {len(texto)} caracteres de {url}")
+                    artigos.append((futuros[futuro], texto))
+                else:
+                    log.debug(f"[WEB SEARCH] Conteúdo muito curto ou vazio em {url}")
+    finally:
+        for futuro in pendentes:
+            futuro.cancel()
+    return artigos[:quantidade]
+
+
+async def baixar_e_extrair_async(cliente_http, url, timeout=TIMEOUT_POR_HOST):
+    """Versão assíncrona de baixar_e_extrair usando um httpx.AsyncClient compartilhado."""
+    em_cache, cabecalhos = await asyncio.to_thread(_consultar_cache_pagina, url)
+    if em_cache is not None and em_cache.fresca:
+        return em_cache.texto
+    inicio = time.perf_counter()
+    try:
+        resposta = await asyncio.wait_for(cliente_http.get(url, headers=cabecalhos), timeout=timeout)
+    except Exception:
+        ERROS_UPSTREAM.inc(servico='pagina')
+        raise
+    finally:
+        observar_etapa('download', time.perf_counter() - inicio)
+    # Extração e gravação no SQLite são bloqueantes: vão para uma thread
+    return await asyncio.to_thread(_processar_download, url, resposta.status_code, resposta.headers,
+                                   resposta.text, em_cache)
+
+
+async def coletar_artigos_async(cliente_http, resultados, quantidade=1, prazo=PRAZO_TOTAL_WEB,
+                                timeout_por_host=TIMEOUT_POR_HOST, tamanho_minimo=TAMANHO_MINIMO_ARTIGO):
+    """Versão assíncrona de coletar_artigos; as tarefas que sobram são canceladas de verdade."""
+    if not resultados:
+        return []
+    if prazo <= 0:
+        # A busca já gastou o prazo inteiro: nem começa os downloads
+        log.warning(f"[WEB SEARCH] Prazo esgotado antes dos downloads de {len(resultados)} resultados")
+        return []
+
+    limite = time.monotonic() + prazo
+    tarefas = {asyncio.create_task(baixar_e_extrair_async(cliente_http, resultado['href'], timeout_por_host)): resultado
+               for resultado in resultados}
+    artigos = []
+    pendentes = set(tarefas)
+    try:
+        while pendentes and len(artigos) < quantidade:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                log.warning(f"[WEB SEARCH] Prazo de {prazo:.1f}s esgotado com {len(pendentes)} downloads pendentes")
+                break
+            prontos, pendentes = await asyncio.wait(pendentes, timeout=restante, return_when=asyncio.FIRST_COMPLETED)
+            for tarefa in prontos:
+                url = tarefas[tarefa]['href']
+                try:
+                    texto = tarefa.result()
+                except Exception as e:
+                    log.warning(f"[WEB SEARCH] Erro ao processar {url}: {e!r}")
+                    continue
+                if texto_util(texto, tamanho_minimo):
+                    log.debug(f"[WEB SEARCH] Extraídos {len(texto)} caracteres de {url}")
+                    artigos.append((tarefas[tarefa], texto))
+                else:
+                    log.debug(f"[WEB SEARCH] Conteúdo muito curto ou vazio em {url}")
+    finally:
+        for tarefa in pendentes:
+            tarefa.cancel()
+    return artigos[:quantidade]
@@ -0,0 +1,93 @@
+"""Manda um arquivo de perguntas para o /ask/batch e grava as respostas em JSON Lines.
+
+Uso: python perguntar_lote.py perguntas.txt [--url http://127.0.0.1:5000] [--saida respostas.jsonl]
+     python perguntar_lote.py perguntas.jsonl --local
+
+O arquivo tem uma pergunta por linha ou, em JSON Lines, objetos {"id", "question", "sources"}
+("-" lê do stdin). Cada resposta é gravada assim que chega, uma por linha, com o resumo do lote
+no final. Lotes maiores que --tamanho são divididos em vários pedidos.
+
+--local responde neste processo (carrega o api.py, como o servidor), sem precisar do servidor no ar.
+"""
+import argparse
+import json
+import sys
+
+from nucleo.lote import MAXIMO_PERGUNTAS
+
+
+def ler_perguntas(arquivo):
+    perguntas = []
+    for numero, linha in enumerate(arquivo, start=1):
+        linha = linha.strip()
+        if not linha:
+            continue
+        if linha.startswith('{'):
+            item = json.loads(linha)
+            item.setdefault('id', numero)
+            perguntas.append(item)
+        else:
+            perguntas.append({'id': numero, 'question': linha})
+    return perguntas
+
+
+def linhas_do_servidor(url, corpo, timeout):
+    import requests
+
+    with requests.post(url.rstrip('/') + '/ask/batch', json=corpo, stream=True, timeout=timeout) as resposta:
+        if resposta.status_code != 200:
+            sys.exit(f"Erro {resposta.status_code} do servidor: {resposta.text}")
+        for linha in resposta.iter_lines(decode_unicode=True):
+            if linha:
+                yield linha
+
+
+def linhas_locais(corpo):
+    import api
+
+    resposta = api.app.test_client().post('/ask/batch', json=corpo)
+    if resposta.status_code != 200:
+        sys.exit(f"Erro {resposta.status_code}: {resposta.get_data(as_text=True)}")
+    try:
+        for pedaco in resposta.response:
+            yield pedaco.decode('utf-8').rstrip("\n") if isinstance(pedaco, bytes) else pedaco.rstrip("\n")
+    finally:
+        resposta.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Responde um arquivo de perguntas pelo /ask/batch.")
+    parser.add_argument('arquivo', help="Uma pergunta por linha, ou JSON Lines com id/question/sources")
+    parser.add_argument('--url', default='http://127.0.0.1:5000', help="Endereço do servidor")
+    parser.add_argument('--local', action='store_true', help="Responde neste processo, sem servidor")
+    parser.add_argument('--saida', help="Arquivo JSON Lines de saída (padrão: stdout)")
+    parser.add_argument('--fontes', nargs='*', help="Restringe a busca a estes arquivos (ex.: manual_limpo.txt)")
+    parser.add_argument('--tamanho', type=int, default=MAXIMO_PERGUNTAS, help="Perguntas por pedido")
+    parser.add_argument('--timeout', type=float, default=600, help="Segundos sem receber nada antes de desistir")
+    args = parser.parse_args()
+
+    if args.arquivo == '-':
+        perguntas = ler_perguntas(sys.stdin)
+    else:
+        with open(args.arquivo, 'r', encoding='utf-8') as f:
+            perguntas = ler_perguntas(f)
+    if not perguntas:
+        sys.exit("Nenhuma pergunta no arquivo.")
+
+    saida = open(args.saida, 'w', encoding='utf-8') if args.saida else sys.stdout
+    try:
+        for inicio in range(0, len(perguntas), args.tamanho):
+            corpo = {'questions': perguntas[inicio:inicio + args.tamanho]}
+            if args.fontes:
+                corpo['sources'] = args.fontes
+            linhas = linhas_locais(corpo) if args.local else linhas_do_servidor(args.url, corpo, args.timeout)
+            for linha in linhas:
+                saida.write(linha + "\n")
+                saida.flush()
+    finally:
+        if saida is not sys.stdout:
+            saida.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Gera as respostas da FAQ (faq_respostas.json) em pt, es e en, consultadas pelo /ask antes do LLM.
+
+Uso: python precomputar_faq.py [--forcar] [--paralelas 4]
+
+Pega cada pergunta do manual e de conhecimento/ mais as paráfrases de faq_parafrases.json,
+traduz as perguntas e gera as respostas com o prompt do /ask (precisa de GROQ_API_KEY).
+Só as perguntas cujo contexto ou paráfrases mudaram desde a última execução vão para o LLM;
+o servidor recarrega a tabela sozinho quando o arquivo muda.
+"""
+import argparse
+import sys
+
+from nucleo.corpus import carregar_corpus
+from nucleo.faq import precomputar_faq
+from nucleo.llm import MODELO_PADRAO, criar_gateway
+from nucleo.orcamento import OrcamentoTokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera as respostas pré-computadas da FAQ do manual.")
+    parser.add_argument('--raiz', default='.', help="Pasta onde estão manual_limpo.txt e conhecimento/")
+    parser.add_argument('--paralelas', type=int, default=4, help="Perguntas geradas ao mesmo tempo")
+    parser.add_argument('--modelo', default=MODELO_PADRAO, help="Modelo da Groq usado nas respostas")
+    parser.add_argument('--forcar', action='store_true', help="Ignora a tabela anterior e gera tudo de novo")
+    args = parser.parse_args()
+
+    gateway = criar_gateway()
+    if gateway is None:
+        sys.exit("Configure GROQ_API_KEY para gerar as respostas.")
+    corpus, _ = carregar_corpus(args.raiz)
+
+    resultado = precomputar_faq(corpus, gateway, OrcamentoTokens(), raiz=args.raiz, forcar=args.forcar,
+                                paralelas=args.paralelas, modelo=args.modelo)
+    if resultado['atualizada']:
+        print(f"FAQ gerada (versão {resultado['versao']}): {resultado['entradas']} perguntas, "
+              f"{resultado['geradas']} geradas de novo, {resultado['reaproveitadas']} reaproveitadas, "
+              f"{resultado['chamadas']} chamadas ao LLM em {resultado['segundos']:.1f}s.")
+    else:
+        print(f"FAQ já atualizada ({resultado['entradas']} perguntas), nada a fazer.")
+    if resultado['sem_resposta']:
+        print(f"{resultado['sem_resposta']} respostas ficaram de fora (o LLM não achou a resposta no contexto).")
+
+
+if __name__ == '__main__':
+    main()